@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of the compiled model pool (main.py -cm). For every model, an
+eager copy and two copies sharing one compiled graph run training steps and
+evaluation batches on the CPU. The first call of the first compiled copy pays
+for the compilation, the second copy reuses its graph.
+
+    python benchmarks/bench_compile.py
+    python benchmarks/bench_compile.py -bs 64 -cmb aot_eager
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+import torch
+import torch.nn.functional as F
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'system'))
+from flcore.trainmodel.models import FedAvgCNN
+from utils.compile_utils import compile_model
+
+# name, model, input shape of one sample
+MODELS = [
+    ('FedAvgCNN (MNIST)', lambda: FedAvgCNN(in_features=1, num_classes=10, dim=1024), (1, 28, 28)),
+    ('FedAvgCNN (Cifar10)', lambda: FedAvgCNN(in_features=3, num_classes=10, dim=1600), (3, 32, 32)),
+]
+
+
+def first_call(model, x, y):
+    start = time.perf_counter()
+    F.cross_entropy(model(x), y).backward()
+    with torch.no_grad():
+        model.eval()
+        model(x)
+        model.train()
+    return time.perf_counter() - start
+
+
+def timed(model, x, y, iters):
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    start = time.perf_counter()
+    for _ in range(iters):
+        optimizer.zero_grad()
+        F.cross_entropy(model(x), y).backward()
+        optimizer.step()
+    train = (time.perf_counter() - start) / iters * 1e3
+
+    model.eval()
+    with torch.no_grad():
+        start = time.perf_counter()
+        for _ in range(iters):
+            model(x)
+    model.train()
+    return train, (time.perf_counter() - start) / iters * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-bs', "--batch_size", type=int, default=10)
+    parser.add_argument('-it', "--iters", type=int, default=50)
+    parser.add_argument('-cmb', "--compile_backend", type=str, default='inductor')
+    parser.add_argument('-th', "--threads", type=int, default=1)
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    print("{:<22s}{:>14s}{:>14s}{:>16s}{:>16s}{:>14s}{:>14s}".format(
+        'model', 'train eager', 'train comp.', 'eval eager', 'eval comp.', 'compile', '2nd copy'))
+    for name, build, shape in MODELS:
+        x = torch.randn(args.batch_size, *shape)
+        y = torch.randint(10, (args.batch_size,))
+        eager = build()
+        compiled = compile_model(copy.deepcopy(eager), args.compile_backend)
+        first_call(eager, x, y)
+        compile_time = first_call(compiled, x, y)
+        second = copy.deepcopy(compiled)
+        second_time = first_call(second, x, y)
+
+        train_eager, eval_eager = timed(eager, x, y, args.iters)
+        train_comp, eval_comp = timed(second, x, y, args.iters)
+        print("{:<22s}{:>11.2f} ms{:>11.2f} ms{:>13.2f} ms{:>13.2f} ms{:>12.1f} s{:>12.3f} s".format(
+            name, train_eager, train_comp, eval_eager, eval_comp, compile_time, second_time))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of the losses in system/flcore/losses against the per-batch
+versions the clients used before. Each pair is checked to give the same loss
+and gradient, then timed forward and backward on random logits.
+
+    python benchmarks/bench_losses.py
+    python benchmarks/bench_losses.py -bs 64 -nc 100 -dev cuda
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'system'))
+from flcore.losses.fedloss import balanced_softmax_loss, calibrated_loss, log_prior, \
+    not_true_index, ntd_loss
+
+
+# previous versions, copied from the clients
+
+def old_balanced_softmax_loss(labels, logits, sample_per_class, reduction="mean"):
+    spc = sample_per_class.type_as(logits)
+    spc = spc.unsqueeze(0).expand(logits.shape[0], -1)
+    logits = logits + spc.log()
+    return F.cross_entropy(input=logits, target=labels, reduction=reduction)
+
+
+def old_refine_as_not_true(logits, targets, num_classes):
+    nt_positions = torch.arange(0, num_classes).to(logits.device)
+    nt_positions = nt_positions.repeat(logits.size(0), 1)
+    nt_positions = nt_positions[nt_positions[:, :] != targets.view(-1, 1)]
+    nt_positions = nt_positions.view(-1, num_classes - 1)
+    return torch.gather(logits, 1, nt_positions)
+
+
+def old_ntd_loss(logits, dg_logits, targets, num_classes, tau):
+    logits = old_refine_as_not_true(logits, targets, num_classes)
+    pred_probs = F.log_softmax(logits / tau, dim=1)
+    with torch.no_grad():
+        dg_logits = old_refine_as_not_true(dg_logits, targets, num_classes)
+        dg_probs = torch.softmax(dg_logits / tau, dim=1)
+    return (tau ** 2) * nn.KLDivLoss(reduction="batchmean")(pred_probs, dg_probs)
+
+
+def timed(fn, logits, iters, device):
+    for _ in range(10):
+        fn().backward()
+    if device == 'cuda':
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(iters):
+        logits.grad = None
+        fn().backward()
+    if device == 'cuda':
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / iters * 1e6
+
+
+def check(old, new, logits):
+    logits.grad = None
+    old_loss = old()
+    old_loss.backward()
+    old_grad = logits.grad.clone()
+    logits.grad = None
+    new_loss = new()
+    new_loss.backward()
+    return torch.allclose(old_loss, new_loss) and torch.allclose(old_grad, logits.grad)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-bs', "--batch_size", type=int, default=10)
+    parser.add_argument('-nc', "--num_classes", type=int, default=10)
+    parser.add_argument('-it', "--iters", type=int, default=2000)
+    parser.add_argument('-dev', "--device", type=str, default='cpu')
+    parser.add_argument('-th', "--threads", type=int, default=1)
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    device, nc, bs = args.device, args.num_classes, args.batch_size
+    logits = torch.randn(bs, nc, device=device, requires_grad=True)
+    dg_logits = torch.randn(bs, nc, device=device)
+    labels = torch.randint(nc, (bs,), device=device)
+    sample_per_class = torch.randint(1, 100, (nc,)).float()
+    prior = log_prior(sample_per_class, device)
+    calibration = (sample_per_class ** (-1/4)).to(device)
+    tiled = torch.tile(calibration, (bs, 1))
+    nt_index = not_true_index(nc, device)
+
+    pairs = [
+        ('balanced softmax (FedROD)',
+         lambda: old_balanced_softmax_loss(labels, logits, sample_per_class),
+         lambda: balanced_softmax_loss(labels, logits, prior)),
+        ('calibrated (FedLC)',
+         lambda: F.cross_entropy(logits - tiled, labels),
+         lambda: calibrated_loss(labels, logits, calibration)),
+        ('not-true distillation (FedNTD)',
+         lambda: old_ntd_loss(logits, dg_logits, labels, nc, 1.0),
+         lambda: ntd_loss(logits, dg_logits, labels, nt_index, 1.0)),
+    ]
+
+    print("{:<32s}{:>12s}{:>12s}{:>10s}{:>8s}".format('loss', 'old (us)', 'new (us)', 'speedup', 'same'))
+    for name, old, new in pairs:
+        same = check(old, new, logits)
+        t_old = timed(old, logits, args.iters, device)
+        t_new = timed(new, logits, args.iters, device)
+        print("{:<32s}{:>12.1f}{:>12.1f}{:>9.2f}x{:>8s}".format(name, t_old, t_new, t_old / t_new, str(same)))
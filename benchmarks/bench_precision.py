@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Accuracy parity of the bf16 mixed-precision mode (main.py -prec). FedAvg runs
+twice on the same dataset with the same seed, once with -prec fp32 and once
+with -prec bf16, each in its own process. The script exits with status 1 when
+the best test accuracies of the two runs differ by more than the tolerance.
+
+    python benchmarks/bench_precision.py                       # MNIST, 10 rounds, CPU
+    python benchmarks/bench_precision.py -data Cifar10 -gr 50 -tol 0.02 -- -dev cuda
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYSTEM = os.path.join(ROOT, 'system')
+RESULTS = os.path.join(ROOT, 'results')
+sys.path.insert(0, SYSTEM)
+from utils.result_utils import query_results
+
+ALGORITHM = 'FedAvg'
+PRECISIONS = ['fp32', 'bf16']
+
+
+def goal(precision):
+    # no underscore, so the file name stays <dataset>_<algo>_<goal>_<times>.h5
+    return 'parity-' + precision
+
+
+def remove_results(dataset):
+    for file_name in os.listdir(RESULTS) if os.path.exists(RESULTS) else []:
+        if any(file_name.startswith('{}_{}_{}_'.format(dataset, ALGORITHM, goal(p))) for p in PRECISIONS):
+            os.remove(os.path.join(RESULTS, file_name))
+
+
+def best_accuracy(precision, args):
+    cmd = [sys.executable, '-u', 'main.py',
+           '-data', args.dataset, '-m', args.model, '-algo', ALGORITHM, '-go', goal(precision),
+           '-gr', str(args.rounds), '-nc', str(args.clients), '-jr', str(args.join_ratio),
+           '-sd', str(args.seed), '-prec', precision] + args.extra
+    proc = subprocess.run(cmd, cwd=SYSTEM, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                          env=dict(os.environ, OMP_NUM_THREADS=str(args.threads)))
+    runs = query_results(RESULTS, dataset=args.dataset, algorithm=ALGORITHM, goal=goal(precision))
+    if proc.returncode != 0 or len(runs) == 0 or len(runs[0]['rs_test_acc']) == 0:
+        tail = proc.stdout.strip().split('\n')[-1] if proc.stdout.strip() else ''
+        sys.exit("-prec {} failed: {}".format(precision, tail))
+    return float(np.max(runs[0]['rs_test_acc']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-data', "--dataset", type=str, default="MNIST")
+    parser.add_argument('-m', "--model", type=str, default="CNN")
+    parser.add_argument('-gr', "--rounds", type=int, default=10)
+    parser.add_argument('-nc', "--clients", type=int, default=20)
+    parser.add_argument('-jr', "--join_ratio", type=float, default=1)
+    parser.add_argument('-sd', "--seed", type=int, default=0)
+    parser.add_argument('-th', "--threads", type=int, default=1)
+    parser.add_argument('-tol', "--tolerance", type=float, default=0.01,
+                        help="Largest allowed difference of the best test accuracies (absolute)")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="Arguments after -- are passed to main.py")
+    args = parser.parse_args()
+    args.extra = [a for a in args.extra if a != '--']
+
+    remove_results(args.dataset)
+    accuracies = {}
+    for precision in PRECISIONS:
+        print(f"Running {ALGORITHM} -prec {precision} ...", flush=True)
+        accuracies[precision] = best_accuracy(precision, args)
+    remove_results(args.dataset)
+
+    diff = abs(accuracies['bf16'] - accuracies['fp32'])
+    print("{:<8s}{:>14s}".format('prec', 'best acc'))
+    for precision, accuracy in accuracies.items():
+        print("{:<8s}{:>14.4f}".format(precision, accuracy))
+    print("\n|bf16 - fp32| = {:.4f}, tolerance {:.4f}: {}".format(
+        diff, args.tolerance, 'ok' if diff <= args.tolerance else 'FAILED'))
+    sys.exit(0 if diff <= args.tolerance else 1)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+Performance benchmark of the PFLlib algorithms.
+
+Every algorithm of system/main.py runs for a few rounds on small synthetic
+shards on the CPU, each in its own process. The per-round profile written to
+the results file (see --profile) gives the local training throughput, the
+aggregation and evaluation time, peak RSS and the bytes sent to and from the
+clients. Startup is the time until the server and clients are created.
+
+    python benchmarks/run_benchmarks.py                      # all algorithms
+    python benchmarks/run_benchmarks.py -a FedAvg FedProx    # a subset
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYSTEM = os.path.join(ROOT, 'system')
+sys.path.insert(0, SYSTEM)
+from utils.result_utils import query_results
+from flcore.servers.registry import ALGORITHMS
+
+# main.py picks the model input shape from the dataset name
+DATASET = 'BenchMNIST'
+GOAL = 'bench'
+READY = "Finished creating server and clients."
+
+# name, unit, higher is better
+METRICS = [
+    ('startup', 's', False),
+    ('train_samples_per_s', 'samples/s', True),
+    ('aggregate', 's', False),
+    ('evaluate', 's', False),
+    ('round', 's', False),
+    ('peak_rss', 'MB', False),
+    ('bytes_up', 'MB', False),
+    ('bytes_down', 'MB', False),
+]
+
+
+def generate_shards(num_clients, num_samples, seed=0):
+    """MNIST-shaped random shards, num_samples per client split 75/25 into train/test."""
+    dir_path = os.path.join(ROOT, 'dataset', DATASET)
+    config_path = os.path.join(dir_path, 'config.json')
+    config = {'num_clients': num_clients, 'num_samples': num_samples, 'seed': seed}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            if json.load(f) == config:
+                return
+
+    rng = np.random.RandomState(seed)
+    num_train = num_samples * 3 // 4
+    for split in ['train', 'test']:
+        os.makedirs(os.path.join(dir_path, split), exist_ok=True)
+    for i in range(num_clients):
+        x = rng.rand(num_samples, 1, 28, 28).astype(np.float32)
+        y = rng.randint(0, 10, num_samples).astype(np.int64)
+        for split, idx in [('train', slice(None, num_train)), ('test', slice(num_train, None))]:
+            with open(os.path.join(dir_path, split, str(i) + '.npz'), 'wb') as f:
+                np.savez_compressed(f, data={'x': x[idx], 'y': y[idx]})
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+
+
+def remove_results(algorithm):
+    result_path = os.path.join(ROOT, 'results')
+    for file_name in os.listdir(result_path) if os.path.exists(result_path) else []:
+        if file_name.startswith('{}_{}_{}_'.format(DATASET, algorithm, GOAL)):
+            os.remove(os.path.join(result_path, file_name))
+
+
+def run_algorithm(algorithm, args):
+    cmd = [sys.executable, '-u', 'main.py',
+           '-data', DATASET, '-m', 'CNN', '-algo', algorithm, '-go', GOAL,
+           '-gr', str(args.rounds), '-nc', str(args.clients), '-lbs', str(args.batch_size),
+           '-dev', 'cpu', '-prof', 'True', '-mfg', '1'] + args.extra
+    start = time.time()
+    startup = None
+    tail = []
+    proc = subprocess.Popen(cmd, cwd=SYSTEM, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, env=dict(os.environ, OMP_NUM_THREADS=str(args.threads)),
+                            start_new_session=True)
+    # killed by a timer rather than between lines, so a run that hangs silently is stopped too
+    timed_out = threading.Event()
+    def kill():
+        timed_out.set()
+        # the whole process group, as workers of the run keep stdout open
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    watchdog = threading.Timer(args.timeout, kill)
+    watchdog.start()
+    try:
+        for line in proc.stdout:
+            if startup is None and READY in line:
+                startup = time.time() - start
+            tail = (tail + [line.rstrip()])[-5:]
+        proc.wait()
+    finally:
+        watchdog.cancel()
+        proc.stdout.close()
+    if timed_out.is_set():
+        remove_results(algorithm)
+        return {'status': 'timeout'}
+
+    keys = ('profile_train', 'profile_train_samples', 'profile_aggregate', 'profile_evaluate',
+            'profile_round', 'profile_mem_rss_peak', 'bytes_up', 'bytes_down')
+    runs = query_results(os.path.join(ROOT, 'results'), keys=keys,
+                         dataset=DATASET, algorithm=algorithm, goal=GOAL)
+    remove_results(algorithm)
+    if proc.returncode != 0:
+        return {'status': 'failed', 'error': tail[-1] if len(tail) > 0 else ''}
+    if len(runs) == 0:
+        return {'status': 'failed', 'error': 'no results file'}
+    run = runs[0]
+
+    # round 0 includes one-off work such as allocating the device data, skip it if possible
+    steady = slice(1, None) if len(run['profile_round']) > 1 else slice(None)
+    # samples the clients actually trained on, over all local epochs and passes of the round
+    train = np.sum(run['profile_train'][steady]) if len(run['profile_train']) > 0 else 0.0
+    train_samples = np.sum(run['profile_train_samples'][steady]) if len(run['profile_train_samples']) > 0 else 0.0
+    return {
+        'status': 'ok',
+        'startup': startup,
+        'train_samples_per_s': float(train_samples / train) if train > 0 else 0.0,
+        'aggregate': float(np.mean(run['profile_aggregate'][steady])) if len(run['profile_aggregate']) > 0 else 0.0,
+        'evaluate': float(np.mean(run['profile_evaluate'][steady])) if len(run['profile_evaluate']) > 0 else 0.0,
+        'round': float(np.mean(run['profile_round'][steady])),
+        'peak_rss': float(np.max(run['profile_mem_rss_peak'])) / 2**20,
+        'bytes_up': float(np.mean(run['bytes_up'][steady])) / 2**20,
+        'bytes_down': float(np.mean(run['bytes_down'][steady])) / 2**20,
+    }
+
+
+def regressions(result, baseline, threshold):
+    """Metrics that are worse than the baseline by more than threshold (relative)."""
+    found = {}
+    for name, _, higher_is_better in METRICS:
+        new, old = result.get(name), baseline.get(name)
+        if new is None or old is None or old == 0:
+            continue
+        change = (new - old) / abs(old)
+        if (-change if higher_is_better else change) > threshold:
+            found[name] = change
+    return found
+
+
+def print_table(results, baseline=None, threshold=0.2):
+    labels = ["{} ({})".format(name, unit) for name, unit, _ in METRICS]
+    widths = [max(len(label), 14) + 2 for label in labels]
+    header = "{:<12s}".format('algorithm') + "".join(label.rjust(w) for label, w in zip(labels, widths))
+    print(header)
+    print('-' * len(header))
+    total = 0
+    for algorithm, result in results.items():
+        if result['status'] != 'ok':
+            print("{:<12s}{}: {}".format(algorithm, result['status'], result.get('error', '')))
+            continue
+        old = baseline.get(algorithm) if baseline is not None else None
+        worse = regressions(result, old, threshold) if old is not None and old['status'] == 'ok' else {}
+        total += len(worse)
+        cells = []
+        for (name, _, _), w in zip(METRICS, widths):
+            cell = "-" if result[name] is None else "{:.4g}".format(result[name])
+            if name in worse:
+                cell += " ({:+.0%})!".format(worse[name])
+            cells.append(cell.rjust(w))
+        print("{:<12s}".format(algorithm) + "".join(cells))
+    if baseline is not None:
+        print(f"\n{total} regressions above {threshold:.0%} compared with the baseline.")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-a', "--algorithms", type=str, nargs='*', default=None,
+                        help="Algorithms to run, all registered ones by default")
+    parser.add_argument('-gr', "--rounds", type=int, default=3)
+    parser.add_argument('-nc', "--clients", type=int, default=4)
+    parser.add_argument('-ns', "--samples", type=int, default=200,
+                        help="Synthetic samples per client, 3/4 of them for training")
+    parser.add_argument('-lbs', "--batch_size", type=int, default=10)
+    parser.add_argument('-th', "--threads", type=int, default=1,
+                        help="CPU threads per run, fixed so timings are comparable")
+    parser.add_argument('-to', "--timeout", type=float, default=600,
+                        help="Seconds before a run is killed")
+    parser.add_argument('-o', "--output", type=str, default=None,
+                        help="JSON file for the results, benchmarks/results/<date>.json by default")
+    parser.add_argument('-b', "--baseline", type=str, default=None,
+                        help="JSON file of an earlier benchmark to compare with")
+    parser.add_argument('-rt', "--threshold", type=float, default=0.2,
+                        help="Relative change counted as a regression")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="Arguments after -- are passed to main.py")
+    args = parser.parse_args()
+    args.extra = [a for a in args.extra if a != '--']
+
+    algorithms = args.algorithms if args.algorithms else list(ALGORITHMS.keys())
+    generate_shards(args.clients, args.samples)
+
+    results = {}
+    for algorithm in algorithms:
+        print(f"Running {algorithm} ...", flush=True)
+        results[algorithm] = run_algorithm(algorithm, args)
+
+    import torch
+    report = {
+        'meta': {
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'platform': platform.platform(),
+            'args': {k: v for k, v in vars(args).items() if k not in ['output', 'baseline']},
+        },
+        'algorithms': results,
+    }
+    output = args.output
+    if output is None:
+        output = os.path.join(ROOT, 'benchmarks', 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults: {output}\n")
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['algorithms']
+    found = print_table(results, baseline, args.threshold)
+    sys.exit(1 if found > 0 else 0)
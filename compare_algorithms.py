@@ -10,10 +10,14 @@ import subprocess
 import sys
 import numpy as np
 import matplotlib.pyplot as plt
-import h5py
 import pandas as pd
 from pathlib import Path
 
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'system'))
+from utils.result_utils import query_results
+from sweep import run_sweep
+
 # تنظیمات / Configuration
 CONFIG = {
     'dataset': 'MNIST',
@@ -37,12 +41,10 @@ def run_experiment(algorithm, config):
     print(f"شروع آزمایش {algorithm} / Starting {algorithm} experiment")
     print(f"{'='*60}\n")
     
-    # ساخت دستور / Build command
-    cmd = [
-        sys.executable, 'system/main.py',
+    # ساخت آرگومان‌ها / Build arguments
+    argv = [
         '-data', config['dataset'],
         '-m', config['model'],
-        '-algo', algorithm,
         '-gr', str(config['global_rounds']),
         '-ls', str(config['local_epochs']),
         '-lr', str(config['learning_rate']),
@@ -52,43 +54,46 @@ def run_experiment(algorithm, config):
         '-ncl', str(config['num_classes']),
         '-dev', config['device'],
         '-eg', str(config['eval_gap']),
-        '-t', str(config['times']),
-        '-go', 'comparison',
     ]
     
     # اضافه کردن پارامتر SR-FedAvg / Add SR-FedAvg parameter
     if algorithm == 'SR-FedAvg':
-        cmd.extend(['-srbeta', str(config['sr_beta'])])
+        argv.extend(['-srbeta', str(config['sr_beta'])])
     
-    # اجرای دستور / Execute command
+    # اجرا در همین پردازه، داده‌ها بین اجراها مشترک است / Run in this process, data is shared between runs
+    cwd = os.getcwd()
+    os.chdir(os.path.join(ROOT, 'system'))
     try:
-        result = subprocess.run(cmd, check=True, capture_output=False, text=True)
+        records = run_sweep([algorithm], range(config['times']), common=argv, goal='comparison')
+    finally:
+        os.chdir(cwd)
+    
+    if all(r['status'] == 'ok' for r in records):
         print(f"\n✓ آزمایش {algorithm} با موفقیت به پایان رسید")
         print(f"✓ {algorithm} experiment completed successfully")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n✗ خطا در اجرای {algorithm}: {e}")
-        print(f"✗ Error running {algorithm}: {e}")
+    else:
+        error = [r['error'] for r in records if r['status'] != 'ok'][0]
+        print(f"\n✗ خطا در اجرای {algorithm}: {error}")
+        print(f"✗ Error running {algorithm}: {error}")
         return False
 
 def load_results(dataset, algorithm, goal, times):
     """خواندن نتایج / Load results"""
     results = {'test_acc': [], 'test_auc': [], 'train_loss': []}
     
-    for t in range(times):
-        filename = f"results/{dataset}_{algorithm}_{goal}_{t}.h5"
-        
-        if os.path.exists(filename):
-            try:
-                with h5py.File(filename, 'r') as f:
-                    results['test_acc'].append(np.array(f['rs_test_acc']))
-                    results['test_auc'].append(np.array(f['rs_test_auc']))
-                    results['train_loss'].append(np.array(f['rs_train_loss']))
-                print(f"✓ بارگذاری {filename}")
-            except Exception as e:
-                print(f"✗ خطا در خواندن {filename}: {e}")
-        else:
-            print(f"⚠ فایل {filename} یافت نشد")
+    runs = query_results(os.path.join(ROOT, 'results'), keys=('rs_test_acc', 'rs_test_auc', 'rs_train_loss'), 
+                         dataset=dataset, algorithm=algorithm, goal=goal)
+    for run in runs:
+        if run['times'] >= times:
+            continue
+        results['test_acc'].append(run['rs_test_acc'])
+        results['test_auc'].append(run['rs_test_auc'])
+        results['train_loss'].append(run['rs_train_loss'])
+        print(f"✓ بارگذاری {dataset}_{algorithm}_{goal}_{run['times']}")
+    
+    if len(results['test_acc']) < times:
+        print(f"⚠ {times - len(results['test_acc'])} اجرای {algorithm} یافت نشد / runs of {algorithm} not found")
     
     # محاسبه میانگین / Calculate average
     if len(results['test_acc']) > 0:
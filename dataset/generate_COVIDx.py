@@ -10,12 +10,15 @@ from utils.dataset_utils import check, separate_data, split_data, save_file, Ima
 from torch.utils.data import DataLoader
 
 
-random.seed(1)
-np.random.seed(1)
+seed = 1
+random.seed(seed)
+np.random.seed(seed)
 num_clients = 20
 img_size = 64
 num_classes = 2
 dir_path = "COVIDx-0.1/"
+# generator parameters that change the shards, part of the dataset fingerprint
+extra = {'img_size': img_size}
 data_path = "COVIDx/"
 
 # first download rawdata from https://www.kaggle.com/datasets/andyczhao/covidx-cxr2/data
@@ -30,7 +33,8 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
     train_path = dir_path + "train/"
     test_path = dir_path + "test/"
 
-    if check(config_path, train_path, test_path, num_clients, niid, balance, partition):
+    if check(config_path, train_path, test_path, num_clients, niid, balance, partition, 
+             class_per_client=2, seed=seed, extra=extra):
         return
 
     if not os.path.exists(train_path):
@@ -118,7 +122,7 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
                                     niid, balance, partition, class_per_client=2)
     train_data, test_data = split_data(X, y)
     save_file(config_path, train_path, test_path, train_data, test_data, num_clients, num_classes, 
-        statistic, niid, balance, partition)
+        statistic, niid, balance, partition, class_per_client=2, seed=seed, extra=extra)
 
 
 if __name__ == "__main__":
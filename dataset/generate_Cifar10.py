@@ -8,8 +8,9 @@ import torchvision.transforms as transforms
 from utils.dataset_utils import check, separate_data, split_data, save_file
 
 
-random.seed(1)
-np.random.seed(1)
+seed = 1
+random.seed(seed)
+np.random.seed(seed)
 num_clients = 20
 dir_path = "Cifar10/"
 
@@ -24,7 +25,8 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
     train_path = dir_path + "train/"
     test_path = dir_path + "test/"
 
-    if check(config_path, train_path, test_path, num_clients, niid, balance, partition):
+    if check(config_path, train_path, test_path, num_clients, niid, balance, partition, 
+             class_per_client=2, seed=seed):
         return
         
     # Get Cifar10 data
@@ -67,7 +69,7 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
                                     niid, balance, partition, class_per_client=2)
     train_data, test_data = split_data(X, y)
     save_file(config_path, train_path, test_path, train_data, test_data, num_clients, num_classes, 
-        statistic, niid, balance, partition)
+        statistic, niid, balance, partition, class_per_client=2, seed=seed)
 
 
 if __name__ == "__main__":
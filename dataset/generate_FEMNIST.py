@@ -33,6 +33,7 @@ from utils.dataset_utils import check, separate_data, split_data, save_file
 
 
 ROOT_PATH = os.path.dirname(os.path.abspath(__file__)) 
+seed = 1
 
 def relabel(c):
     """
@@ -103,7 +104,8 @@ def generate_dataset(dataset, meta_path, save_path,  num_clients, num_classes, n
     train_path = os.path.join(save_path, 'train')
     test_path = os.path.join(save_path, 'test')
     
-    if check(config_path, train_path, test_path, num_clients, niid, balance, partition):
+    if check(config_path, train_path, test_path, num_clients, niid, balance, partition, 
+             seed=seed):
         return
 
     # Get MNIST data
@@ -134,7 +136,7 @@ def generate_dataset(dataset, meta_path, save_path,  num_clients, num_classes, n
         
     train_data, test_data = split_data(X, y)
     save_file(config_path, train_path, test_path, train_data, test_data, num_clients, num_classes, 
-        statistic, niid, balance, partition)
+        statistic, niid, balance, partition, seed=seed)
 
 
 if __name__ == "__main__":
@@ -148,8 +150,8 @@ if __name__ == "__main__":
     save_path = sys.argv[7] if len(sys.argv) > 7 else 'FEMNIST'
     num_classes = 62
     
-    random.seed(1)
-    np.random.seed(1)
+    random.seed(seed)
+    np.random.seed(seed)
     
     meta_path = os.path.join(dataset,'intermediate', meta_file_name)
     save_path = os.path.join(ROOT_PATH, save_path)
@@ -7,12 +7,15 @@ from utils.dataset_utils import check, separate_data, split_data, save_file
 from utils.language_utils import tokenizer
 
 
-random.seed(1)
-np.random.seed(1)
+seed = 1
+random.seed(seed)
+np.random.seed(seed)
 num_clients = 20
 max_len = 200
 max_tokens = 32000
 dir_path = "SogouNews/"
+# generator parameters that change the shards, part of the dataset fingerprint
+extra = {'max_len': max_len, 'max_tokens': max_tokens}
 
 
 # Allocate data to users
@@ -25,7 +28,8 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
     train_path = dir_path + "train/"
     test_path = dir_path + "test/"
 
-    if check(config_path, train_path, test_path, num_clients, niid, balance, partition):
+    if check(config_path, train_path, test_path, num_clients, niid, balance, partition, 
+             seed=seed, extra=extra):
         return
 
     # Get Sogou_News data
@@ -49,10 +53,6 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
     label_pipeline = lambda x: int(x) - 1
     label_list = [label_pipeline(l) for l in dataset_label]
 
-    text_lens = [len(text) for text in text_list]
-    text_list = [(text, l) for text, l in zip(text_list, text_lens)]
-
-    text_list = np.array(text_list)
     label_list = np.array(label_list)
 
     # dataset = []
@@ -64,7 +64,7 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
                                     niid, balance, partition)
     train_data, test_data = split_data(X, y)
     save_file(config_path, train_path, test_path, train_data, test_data, num_clients, num_classes, 
-        statistic, niid, balance, partition)
+        statistic, niid, balance, partition, seed=seed, extra=extra)
 
     print("The size of vocabulary:", len(vocab))
 
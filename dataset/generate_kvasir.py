@@ -10,11 +10,14 @@ from utils.dataset_utils import check, separate_data, split_data, save_file, Ima
 from torch.utils.data import DataLoader
 
 
-random.seed(1)
-np.random.seed(1)
+seed = 1
+random.seed(seed)
+np.random.seed(seed)
 num_clients = 20
 img_size = 64
 dir_path = "kvasir-0.1/"
+# generator parameters that change the shards, part of the dataset fingerprint
+extra = {'img_size': img_size}
 data_path = "kvasir/"
 
 # first download rawdata from https://datasets.simula.no/downloads/kvasir/kvasir-dataset-v2.zip
@@ -29,7 +32,8 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
     train_path = dir_path + "train/"
     test_path = dir_path + "test/"
 
-    if check(config_path, train_path, test_path, num_clients, niid, balance, partition):
+    if check(config_path, train_path, test_path, num_clients, niid, balance, partition, 
+             class_per_client=2, seed=seed, extra=extra):
         return
 
     if not os.path.exists(train_path):
@@ -73,7 +77,7 @@ def generate_dataset(dir_path, num_clients, niid, balance, partition):
                                     niid, balance, partition, class_per_client=2)
     train_data, test_data = split_data(X, y)
     save_file(config_path, train_path, test_path, train_data, test_data, num_clients, num_classes, 
-        statistic, niid, balance, partition)
+        statistic, niid, balance, partition, class_per_client=2, seed=seed, extra=extra)
 
 
 if __name__ == "__main__":
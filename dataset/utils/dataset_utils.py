@@ -1,5 +1,7 @@
 import os
 import ujson
+import hashlib
+import pickle
 import numpy as np
 import gc
 from sklearn.model_selection import train_test_split
@@ -11,20 +13,57 @@ batch_size = 10
 train_ratio = 0.75 # merge original training set and test set, then split it manually. 
 alpha = 0.1 # for Dirichlet distribution. 100 for exdir
 
+def fingerprint(num_clients, niid=False, balance=True, partition=None, 
+        class_per_client=None, seed=None, extra=None):
+    # hash every parameter that affects how the source data is partitioned, and
+    # in extra those of one generator, e.g. max_len of the text datasets
+    params = {
+        'num_clients': num_clients, 
+        'non_iid': niid, 
+        'balance': balance, 
+        'partition': partition, 
+        'class_per_client': class_per_client, 
+        'seed': seed, 
+        'alpha': alpha, 
+        'batch_size': batch_size, 
+        'train_ratio': train_ratio, 
+    }
+    if extra:
+        # only when given, so fingerprints of generators without extra stay the same
+        params['extra'] = extra
+    return hashlib.sha256(ujson.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def shard_hash(data_dict):
+    # content hash of one client shard, independent of the npz container
+    h = hashlib.sha256()
+    for key in sorted(data_dict.keys()):
+        value = np.asarray(data_dict[key])
+        h.update(key.encode())
+        if value.dtype == object:
+            h.update(pickle.dumps(value.tolist(), protocol=4))
+        else:
+            h.update(str(value.dtype).encode())
+            h.update(str(value.shape).encode())
+            h.update(np.ascontiguousarray(value).tobytes())
+    return h.hexdigest()
+
 def check(config_path, train_path, test_path, num_clients, niid=False, 
-        balance=True, partition=None):
+        balance=True, partition=None, class_per_client=None, seed=None, extra=None):
     # check existing dataset
     if os.path.exists(config_path):
         with open(config_path, 'r') as f:
             config = ujson.load(f)
-        if config['num_clients'] == num_clients and \
-            config['non_iid'] == niid and \
-            config['balance'] == balance and \
-            config['partition'] == partition and \
-            config['alpha'] == alpha and \
-            config['batch_size'] == batch_size:
-            print("\nDataset already generated.\n")
-            return True
+        if config.get('fingerprint') == fingerprint(num_clients, niid, balance, 
+                partition, class_per_client, seed, extra):
+            shards = config.get('shards', {'train': [], 'test': []})
+            missing = [train_path + str(idx) + '.npz' for idx in range(len(shards['train']))] + \
+                [test_path + str(idx) + '.npz' for idx in range(len(shards['test']))]
+            missing = [path for path in missing if not os.path.exists(path)]
+            if len(missing) == 0:
+                print("\nDataset already generated.\n")
+                return True
+            # the partition depends on all clients, so the whole dataset is generated again
+            print(f"\n{len(missing)} shards are missing, regenerating the dataset (unchanged shards are not rewritten).\n")
 
     dir_path = os.path.dirname(train_path)
     if not os.path.exists(dir_path):
@@ -231,7 +270,12 @@ def split_data(X, y):
     return train_data, test_data
 
 def save_file(config_path, train_path, test_path, train_data, test_data, num_clients, 
-                num_classes, statistic, niid=False, balance=True, partition=None):
+                num_classes, statistic, niid=False, balance=True, partition=None, 
+                class_per_client=None, seed=None, extra=None):
+    shards = {
+        'train': [shard_hash(train_dict) for train_dict in train_data], 
+        'test': [shard_hash(test_dict) for test_dict in test_data], 
+    }
     config = {
         'num_clients': num_clients, 
         'num_classes': num_classes, 
@@ -241,17 +285,31 @@ def save_file(config_path, train_path, test_path, train_data, test_data, num_cli
         'Size of samples for labels in clients': statistic, 
         'alpha': alpha, 
         'batch_size': batch_size, 
+        'class_per_client': class_per_client, 
+        'seed': seed, 
+        'train_ratio': train_ratio, 
+        'extra': extra or {}, 
+        'fingerprint': fingerprint(num_clients, niid, balance, partition, class_per_client, seed, extra), 
+        'shards': shards, 
     }
 
+    # shards whose content is unchanged since the last generation are kept as they are
+    old_shards = {'train': [], 'test': []}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            old_shards = ujson.load(f).get('shards', old_shards)
+
     # gc.collect()
     print("Saving to disk.\n")
 
-    for idx, train_dict in enumerate(train_data):
-        with open(train_path + str(idx) + '.npz', 'wb') as f:
-            np.savez_compressed(f, data=train_dict)
-    for idx, test_dict in enumerate(test_data):
-        with open(test_path + str(idx) + '.npz', 'wb') as f:
-            np.savez_compressed(f, data=test_dict)
+    for split, path, split_data_list in [('train', train_path, train_data), ('test', test_path, test_data)]:
+        for idx, data_dict in enumerate(split_data_list):
+            file_path = path + str(idx) + '.npz'
+            if idx < len(old_shards[split]) and old_shards[split][idx] == shards[split][idx] \
+                and os.path.exists(file_path):
+                continue
+            with open(file_path, 'wb') as f:
+                np.savez_compressed(f, data=data_dict)
     with open(config_path, 'w') as f:
         ujson.dump(config, f)
 
@@ -1,10 +1,12 @@
 """Utils for language models."""
 
+import os
 import re
 import numpy as np
 import json
+from collections import Counter
+from multiprocessing import Pool
 from torchtext.data.utils import get_tokenizer
-from torchtext.vocab import build_vocab_from_iterator
 
 
 # ------------------------
@@ -149,21 +151,86 @@ def val_to_vec(size, val):
     vec[int(val)] = 1
     return vec
 
-def tokenizer(text, max_len, max_tokens=32000):
-    tokenizer = get_tokenizer('basic_english')
-    vocab = build_vocab_from_iterator(
-        map(tokenizer, iter(text)), 
-        specials = ['<pad>', 'cls', '<unk>', '<eos>'],
-        special_first = True, 
-        max_tokens = max_tokens 
-    )
-    vocab.set_default_index(vocab['<unk>'])
-    text_pipeline = lambda x: vocab(tokenizer(x))
-
-    text_list = []
-    for t in text:
-        tokens = [vocab['<cls>']] + text_pipeline(t)
-        padding = [0 for i in range(max_len - len(tokens))]
-        tokens.extend(padding)
-        text_list.append(tokens[:max_len])
+# ------------------------
+# utils for AG_News and SogouNews datasets
+
+SPECIALS = ['<pad>', 'cls', '<unk>', '<eos>']
+
+_vocab = None
+_max_len = None
+
+def _count_tokens(texts):
+    '''counts the tokens of one chunk of documents
+    '''
+    tokenize = get_tokenizer('basic_english')
+    counter = Counter()
+    for t in texts:
+        counter.update(tokenize(t))
+    return counter
+
+
+def _init_indexer(vocab, max_len):
+    global _vocab, _max_len
+    _vocab = vocab
+    _max_len = max_len
+
+
+def _index_tokens(texts):
+    '''converts one chunk of documents into padded token indices
+
+    Return:
+        tokens: int32 array with shape (len(texts), max_len), 0 is <pad>
+    '''
+    tokenize = get_tokenizer('basic_english')
+    unk_id = _vocab['<unk>']
+    # 'cls' is registered without brackets, so this resolves to <unk> as it always has
+    cls_id = _vocab.get('<cls>', unk_id)
+    tokens = np.zeros((len(texts), _max_len), dtype=np.int32)
+    for i, t in enumerate(texts):
+        indl = [cls_id] + [_vocab.get(w, unk_id) for w in tokenize(t)]
+        indl = indl[:_max_len]
+        tokens[i, :len(indl)] = indl
+    return tokens
+
+
+def tokenizer(text, max_len, max_tokens=32000, num_workers=None):
+    '''tokenizes and indexes documents with a process pool
+
+    The vocabulary is built from per-chunk token counts merged in the parent 
+    process, keeping the specials and then the most frequent tokens (ties are 
+    broken alphabetically) like torchtext's build_vocab_from_iterator.
+
+    Args:
+        text: list of strings
+        max_len: length of the padded token sequences
+        max_tokens: maximum size of the vocabulary, including the specials
+        num_workers: number of worker processes, os.cpu_count() by default
+
+    Return:
+        vocab: dictionary with string tokens as keys and int indices as values
+        text_list: structured array with a fixed-length int32 'tokens' field 
+            and an int32 'len' field, one record per document
+    '''
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    chunk_size = max(1, int(np.ceil(len(text) / (num_workers * 4))))
+    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+
+    with Pool(num_workers) as pool:
+        counter = Counter()
+        for chunk_counter in pool.imap_unordered(_count_tokens, chunks):
+            counter.update(chunk_counter)
+
+    sorted_by_freq = sorted((w, c) for w, c in counter.items() if w not in SPECIALS)
+    sorted_by_freq.sort(key=lambda x: x[1], reverse=True)
+    itos = SPECIALS + [w for w, _ in sorted_by_freq[:max_tokens - len(SPECIALS)]]
+    vocab = {w: i for i, w in enumerate(itos)}
+
+    with Pool(num_workers, initializer=_init_indexer, initargs=(vocab, max_len)) as pool:
+        tokens = np.concatenate(pool.map(_index_tokens, chunks), axis=0)
+
+    text_list = np.empty(len(tokens), dtype=[('tokens', np.int32, (max_len,)), ('len', np.int32)])
+    text_list['tokens'] = tokens
+    # models consume the whole padded sequence, so the stored length stays max_len
+    text_list['len'] = max_len
     return vocab, text_list
@@ -15,7 +15,11 @@ class clientALA(Client):
 
         train_data = read_client_data(self.dataset, self.id, is_train=True, few_shot=self.few_shot)
         self.ALA = ALA(self.id, self.loss, train_data, self.batch_size, 
-                    self.rand_percent, self.layer_idx, self.eta, self.device)
+                    self.rand_percent, self.layer_idx, self.eta, self.device,
+                    load_data=self.load_rand_data, to_device=self.to_device)
+
+    def load_rand_data(self, start, stop):
+        return self.load_data(self.batch_size, is_train=True, drop_last=False, shuffle=False, start=start, stop=stop)
 
     def train(self):
         trainloader = self.load_train_data()
@@ -30,13 +34,7 @@ class clientALA(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -27,13 +27,7 @@ class clientAMP(Client):
 
         for epoch in range(max_local_epochs):
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
 
@@ -69,11 +63,7 @@ class clientAMP(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
 
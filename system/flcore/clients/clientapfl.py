@@ -34,13 +34,7 @@ class clientAPFL(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -88,11 +82,7 @@ class clientAPFL(Client):
         
         with torch.no_grad():
             for x, y in testloaderfull:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model_per(x)
 
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
@@ -116,11 +106,7 @@ class clientAPFL(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output_per = self.model_per(x)
                 loss_per = self.loss(output_per, y)
                 train_num += y.shape[0]
@@ -32,13 +32,7 @@ class clientAS(Client):
 
             for step in range(max_local_epochs):
                 for i, (x, y) in enumerate(trainloader):
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
-                    if self.train_slow:
-                        time.sleep(0.1 * np.abs(np.random.rand()))
+                    x, y = self.to_device(x, y)
                     output = self.model(x)
                     loss = self.loss(output, y)
                     self.optimizer.zero_grad()
@@ -61,8 +55,7 @@ class clientAS(Client):
             fim_trace_sum = 0
             for i, (x, y) in enumerate(self.load_train_data()):
                 # Forward pass
-                x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 outputs = self.model(x)
                 # Negative log likelihood as our loss
                 nll = -torch.nn.functional.log_softmax(outputs, dim=1)[range(len(y)), y].mean()
@@ -90,8 +83,7 @@ class clientAS(Client):
             fim_trace_sum = 0
             for i, (x, y) in enumerate(trainloader):
                 # Forward pass
-                x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 outputs = self.model(x)
                 # Negative log likelihood as our loss
                 nll = -torch.nn.functional.log_softmax(outputs, dim=1)[range(len(y)), y].mean()
@@ -118,8 +110,7 @@ class clientAS(Client):
         total = 0
         with torch.no_grad():
             for x, y in testloader:
-                x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 outputs = self.model(x)
                 _, predicted = outputs.max(1)
                 total += y.size(0)
@@ -22,13 +22,7 @@ class clientAVG(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -27,13 +27,7 @@ class clientBABU(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -53,8 +47,6 @@ class clientBABU(Client):
             old_param.data = new_param.data.clone()
 
     def fine_tune(self, which_module=['base', 'head']):
-        trainloader = self.load_train_data()
-        
         start_time = time.time()
         
         self.model.train()
@@ -66,16 +58,17 @@ class clientBABU(Client):
         if 'base' not in which_module:
             for param in self.model.base.parameters():
                 param.requires_grad = False
-            
+            # the head learns on features of the frozen base
+            trainloader = self.load_train_features(self.model.base)
+            model = self.model.head
+        else:
+            trainloader = self.load_train_data()
+            model = self.model
 
         for epoch in range(self.fine_tuning_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                output = self.model(x)
+                x, y = self.to_device(x, y)
+                output = model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
                 loss.backward()
@@ -6,7 +6,11 @@ import os
 from torch.utils.data import DataLoader
 from sklearn.preprocessing import label_binarize
 from sklearn import metrics
-from utils.data_utils import read_client_data
+from utils.data_utils import read_client_data, to_device, data_nbytes, stack_data, \
+    DeviceDataLoader, PrefetchLoader, FeatureLoader, has_random_layers
+from utils.profiler import RoundProfiler
+from utils.clock_utils import CountedLoader
+from utils.precision_utils import set_precision
 
 
 class Client(object):
@@ -16,7 +20,7 @@ class Client(object):
 
     def __init__(self, args, id, train_samples, test_samples, **kwargs):
         torch.manual_seed(0)
-        self.model = copy.deepcopy(args.model)
+        self.model = set_precision(copy.deepcopy(args.model), args.precision, args.device)
         self.algorithm = args.algorithm
         self.dataset = args.dataset
         self.device = args.device
@@ -30,6 +34,15 @@ class Client(object):
         self.learning_rate = args.local_learning_rate
         self.local_epochs = args.local_epochs
         self.few_shot = args.few_shot
+        self.num_workers = args.num_workers
+        self.prefetch = args.prefetch
+        self.device_data_limit = args.device_data_limit * 1024 * 1024
+        self.device_budget = args.device_budget
+        self.pin_memory = 'cuda' in str(self.device)
+        self.device_data = {}
+        self.feature_cache = not args.no_feature_cache
+        self.feature_dtype = torch.float16 if args.feature_cache_half else torch.float32
+        self.profiler = RoundProfiler()
 
         # check BatchNorm
         self.has_BatchNorm = False
@@ -42,6 +55,10 @@ class Client(object):
         self.send_slow = kwargs['send_slow']
         self.train_time_cost = {'num_rounds': 0, 'total_cost': 0.0}
         self.send_time_cost = {'num_rounds': 0, 'total_cost': 0.0}
+        # samples trained on in the current round, for the simulated clock
+        self.trained_samples = 0
+        # version of the server's global model this client holds
+        self.model_version = 0
 
         self.loss = nn.CrossEntropyLoss()
         self.optimizer = torch.optim.SGD(self.model.parameters(), lr=self.learning_rate)
@@ -55,14 +72,64 @@ class Client(object):
     def load_train_data(self, batch_size=None):
         if batch_size == None:
             batch_size = self.batch_size
-        train_data = read_client_data(self.dataset, self.id, is_train=True, few_shot=self.few_shot)
-        return DataLoader(train_data, batch_size, drop_last=True, shuffle=True)
+        loader = self.load_data(batch_size, is_train=True, drop_last=True, shuffle=True)
+        return CountedLoader(loader, self)
 
     def load_test_data(self, batch_size=None):
         if batch_size == None:
             batch_size = self.batch_size
-        test_data = read_client_data(self.dataset, self.id, is_train=False, few_shot=self.few_shot)
-        return DataLoader(test_data, batch_size, drop_last=False, shuffle=True)
+        return self.load_data(batch_size, is_train=False, drop_last=False, shuffle=True)
+
+    # start and stop select a contiguous slice of the data, e.g. for ALA
+    def load_data(self, batch_size, is_train, drop_last, shuffle, start=0, stop=None):
+        if is_train not in self.device_data:
+            data = read_client_data(self.dataset, self.id, is_train=is_train, few_shot=self.few_shot)
+            nbytes = data_nbytes(data)
+            if len(data) == 0 or nbytes > self.device_data_limit or not self.device_budget.take(nbytes):
+                return self.build_loader(data[start:stop], batch_size, drop_last=drop_last, shuffle=shuffle)
+            # small enough to keep resident on the device for the whole run
+            self.device_data[is_train] = stack_data(data, self.device)
+
+        X, Y = self.device_data[is_train]
+        if start != 0 or stop is not None:
+            X = [X[0][start:stop], X[1][start:stop]] if type(X) == type([]) else X[start:stop]
+            Y = Y[start:stop]
+        loader = DeviceDataLoader(X, Y, batch_size, drop_last=drop_last, shuffle=shuffle)
+        return self.profiler.timed_loader(loader)
+
+    def build_loader(self, data, batch_size, drop_last=False, shuffle=False):
+        loader = DataLoader(data, batch_size, drop_last=drop_last, shuffle=shuffle, 
+                            pin_memory=self.pin_memory, num_workers=self.num_workers, 
+                            persistent_workers=self.num_workers > 0)
+        if self.prefetch:
+            loader = PrefetchLoader(loader, self.device)
+        return self.profiler.timed_loader(loader)
+
+    def load_train_features(self, base, batch_size=None):
+        """Training batches of (base(x), y) for phases that only train on top of a frozen base.
+
+        Unless the base has batch norm or dropout, it runs once over the training
+        data and the features are cached for all epochs of the phase, so call
+        this again after the base changes.
+        """
+        if batch_size == None:
+            batch_size = self.batch_size
+        if not self.feature_cache or has_random_layers(base):
+            return FeatureLoader(self.load_train_data(batch_size), self.device, base, self.pin_memory)
+
+        reps, ys = [], []
+        with torch.no_grad():
+            for x, y in self.load_data(batch_size, is_train=True, drop_last=False, shuffle=False):
+                x, y = self.to_device(x, y)
+                reps.append(base(x).to(self.feature_dtype))
+                ys.append(y)
+        Y = torch.cat(ys)
+        self.trained_samples += len(Y)
+        loader = DeviceDataLoader(torch.cat(reps), Y, batch_size, drop_last=True, shuffle=True)
+        return FeatureLoader(loader, self.device)
+
+    def to_device(self, x, y):
+        return to_device(x, y, self.device, non_blocking=self.pin_memory)
         
     def set_parameters(self, model):
         for new_param, old_param in zip(model.parameters(), self.model.parameters()):
@@ -90,11 +157,7 @@ class Client(object):
         
         with torch.no_grad():
             for x, y in testloaderfull:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
 
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
@@ -129,11 +192,7 @@ class Client(object):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 train_num += y.shape[0]
@@ -3,15 +3,38 @@ import time
 import torch
 import torch.nn as nn
 import copy
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
 from flcore.clients.clientbase import Client
 
+
+# masks over all model parameters are kept as bits, 8 parameters per byte
+
+_BIT_WEIGHTS = {}
+
+
+def pack_mask(mask):
+    """Flat bool mask -> uint8 tensor of ceil(len / 8) bytes."""
+    mask = mask.reshape(-1)
+    padded = torch.zeros((mask.numel() + 7) // 8 * 8, dtype=torch.uint8, device=mask.device)
+    padded[:mask.numel()] = mask
+    if mask.device not in _BIT_WEIGHTS:
+        _BIT_WEIGHTS[mask.device] = 2 ** torch.arange(8, dtype=torch.uint8, device=mask.device)
+    return (padded.view(-1, 8) * _BIT_WEIGHTS[mask.device]).sum(dim=1, dtype=torch.uint8)
+
+
+def unpack_mask(packed, numel):
+    """uint8 tensor from pack_mask -> flat bool mask of numel entries."""
+    shifts = torch.arange(8, dtype=torch.uint8, device=packed.device)
+    return ((packed.unsqueeze(1) >> shifts) & 1).view(-1)[:numel].bool()
+
+
 class clientCAC(Client):
     def __init__(self, args, id, train_samples, test_samples, **kwargs):
         super().__init__(args, id, train_samples, test_samples, **kwargs)
         self.args = args
-        self.critical_parameter = None  # record the critical parameter positions in FedCAC
+        self.critical_parameter = None  # record the critical parameter positions in FedCAC, bit-packed
         self.customized_model = copy.deepcopy(self.model)  # customized global model
-        self.critical_parameter, self.global_mask, self.local_mask = None, None, None
+        self.num_params = sum(p.numel() for p in self.model.parameters())
 
     def train(self):
         trainloader = self.load_train_data()
@@ -30,13 +53,7 @@ class clientCAC(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -49,7 +66,7 @@ class clientCAC(Client):
         # self.model.to('cpu')
 
         # select the critical parameters
-        self.critical_parameter, self.global_mask, self.local_mask = self.evaluate_critical_parameter(
+        self.critical_parameter = self.evaluate_critical_parameter(
             prevModel=initial_model, model=self.model, tau=self.args.tau
         )
 
@@ -61,13 +78,8 @@ class clientCAC(Client):
         Overview:
             Implement critical parameter selection.
         """
-        global_mask = []  # mark non-critical parameter
-        local_mask = []  # mark critical parameter
         critical_parameter = []
 
-        # self.model.to(self.device)
-        # prevModel.to(self.device)
-
         # select critical parameters in each layer
         for (name1, prevparam), (name2, param) in zip(prevModel.named_parameters(), model.named_parameters()):
             g = (param.data - prevparam.data)
@@ -87,35 +99,19 @@ class clientCAC(Client):
                 else:
                     thresh = new_metric.sort()[0][0]
 
-            # Get the local mask and global mask
-            mask = (c >= thresh).int().to('cpu')
-            global_mask.append((c < thresh).int().to('cpu'))
-            local_mask.append(mask)
-            critical_parameter.append(mask.view(-1))
+            # critical parameters are local, the others are taken from the global model
+            critical_parameter.append(metric >= thresh)
         model.zero_grad()
-        critical_parameter = torch.cat(critical_parameter)
-
-        # self.model.to('cpu')
-        # prevModel.to('cpu')
 
-        return critical_parameter, global_mask, local_mask
+        return pack_mask(torch.cat(critical_parameter))
 
     def set_parameters(self, model):
-        if self.local_mask is not None:
-            # self.model.to(self.device)
-            # model.to(self.device)
-            # self.customized_model.to(self.device)
-
-            index = 0
-            for (name1, param1), (name2, param2), (name3, param3) in zip(
-                    self.model.named_parameters(), model.named_parameters(),
-                    self.customized_model.named_parameters()):
-                param1.data = self.local_mask[index].to(self.device).float() * param3.data + \
-                              self.global_mask[index].to(self.args.device).float() * param2.data
-                index += 1
-
-            # self.model.to('cpu')
-            # model.to('cpu')
-            # self.customized_model.to('cpu')
+        if self.critical_parameter is not None:
+            local_mask = unpack_mask(self.critical_parameter, self.num_params)
+            with torch.no_grad():
+                vector_to_parameters(torch.where(local_mask, 
+                                                 parameters_to_vector(self.customized_model.parameters()), 
+                                                 parameters_to_vector(model.parameters())), 
+                                     self.model.parameters())
         else:
-            super().set_parameters(model)
\ No newline at end of file
+            super().set_parameters(model)
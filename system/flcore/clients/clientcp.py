@@ -78,11 +78,7 @@ class clientCP(Client):
         
         with torch.no_grad():
             for x, y in testloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x, is_rep=False, context=self.context)
 
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
@@ -120,11 +116,7 @@ class clientCP(Client):
             self.model.gate.gm = []
             self.pm_train = []
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output, rep, rep_base = self.model(x, is_rep=True, context=self.context)
                 loss = self.loss(output, y)
                 loss += MMD(rep, rep_base, 'rbf', self.device) * self.lamda
@@ -10,6 +10,7 @@ class clientDA(Client):
         super().__init__(args, id, train_samples, test_samples, **kwargs)
 
         self.lamda = args.lamda
+        self.shared_pass = args.da_shared_pass
 
         self.global_head = copy.deepcopy(self.model.head)
         self.opt_ghead = torch.optim.SGD(self.global_head.parameters(), lr=self.learning_rate)
@@ -31,27 +32,33 @@ class clientDA(Client):
         if self.train_slow:
             max_local_epochs = np.random.randint(1, max_local_epochs // 2)
 
+        if self.shared_pass:
+            self.train_shared_pass(trainloader, max_local_epochs)
+        else:
+            self.train_two_passes(trainloader, max_local_epochs)
+
+        # self.model.cpu()
+
+        if self.learning_rate_decay:
+            self.learning_rate_scheduler.step()
+            self.learning_rate_scheduler_ghead.step()
+
+        self.train_time_cost['num_rounds'] += 1
+        self.train_time_cost['total_cost'] += time.time() - start_time
+
+    def train_two_passes(self, trainloader, max_local_epochs):
         # local_update_regularized
         for param in self.model.base.parameters():
             param.requires_grad = False
         for param in self.model.head.parameters():
             param.requires_grad = True
 
+        featureloader = self.load_train_features(self.model.base)
         for epoch in range(max_local_epochs):
-            for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
-                output = self.model(x)
+            for i, (rep, y) in enumerate(featureloader):
+                output = self.model.head(rep)
                 loss = self.loss(output, y)
-
-                gm = torch.cat([p.data.view(-1) for p in self.global_head.parameters()], dim=0)
-                pm = torch.cat([p.data.view(-1) for p in self.model.head.parameters()], dim=0)
-                loss += torch.norm(gm-pm, p=2) * self.lamda
+                loss += self.head_distance() * self.lamda
 
                 self.optimizer.zero_grad()
                 loss.backward()
@@ -65,13 +72,7 @@ class clientDA(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 output = self.global_head(rep)
                 loss = self.loss(output, y)
@@ -81,14 +82,32 @@ class clientDA(Client):
                 self.optimizer.step()
                 self.opt_ghead.step()
 
-        # self.model.cpu()
+    # both updates from one forward pass of the base per batch, the head learns on detached features
+    def train_shared_pass(self, trainloader, max_local_epochs):
+        for param in self.model.parameters():
+            param.requires_grad = True
 
-        if self.learning_rate_decay:
-            self.learning_rate_scheduler.step()
-            self.learning_rate_scheduler_ghead.step()
+        for epoch in range(max_local_epochs):
+            for i, (x, y) in enumerate(trainloader):
+                x, y = self.to_device(x, y)
+                rep = self.model.base(x)
+                loss = self.loss(self.model.head(rep.detach()), y)
+                loss += self.head_distance() * self.lamda
+                loss += self.loss(self.global_head(rep), y)
+                self.optimizer.zero_grad()
+                self.opt_ghead.zero_grad()
+                loss.backward()
+                self.optimizer.step()
+                self.opt_ghead.step()
 
-        self.train_time_cost['num_rounds'] += 1
-        self.train_time_cost['total_cost'] += time.time() - start_time
+        for param in self.model.head.parameters():
+            param.requires_grad = False
+
+    # L2 distance between the personalized and the global head, a constant in the loss (no gradient)
+    def head_distance(self):
+        with torch.no_grad():
+            diffs = torch._foreach_sub(list(self.model.head.parameters()), list(self.global_head.parameters()))
+            return torch.linalg.vector_norm(torch.stack(torch._foreach_norm(diffs)))
 
     def set_parameters(self, global_head):
         for new_param, old_param in zip(global_head.parameters(), self.global_head.parameters()):
@@ -5,7 +5,6 @@ import time
 from flcore.clients.clientbase import Client
 from sklearn.preprocessing import label_binarize
 from sklearn import metrics
-from torch.autograd import Variable
 
 
 class clientDBE(Client):
@@ -16,21 +15,11 @@ class clientDBE(Client):
         self.momentum = args.momentum
         self.global_mean = None
 
-        trainloader = self.load_train_data()        
-        for x, y in trainloader:
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
-            with torch.no_grad():
-                rep = self.model.base(x).detach()
-            break
-        self.running_mean = torch.zeros_like(rep[0])
+        # created on the first training batch, which gives the feature map shape
+        self.running_mean = None
         self.num_batches_tracked = torch.tensor(0, dtype=torch.long, device=self.device)
-
-        self.client_mean = nn.Parameter(Variable(torch.zeros_like(rep[0])))
-        self.opt_client_mean = torch.optim.SGD([self.client_mean], lr=self.learning_rate)
+        self.client_mean = None
+        self.opt_client_mean = None
 
 
     def train(self):
@@ -47,28 +36,20 @@ class clientDBE(Client):
         self.reset_running_stats()
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                     
                 # ====== begin
                 rep = self.model.base(x)
-                running_mean = torch.mean(rep, dim=0)
-
-                if self.num_batches_tracked is not None:
-                    self.num_batches_tracked.add_(1)
-
-                self.running_mean = (1-self.momentum) * self.running_mean + self.momentum * running_mean
+                if self.running_mean is None:
+                    self.init_stats(rep)
+                running_mean = self.update_running_mean(rep)
                 
                 if self.global_mean is not None:
-                    reg_loss = torch.mean(0.5 * (self.running_mean - self.global_mean)**2)
                     output = self.model.head(rep + self.client_mean)
                     loss = self.loss(output, y)
-                    loss = loss + reg_loss * self.klw
+                    if self.klw != 0:
+                        reg_loss = torch.mean(0.5 * (running_mean - self.global_mean)**2)
+                        loss = loss + reg_loss * self.klw
                 else:
                     output = self.model.head(rep)
                     loss = self.loss(output, y)
@@ -79,7 +60,6 @@ class clientDBE(Client):
                 loss.backward()
                 self.optimizer.step()
                 self.opt_client_mean.step()
-                self.detach_running()
 
         # self.model.cpu()
 
@@ -90,12 +70,33 @@ class clientDBE(Client):
         self.train_time_cost['total_cost'] += time.time() - start_time
 
 
+    def init_stats(self, rep):
+        self.running_mean = torch.zeros_like(rep[0]).detach()
+        self.client_mean = nn.Parameter(torch.zeros_like(self.running_mean))
+        self.opt_client_mean = torch.optim.SGD([self.client_mean], lr=self.learning_rate)
+
     def reset_running_stats(self):
-        self.running_mean.zero_()
+        if self.running_mean is not None:
+            self.running_mean.zero_()
         self.num_batches_tracked.zero_()
 
-    def detach_running(self):
-        self.running_mean.detach_()
+    # updates the moving average of the batch feature means in place, and returns it
+    # with the gradient of the current batch when the regularizer needs it
+    def update_running_mean(self, rep):
+        self.num_batches_tracked.add_(1)
+        if self.global_mean is not None and self.klw != 0:
+            running_mean = (1-self.momentum) * self.running_mean + self.momentum * torch.mean(rep, dim=0)
+            self.running_mean.copy_(running_mean.detach())
+            return running_mean
+        with torch.no_grad():
+            self.running_mean.mul_(1-self.momentum).add_(torch.mean(rep, dim=0), alpha=self.momentum)
+        return self.running_mean
+
+    def personalize(self, rep):
+        # clients that never trained have no client mean yet, i.e. a zero one
+        if self.client_mean is None:
+            return rep
+        return rep + self.client_mean
 
     def train_metrics(self):
         trainloader = self.load_train_data()
@@ -105,13 +106,9 @@ class clientDBE(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
-                output = self.model.head(rep + self.client_mean)
+                output = self.model.head(self.personalize(rep))
                 loss = self.loss(output, y)
                 train_num += y.shape[0]
                 losses += loss.item() * y.shape[0]
@@ -126,17 +123,12 @@ class clientDBE(Client):
         test_num = 0
         y_prob = []
         y_true = []
-        reps = []
         
         with torch.no_grad():
             for x, y in testloaderfull:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
-                output = self.model.head(rep + self.client_mean)
+                output = self.model.head(self.personalize(rep))
 
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
                 test_num += y.shape[0]
@@ -149,7 +141,6 @@ class clientDBE(Client):
                 if self.num_classes == 2:
                     lb = lb[:, :2]
                 y_true.append(lb)
-                reps.extend(rep.detach())
 
         y_prob = np.concatenate(y_prob, axis=0)
         y_true = np.concatenate(y_true, axis=0)
@@ -38,13 +38,7 @@ class clientDitto(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -75,18 +69,12 @@ class clientDitto(Client):
 
         for epoch in range(max_local_epochs):
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model_per(x)
                 loss = self.loss(output, y)
                 self.optimizer_per.zero_grad()
                 loss.backward()
-                self.optimizer_per.step(self.model.parameters(), self.device)
+                self.optimizer_per.step(self.model.parameters())
 
         # self.model.cpu()
 
@@ -105,11 +93,7 @@ class clientDitto(Client):
         
         with torch.no_grad():
             for x, y in testloaderfull:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model_per(x)
 
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
@@ -135,11 +119,7 @@ class clientDitto(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model_per(x)
                 loss = self.loss(output, y)
 
@@ -3,7 +3,6 @@ import numpy as np
 import time
 import copy
 from flcore.clients.clientbase import Client
-from torch.utils.data import DataLoader
 from utils.data_utils import read_client_data
 
 
@@ -27,6 +26,8 @@ class clientFomo(Client):
 
         self.aggregate_parameters(val_loader)
         self.clone_model(self.model, self.old_model)
+        # the received models are decoded copies, only needed for the aggregation
+        self.received_models = []
 
         # self.model.to(self.device)
         self.model.train()
@@ -37,13 +38,7 @@ class clientFomo(Client):
 
         for epoch in range(max_local_epochs):
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -67,8 +62,8 @@ class clientFomo(Client):
         val_data = train_data[val_idx:]
         train_data = train_data[:val_idx]
 
-        trainloader = DataLoader(train_data, self.batch_size, drop_last=True, shuffle=False)
-        val_loader = DataLoader(val_data, self.batch_size, drop_last=self.has_BatchNorm, shuffle=False)
+        trainloader = self.build_loader(train_data, self.batch_size, drop_last=True, shuffle=False)
+        val_loader = self.build_loader(val_data, self.batch_size, drop_last=self.has_BatchNorm, shuffle=False)
 
         return trainloader, val_loader
 
@@ -81,11 +76,7 @@ class clientFomo(Client):
         train_num = 0
         loss = 0
         for x, y in trainloader:
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
+            x, y = self.to_device(x, y)
             output = self.model(x)
             train_num += y.shape[0]
             loss += self.loss(output, y).item() * y.shape[0]
@@ -139,11 +130,7 @@ class clientFomo(Client):
     def recalculate_loss(self, new_model, val_loader):
         L = 0
         for x, y in val_loader:
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
+            x, y = self.to_device(x, y)
             output = new_model(x)
             loss = self.loss(output, y)
             L += loss.item()
@@ -13,11 +13,7 @@ class clientGC(Client):
 
         trainloader = self.load_train_data()
         for x, y in trainloader:
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
+            x, y = self.to_device(x, y)
             with torch.no_grad():
                 rep = self.model.base(x).detach()
             break
@@ -35,6 +31,7 @@ class clientGC(Client):
                 self.classes_index.append(idx)
                 self.index_classes[idx] += len(self.classes_index) - 1
         self.classes_index = torch.tensor(self.classes_index, device=self.device)
+        self.index_classes = self.index_classes.to(self.device)
         self.num_classes = torch.sum(sample_per_class > 0).item()
         print(f'Client {self.id} has {self.num_classes} classes.')
 
@@ -59,13 +56,8 @@ class clientGC(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = self.index_classes[y].to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
+                y = self.index_classes[y]
                 output = self.model(x)
                 loss = self.loss(output, y) # softmax loss
                 self.optimizer.zero_grad()
@@ -102,11 +94,8 @@ class clientGC(Client):
         
         with torch.no_grad():
             for x, y in testloaderfull:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = self.index_classes[y].to(self.device)
+                x, y = self.to_device(x, y)
+                y = self.index_classes[y]
                 output = self.model(x)
 
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
@@ -142,11 +131,8 @@ class clientGC(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = self.index_classes[y].to(self.device)
+                x, y = self.to_device(x, y)
+                y = self.index_classes[y]
                 output = self.model(x)
                 loss = self.loss(output, y)
                 train_num += y.shape[0]
@@ -10,11 +10,7 @@ class clientGen(Client):
 
         trainloader = self.load_train_data()
         for x, y in trainloader:
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
+            x, y = self.to_device(x, y)
             with torch.no_grad():
                 rep = self.model.base(x).detach()
             break
@@ -23,12 +19,13 @@ class clientGen(Client):
         self.sample_per_class = torch.zeros(self.num_classes)
         trainloader = self.load_train_data()
         for x, y in trainloader:
-            for yy in y:
-                self.sample_per_class[yy.item()] += 1
+            self.sample_per_class += torch.bincount(y.cpu(), minlength=self.num_classes)
 
-        self.qualified_labels = []
+        # training samples per class over all clients, set by the server
+        self.label_counts = None
         self.generative_model = None
         self.localize_feature_extractor = args.localize_feature_extractor
+        self.gen_pool_batches = args.gen_pool_batches
         
 
     def train(self):
@@ -42,21 +39,14 @@ class clientGen(Client):
         if self.train_slow:
             max_local_epochs = np.random.randint(1, max_local_epochs // 2)
 
+        pool = self.generate_pool()
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 
-                labels = np.random.choice(self.qualified_labels, self.batch_size)
-                labels = torch.LongTensor(labels).to(self.device)
-                z = self.generative_model(labels)
+                labels, z = self.generate(pool)
                 loss += self.loss(self.model.head(z), labels)
 
                 self.optimizer.zero_grad()
@@ -70,7 +60,23 @@ class clientGen(Client):
 
         self.train_time_cost['num_rounds'] += 1
         self.train_time_cost['total_cost'] += time.time() - start_time
-            
+
+    # gen_pool_batches batches of generated features drawn once and reused for the round
+    def generate_pool(self):
+        if self.gen_pool_batches <= 0:
+            return None
+        labels = sample_labels(self.label_counts, self.gen_pool_batches * self.batch_size)
+        with torch.no_grad():
+            return labels, self.generative_model(labels)
+
+    # a batch of labels and generated features, the generator only provides inputs to the head
+    def generate(self, pool=None):
+        if pool is not None:
+            idx = torch.randint(len(pool[0]), (self.batch_size,), device=pool[0].device)
+            return pool[0][idx], pool[1][idx]
+        labels = sample_labels(self.label_counts, self.batch_size)
+        with torch.no_grad():
+            return labels, self.generative_model(labels)
         
     def set_parameters(self, model, generative_model):
         if self.localize_feature_extractor:
@@ -92,17 +98,11 @@ class clientGen(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 
-                labels = np.random.choice(self.qualified_labels, self.batch_size)
-                labels = torch.LongTensor(labels).to(self.device)
-                z = self.generative_model(labels)
+                labels, z = self.generate()
                 loss += self.loss(self.model.head(z), labels)
                 
                 train_num += y.shape[0]
@@ -112,3 +112,8 @@ class clientGen(Client):
         # self.save_model(self.model, 'model')
 
         return losses, train_num
+
+
+def sample_labels(label_counts, num_samples):
+    """Labels drawn with the frequencies of label_counts, on its device."""
+    return torch.multinomial(label_counts, num_samples, replacement=True)
@@ -34,8 +34,7 @@ class clientGPFL(Client):
         trainloader = self.load_train_data()
         self.sample_per_class = torch.zeros(self.num_classes).to(self.device)
         for x, y in trainloader:
-            for yy in y:
-                self.sample_per_class[yy.item()] += 1
+            self.sample_per_class += torch.bincount(y.to(self.device), minlength=self.num_classes)
         self.sample_per_class = self.sample_per_class / torch.sum(
             self.sample_per_class)
         
@@ -53,13 +52,7 @@ class clientGPFL(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 feat = self.model.base(x)
 
                 feat_P = self.CoV(feat, self.personalized_conditional_input)
@@ -71,9 +64,7 @@ class clientGPFL(Client):
                 loss = self.loss(output, y)
                 loss += softmax_loss
 
-                emb = torch.zeros_like(feat)
-                for i, yy in enumerate(y):
-                    emb[i, :] = self.GCE_frozen.embedding(yy).detach().data
+                emb = self.GCE_frozen.embedding.weight.detach()[y]
                 loss += torch.norm(feat_G - emb, 2) * self.lamda
 
                 self.optimizer.zero_grad()
@@ -102,10 +93,10 @@ class clientGPFL(Client):
         self.generic_conditional_input = torch.zeros(self.feature_dim).to(self.device)
         self.personalized_conditional_input = torch.zeros(self.feature_dim).to(self.device)
 
-        embeddings = self.GCE.embedding(torch.tensor(range(self.num_classes), device=self.device))
-        for l, emb in enumerate(embeddings):
-            self.generic_conditional_input.data += emb / self.num_classes
-            self.personalized_conditional_input.data += emb * self.sample_per_class[l]
+        with torch.no_grad():
+            embeddings = self.GCE.embedding.weight
+            self.generic_conditional_input += embeddings.sum(dim=0) / self.num_classes
+            self.personalized_conditional_input += self.sample_per_class @ embeddings
 
         for new_param, old_param in zip(GCE.parameters(), self.GCE.parameters()):
             old_param.data = new_param.data.clone()
@@ -129,11 +120,7 @@ class clientGPFL(Client):
         
         with torch.no_grad():
             for x, y in testloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 feat = self.model.base(x)
 
                 feat_P = self.CoV(feat, self.personalized_conditional_input)
@@ -169,11 +156,7 @@ class clientGPFL(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 feat = self.model.base(x)
 
@@ -186,9 +169,7 @@ class clientGPFL(Client):
                 loss = self.loss(output, y)
                 loss += softmax_loss
 
-                emb = torch.zeros_like(feat)
-                for i, yy in enumerate(y):
-                    emb[i, :] = self.GCE_frozen.embedding(yy).detach().data
+                emb = self.GCE_frozen.embedding.weight.detach()[y]
                 loss += torch.norm(feat_G - emb, 2) * self.lamda
 
                 train_num += y.shape[0]
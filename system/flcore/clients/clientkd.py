@@ -49,13 +49,7 @@ class clientKD(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 rep_g = self.global_model.base(x)
                 output = self.model.head(rep)
@@ -120,11 +114,7 @@ class clientKD(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 rep_g = self.global_model.base(x)
                 output = self.model.head(rep)
@@ -3,6 +3,7 @@ import torch
 import numpy as np
 import time
 from flcore.clients.clientbase import Client
+from flcore.losses.fedloss import calibrated_loss
 
 
 class clientLC(Client):
@@ -12,8 +13,8 @@ class clientLC(Client):
         self.sample_per_class = torch.zeros(self.num_classes).to(self.device)
         trainloader = self.load_train_data()
         for x, y in trainloader:
-            for yy in y:
-                self.sample_per_class[yy.item()] += 1
+            self.sample_per_class += torch.bincount(y, minlength=self.num_classes).to(self.device)
+        # per-class logit offsets, set by the server
         self.calibration = None
 
     def train(self):
@@ -29,15 +30,9 @@ class clientLC(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
-                loss = self.loss(output - self.calibration, y)
+                loss = calibrated_loss(y, output, self.calibration)
                 # output = self.model(x)
                 # loss = self.logits_calibration(feat, y)
                 self.optimizer.zero_grad()
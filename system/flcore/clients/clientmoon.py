@@ -2,7 +2,9 @@ import copy
 import torch
 import numpy as np
 import time
+import torch.nn as nn
 import torch.nn.functional as F
+from torch.func import functional_call, vmap
 from flcore.clients.clientbase import Client
 
 
@@ -16,6 +18,13 @@ class clientMOON(Client):
         self.global_model = None
         self.old_model = copy.deepcopy(self.model)
 
+        # the frozen bases of old_model and global_model stacked for one vmapped pass, 
+        # refreshed whenever one of them changes
+        self.frozen = None
+        self.frozen_stale = True
+        self.batch_frozen = 'cuda' in str(self.device) and not any(
+            isinstance(m, (nn.modules.batchnorm._BatchNorm, nn.Dropout)) for m in self.model.base.modules())
+
     def train(self):
         trainloader = self.load_train_data()
         start_time = time.time()
@@ -29,28 +38,20 @@ class clientMOON(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 output = self.model.head(rep)
                 loss = self.loss(output, y)
 
-                rep_old = self.old_model.base(x).detach()
-                rep_global = self.global_model.base(x).detach()
-                loss_con = - torch.log(torch.exp(F.cosine_similarity(rep, rep_global) / self.tau) / (torch.exp(F.cosine_similarity(rep, rep_global) / self.tau) + torch.exp(F.cosine_similarity(rep, rep_old) / self.tau)))
-                loss += self.mu * torch.mean(loss_con)
+                loss += self.mu * self.contrastive_loss(rep, x)
 
                 self.optimizer.zero_grad()
                 loss.backward()
                 self.optimizer.step()
 
         # self.model.cpu()
-        self.old_model = copy.deepcopy(self.model)
+        self.old_model.load_state_dict(self.model.state_dict())
+        self.frozen_stale = True
 
         if self.learning_rate_decay:
             self.learning_rate_scheduler.step()
@@ -64,6 +65,39 @@ class clientMOON(Client):
             old_param.data = new_param.data.clone()
 
         self.global_model = model
+        self.frozen_stale = True
+
+    def frozen_reps(self, x):
+        if self.batch_frozen and self.frozen_stale:
+            bases = [self.old_model.base, self.global_model.base]
+            shapes = [[(n, p.shape) for n, p in b.named_parameters()] for b in bases]
+            if shapes[0] == shapes[1]:
+                if self.frozen is None:
+                    self.frozen = {n: torch.empty((2,) + p.shape, dtype=p.dtype, device=p.device) 
+                                   for n, p in bases[0].named_parameters()}
+                with torch.no_grad():
+                    for k, base in enumerate(bases):
+                        for n, p in base.named_parameters():
+                            self.frozen[n][k].copy_(p)
+            else:
+                self.frozen = None
+            self.frozen_stale = False
+
+        with torch.inference_mode():
+            if self.batch_frozen and self.frozen is not None:
+                reps = vmap(lambda params, x: functional_call(self.old_model.base, params, (x,)), 
+                            in_dims=(0, None))(self.frozen, x)
+                rep_old, rep_global = reps[0], reps[1]
+            else:
+                rep_old = self.old_model.base(x)
+                rep_global = self.global_model.base(x)
+        # inference tensors cannot be saved for the backward of the loss
+        return rep_old.clone(), rep_global.clone()
+
+    def contrastive_loss(self, rep, x):
+        rep_old, rep_global = self.frozen_reps(x)
+        logits = torch.stack([F.cosine_similarity(rep, rep_global), F.cosine_similarity(rep, rep_old)], dim=1) / self.tau
+        return -torch.mean(F.log_softmax(logits, dim=1)[:, 0])
 
     def train_metrics(self):
         trainloader = self.load_train_data()
@@ -75,19 +109,12 @@ class clientMOON(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 output = self.model.head(rep)
                 loss = self.loss(output, y)
 
-                rep_old = self.old_model.base(x).detach()
-                rep_global = self.global_model.base(x).detach()
-                loss_con = - torch.log(torch.exp(F.cosine_similarity(rep, rep_global) / self.tau) / (torch.exp(F.cosine_similarity(rep, rep_global) / self.tau) + torch.exp(F.cosine_similarity(rep, rep_old) / self.tau)))
-                loss += self.mu * torch.mean(loss_con)
+                loss += self.mu * self.contrastive_loss(rep, x)
                 train_num += y.shape[0]
                 losses += loss.item() * y.shape[0]
 
@@ -5,6 +5,7 @@ import numpy as np
 import time
 import torch.nn.functional as F
 from flcore.clients.clientbase import Client
+from flcore.losses.fedloss import ntd_loss, not_true_index
 
 
 class clientNTD(Client):
@@ -15,7 +16,7 @@ class clientNTD(Client):
         self.tau = args.tau
 
         self.global_model = None
-        self.KLDiv = nn.KLDivLoss(reduction="batchmean")
+        self.nt_index = not_true_index(self.num_classes, self.device)
 
     def train(self):
         trainloader = self.load_train_data()
@@ -30,17 +31,11 @@ class clientNTD(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 output_g = self.global_model(x)
                 loss = self.loss(output, y)
-                loss += self._ntd_loss(output, output_g, y) * self.beta
+                loss += ntd_loss(output, output_g, y, self.nt_index, self.tau) * self.beta
                 self.optimizer.zero_grad()
                 loss.backward()
                 self.optimizer.step()
@@ -58,32 +53,3 @@ class clientNTD(Client):
             old_param.data = new_param.data.clone()
 
         self.global_model = model.eval().requires_grad_(False)
-
-    # https://github.com/Lee-Gihun/FedNTD/blob/master/algorithms/fedntd/criterion.py#L30
-    def _ntd_loss(self, logits, dg_logits, targets):
-        """Not-tue Distillation Loss"""
-
-        # Get smoothed local model prediction
-        logits = refine_as_not_true(logits, targets, self.num_classes)
-        pred_probs = F.log_softmax(logits / self.tau, dim=1)
-
-        # Get smoothed global model prediction
-        with torch.no_grad():
-            dg_logits = refine_as_not_true(dg_logits, targets, self.num_classes)
-            dg_probs = torch.softmax(dg_logits / self.tau, dim=1)
-
-        loss = (self.tau ** 2) * self.KLDiv(pred_probs, dg_probs)
-
-        return loss
-    
-
-# https://github.com/Lee-Gihun/FedNTD/blob/master/algorithms/fedntd/utils.py#L6
-def refine_as_not_true(logits, targets, num_classes):
-    nt_positions = torch.arange(0, num_classes).to(logits.device)
-    nt_positions = nt_positions.repeat(logits.size(0), 1)
-    nt_positions = nt_positions[nt_positions[:, :] != targets.view(-1, 1)]
-    nt_positions = nt_positions.view(-1, num_classes - 1)
-
-    logits = torch.gather(logits, 1, nt_positions)
-
-    return logits
\ No newline at end of file
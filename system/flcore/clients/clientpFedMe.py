@@ -38,13 +38,7 @@ class clientpFedMe(Client):
 
         for epoch in range(max_local_epochs):  # local update
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
 
                 # K is number of personalized steps
                 for i in range(self.K):
@@ -53,12 +47,11 @@ class clientpFedMe(Client):
                     self.optimizer.zero_grad()
                     loss.backward()
                     # finding aproximate theta
-                    self.personalized_params = self.optimizer.step(self.local_params, self.device)
+                    self.personalized_params = self.optimizer.step(self.local_params)
 
                 # update local weight after finding aproximate theta
-                for new_param, localweight in zip(self.personalized_params, self.local_params):
-                    localweight = localweight.to(self.device)
-                    localweight.data = localweight.data - self.lamda * self.learning_rate * (localweight.data - new_param.data)
+                with torch.no_grad():
+                    torch._foreach_lerp_(self.local_params, self.personalized_params, self.lamda * self.learning_rate)
 
         # self.model.cpu()
 
@@ -87,11 +80,7 @@ class clientpFedMe(Client):
         
         with torch.no_grad():
             for x, y in testloaderfull:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 test_acc += (torch.sum(torch.argmax(output, dim=1) == y)).item()
                 test_num += y.shape[0]
@@ -111,11 +100,7 @@ class clientpFedMe(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y).item()
 
@@ -35,13 +35,7 @@ class clientPAC(Client):
             param.requires_grad = True
 
         for i, (x, y) in enumerate(trainloader):
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
-            if self.train_slow:
-                time.sleep(0.1 * np.abs(np.random.rand()))
+            x, y = self.to_device(x, y)
             rep = self.model.base(x)
             output = self.model.head(rep)
             loss = self.loss(output, y)
@@ -58,13 +52,7 @@ class clientPAC(Client):
         # protos = defaultdict(list)
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 output = self.model.head(rep)
                 loss = self.loss(output, y)
@@ -118,13 +106,7 @@ class clientPAC(Client):
         protos = defaultdict(list)
         with torch.no_grad():
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
 
                 for i, yy in enumerate(y):
@@ -138,11 +120,7 @@ class clientPAC(Client):
         model = self.model
         trainloader = self.load_train_data()        
         for x, y in trainloader:
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
+            x, y = self.to_device(x, y)
             with torch.no_grad():
                 rep = model.base(x).detach()
             break
@@ -150,11 +128,7 @@ class clientPAC(Client):
         feature_dict = {}
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 features = model.base(x)
                 feat_batch = features.clone().detach()
                 for i in range(len(y)):
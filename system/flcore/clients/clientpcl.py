@@ -45,13 +45,7 @@ class clientPCL(Client):
                     client_protos_embs.append(client_protos_emb)
 
                 for i, (x, y) in enumerate(trainloader):
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
-                    if self.train_slow:
-                        time.sleep(0.1 * np.abs(np.random.rand()))
+                    x, y = self.to_device(x, y)
                     rep = self.model(x)
                     rep = F.normalize(rep, dim=1)
 
@@ -99,13 +93,7 @@ class clientPCL(Client):
         protos = defaultdict(list)
         with torch.no_grad():
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model(x)
                 rep = F.normalize(rep, dim=1)
 
@@ -127,11 +115,7 @@ class clientPCL(Client):
         if self.protos is not None:
             with torch.no_grad():
                 for x, y in testloaderfull:
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.to_device(x, y)
                     rep = self.model(x)
                     rep = F.normalize(rep, dim=1)
 
@@ -172,11 +156,7 @@ class clientPCL(Client):
                     client_protos_embs.append(client_protos_emb)
 
                 for x, y in trainloader:
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.to_device(x, y)
                     rep = self.model(x)
                     rep = F.normalize(rep, dim=1)
 
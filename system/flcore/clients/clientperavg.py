@@ -1,7 +1,6 @@
 import numpy as np
 import torch
 import time
-import copy
 from flcore.optimizers.fedoptimizer import PerAvgOptimizer
 from flcore.clients.clientbase import Client
 
@@ -19,6 +18,11 @@ class clientPerAvg(Client):
             gamma=args.learning_rate_decay_gamma
         )
 
+        # weights before the first step of the meta update
+        self.snapshot = ParamSnapshot(self.model.parameters())
+        # weights before the one-step fine-tuning of the evaluation
+        self.eval_snapshot = ParamSnapshot(self.model.parameters())
+
     def train(self):
         trainloader = self.load_train_data(self.batch_size*2)
         start_time = time.time()
@@ -32,7 +36,7 @@ class clientPerAvg(Client):
 
         for epoch in range(max_local_epochs):  # local update
             for X, Y in trainloader:
-                temp_model = copy.deepcopy(list(self.model.parameters()))
+                self.snapshot.save()
 
                 # step 1
                 if type(X) == type([]):
@@ -42,8 +46,6 @@ class clientPerAvg(Client):
                 else:
                     x = X[:self.batch_size].to(self.device)
                 y = Y[:self.batch_size].to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -58,16 +60,13 @@ class clientPerAvg(Client):
                 else:
                     x = X[self.batch_size:].to(self.device)
                 y = Y[self.batch_size:].to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
                 self.optimizer.zero_grad()
                 output = self.model(x)
                 loss = self.loss(output, y)
                 loss.backward()
 
                 # restore the model parameters to the one before first update
-                for old_param, new_param in zip(self.model.parameters(), temp_model):
-                    old_param.data = new_param.data.clone()
+                self.snapshot.load()
 
                 self.optimizer.step(beta=self.beta)
 
@@ -87,11 +86,7 @@ class clientPerAvg(Client):
         self.model.train()
 
         (x, y) = next(iter_loader)
-        if type(x) == type([]):
-            x[0] = x[0].to(self.device)
-        else:
-            x = x.to(self.device)
-        y = y.to(self.device)
+        x, y = self.to_device(x, y)
         output = self.model(x)
         loss = self.loss(output, y)
         self.optimizer.zero_grad()
@@ -118,8 +113,6 @@ class clientPerAvg(Client):
             else:
                 x = X[:self.batch_size].to(self.device)
             y = Y[:self.batch_size].to(self.device)
-            if self.train_slow:
-                time.sleep(0.1 * np.abs(np.random.rand()))
             self.optimizer.zero_grad()
             output = self.model(x)
             loss = self.loss(output, y)
@@ -134,8 +127,6 @@ class clientPerAvg(Client):
             else:
                 x = X[self.batch_size:].to(self.device)
             y = Y[self.batch_size:].to(self.device)
-            if self.train_slow:
-                time.sleep(0.1 * np.abs(np.random.rand()))
             self.optimizer.zero_grad()
             output = self.model(x)
             loss1 = self.loss(output, y)
@@ -148,15 +139,30 @@ class clientPerAvg(Client):
     def train_one_epoch(self):
         trainloader = self.load_train_data(self.batch_size)
         for i, (x, y) in enumerate(trainloader):
-            if type(x) == type([]):
-                x[0] = x[0].to(self.device)
-            else:
-                x = x.to(self.device)
-            y = y.to(self.device)
-            if self.train_slow:
-                time.sleep(0.1 * np.abs(np.random.rand()))
+            x, y = self.to_device(x, y)
             output = self.model(x)
             loss = self.loss(output, y)
             self.optimizer.zero_grad()
             loss.backward()
-            self.optimizer.step()
\ No newline at end of file
+            self.optimizer.step()
+
+class ParamSnapshot(object):
+    """Preallocated flat copy of a list of parameters.
+
+    save() and load() are one multi-tensor copy each, so snapshotting the model
+    per batch allocates nothing. The parameters are copied in place, their
+    tensors (and the optimizer's references to them) stay the same.
+    """
+    def __init__(self, params):
+        self.params = list(params)
+        self.buffer = torch.empty(sum(p.numel() for p in self.params), 
+                                  dtype=self.params[0].dtype, device=self.params[0].device)
+        self.views = [v.view_as(p) for v, p in zip(self.buffer.split([p.numel() for p in self.params]), self.params)]
+
+    @torch.no_grad()
+    def save(self):
+        torch._foreach_copy_(self.views, self.params)
+
+    @torch.no_grad()
+    def load(self):
+        torch._foreach_copy_(self.params, self.views)
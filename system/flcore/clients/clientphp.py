@@ -31,13 +31,7 @@ class clientPHP(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y) * (1 - self.lamda)
                 loss += MMD(self.model.base(x), self.model_p.base(x), 'rbf', self.device) * self.lamda
@@ -73,11 +67,7 @@ class clientPHP(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 output = self.model(x)                
                 loss = self.loss(output, y) * (1 - self.lamda)
                 loss += MMD(self.model.base(x), self.model_p.base(x), 'rbf', self.device) * self.lamda
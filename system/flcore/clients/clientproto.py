@@ -32,13 +32,7 @@ class clientProto(Client):
         protos = defaultdict(list)
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 output = self.model.head(rep)
                 loss = self.loss(output, y)
@@ -83,13 +77,7 @@ class clientProto(Client):
         protos = defaultdict(list)
         with torch.no_grad():
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
 
                 for i, yy in enumerate(y):
@@ -110,11 +98,7 @@ class clientProto(Client):
         if self.global_protos is not None:
             with torch.no_grad():
                 for x, y in testloaderfull:
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.to_device(x, y)
                     rep = self.model.base(x)
 
                     output = float('inf') * torch.ones(y.shape[0], self.num_classes).to(self.device)
@@ -140,11 +124,7 @@ class clientProto(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 output = self.model.head(rep)
                 loss = self.loss(output, y)
@@ -34,16 +34,10 @@ class clientRep(Client):
         for param in self.model.head.parameters():
             param.requires_grad = True
 
+        featureloader = self.load_train_features(self.model.base)
         for epoch in range(self.plocal_epochs):
-            for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
-                output = self.model(x)
+            for i, (rep, y) in enumerate(featureloader):
+                output = self.model.head(rep)
                 loss = self.loss(output, y)
                 self.optimizer_per.zero_grad()
                 loss.backward()
@@ -60,13 +54,7 @@ class clientRep(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
-                if self.train_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
+                x, y = self.to_device(x, y)
                 output = self.model(x)
                 loss = self.loss(output, y)
                 self.optimizer.zero_grad()
@@ -4,6 +4,7 @@ import numpy as np
 import time
 import torch.nn.functional as F
 from flcore.clients.clientbase import Client
+from flcore.losses.fedloss import balanced_softmax_loss, log_prior
 from sklearn.preprocessing import label_binarize
 from sklearn import metrics
 
@@ -22,8 +23,8 @@ class clientROD(Client):
         self.sample_per_class = torch.zeros(self.num_classes)
         trainloader = self.load_train_data()
         for x, y in trainloader:
-            for yy in y:
-                self.sample_per_class[yy.item()] += 1
+            self.sample_per_class += torch.bincount(y.cpu(), minlength=self.num_classes)
+        self.log_prior = log_prior(self.sample_per_class, self.device)
 
 
     def train(self):
@@ -40,14 +41,10 @@ class clientROD(Client):
 
         for epoch in range(max_local_epochs):
             for i, (x, y) in enumerate(trainloader):
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 out_g = self.model.head(rep)
-                loss_bsm = balanced_softmax_loss(y, out_g, self.sample_per_class)
+                loss_bsm = balanced_softmax_loss(y, out_g, self.log_prior)
                 self.optimizer.zero_grad()
                 loss_bsm.backward()
                 self.optimizer.step()
@@ -80,11 +77,7 @@ class clientROD(Client):
         
         with torch.no_grad():
             for x, y in testloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 out_g = self.model.head(rep)
                 out_p = self.head(rep.detach())
@@ -119,11 +112,7 @@ class clientROD(Client):
         losses = 0
         with torch.no_grad():
             for x, y in trainloader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
-                else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                x, y = self.to_device(x, y)
                 rep = self.model.base(x)
                 out_g = self.model.head(rep)
                 out_p = self.head(rep.detach())
@@ -137,20 +126,3 @@ class clientROD(Client):
 
         return losses, train_num
 
-
-# https://github.com/jiawei-ren/BalancedMetaSoftmax-Classification
-def balanced_softmax_loss(labels, logits, sample_per_class, reduction="mean"):
-    """Compute the Balanced Softmax Loss between `logits` and the ground truth `labels`.
-    Args:
-      labels: A int tensor of size [batch].
-      logits: A float tensor of size [batch, no_of_classes].
-      sample_per_class: A int tensor of size [no of classes].
-      reduction: string. One of "none", "mean", "sum"
-    Returns:
-      loss: A float tensor. Balanced Softmax Loss.
-    """
-    spc = sample_per_class.type_as(logits)
-    spc = spc.unsqueeze(0).expand(logits.shape[0], -1)
-    logits = logits + spc.log()
-    loss = F.cross_entropy(input=logits, target=labels, reduction=reduction)
-    return loss
@@ -0,0 +1,48 @@
+import torch
+import torch.nn.functional as F
+
+
+# Losses of the long-tail and distillation algorithms as a few whole-batch tensor
+# ops. Per-class vectors and index tables depend only on the client's data, so
+# clients build them once on the device and pass them in.
+
+def log_prior(sample_per_class, device):
+    return sample_per_class.to(device=device, dtype=torch.float32).log()
+
+
+# https://github.com/jiawei-ren/BalancedMetaSoftmax-Classification
+def balanced_softmax_loss(labels, logits, log_prior, reduction="mean"):
+    """Balanced Softmax Loss: cross entropy of the logits shifted by the log class prior.
+    Args:
+      labels: A int tensor of size [batch].
+      logits: A float tensor of size [batch, no_of_classes].
+      log_prior: A float tensor of size [no_of_classes], see log_prior().
+      reduction: string. One of "none", "mean", "sum"
+    """
+    return F.cross_entropy(logits + log_prior, labels, reduction=reduction)
+
+
+# FedLC, calibration is tau * n_c^(-1/4) for every class c
+def calibrated_loss(labels, logits, calibration, reduction="mean"):
+    return F.cross_entropy(logits - calibration, labels, reduction=reduction)
+
+
+def not_true_index(num_classes, device):
+    """Row c holds the classes other than c, in order."""
+    classes = torch.arange(num_classes, device=device)
+    return classes.repeat(num_classes, 1)[~torch.eye(num_classes, dtype=torch.bool, device=device)].view(num_classes, -1)
+
+
+# https://github.com/Lee-Gihun/FedNTD/blob/master/algorithms/fedntd/utils.py#L6
+def not_true_logits(logits, targets, nt_index):
+    return torch.gather(logits, 1, nt_index[targets])
+
+
+# https://github.com/Lee-Gihun/FedNTD/blob/master/algorithms/fedntd/criterion.py#L30
+def ntd_loss(logits, dg_logits, targets, nt_index, tau):
+    """Not-true Distillation Loss: KL divergence between the smoothed local and global
+    predictions over the classes other than the target."""
+    pred_probs = F.log_softmax(not_true_logits(logits, targets, nt_index) / tau, dim=1)
+    with torch.no_grad():
+        dg_probs = torch.softmax(not_true_logits(dg_logits, targets, nt_index) / tau, dim=1)
+    return (tau ** 2) * F.kl_div(pred_probs, dg_probs, reduction="batchmean")
@@ -2,21 +2,30 @@ import torch
 from torch.optim import Optimizer
 
 
+# Steps are grouped multi-tensor (torch._foreach_*) updates applied in place to the
+# gradients and parameters, so a step launches a few kernels instead of several per
+# parameter. Global and control tensors are used as they are: clients keep them on
+# the device of the model for the whole round.
+
+def _with_grad(params, *others):
+    # parameters that received a gradient, paired with their global/control tensors
+    others = [list(o) for o in others]
+    keep = [i for i, p in enumerate(params) if p.grad is not None]
+    return [params[i] for i in keep], [params[i].grad for i in keep], *[[o[i] for i in keep] for o in others]
+
+
 class PerAvgOptimizer(Optimizer):
     def __init__(self, params, lr):
         defaults = dict(lr=lr)
         super(PerAvgOptimizer, self).__init__(params, defaults)
 
+    @torch.no_grad()
     def step(self, beta=0):
         for group in self.param_groups:
-            for p in group['params']:
-                if p.grad is None:
-                    continue
-                d_p = p.grad.data
-                if(beta != 0):
-                    p.data.add_(other=d_p, alpha=-beta)
-                else:
-                    p.data.add_(other=d_p, alpha=-group['lr'])
+            params, grads = _with_grad(group['params'])
+            if len(params) == 0:
+                continue
+            torch._foreach_add_(params, grads, alpha=-beta if beta != 0 else -group['lr'])
 
 
 class SCAFFOLDOptimizer(Optimizer):
@@ -24,10 +33,16 @@ class SCAFFOLDOptimizer(Optimizer):
         defaults = dict(lr=lr)
         super(SCAFFOLDOptimizer, self).__init__(params, defaults)
 
+    @torch.no_grad()
     def step(self, server_cs, client_cs):
         for group in self.param_groups:
-            for p, sc, cc in zip(group['params'], server_cs, client_cs):
-                p.data.add_(other=(p.grad.data + sc - cc), alpha=-group['lr'])
+            params, grads, scs, ccs = _with_grad(group['params'], server_cs, client_cs)
+            if len(params) == 0:
+                continue
+            # grad + c - c_i, accumulated in the gradient buffers
+            torch._foreach_add_(grads, scs)
+            torch._foreach_sub_(grads, ccs)
+            torch._foreach_add_(params, grads, alpha=-group['lr'])
 
 
 class pFedMeOptimizer(Optimizer):
@@ -35,14 +50,17 @@ class pFedMeOptimizer(Optimizer):
         defaults = dict(lr=lr, lamda=lamda, mu=mu)
         super(pFedMeOptimizer, self).__init__(params, defaults)
 
-    def step(self, local_model, device):
+    @torch.no_grad()
+    def step(self, local_model):
         group = None
-        weight_update = local_model.copy()
         for group in self.param_groups:
-            for p, localweight in zip(group['params'], weight_update):
-                localweight = localweight.to(device)
-                # approximate local model
-                p.data = p.data - group['lr'] * (p.grad.data + group['lamda'] * (p.data - localweight.data) + group['mu'] * p.data)
+            params, grads, local_weights = _with_grad(group['params'], local_model)
+            if len(params) == 0:
+                continue
+            # approximate local model: grad + lamda * (p - w) + mu * p
+            torch._foreach_add_(grads, params, alpha=group['lamda'] + group['mu'])
+            torch._foreach_add_(grads, local_weights, alpha=-group['lamda'])
+            torch._foreach_add_(params, grads, alpha=-group['lr'])
 
         return group['params']
 
@@ -52,13 +70,13 @@ class APFLOptimizer(Optimizer):
         defaults = dict(lr=lr)
         super(APFLOptimizer, self).__init__(params, defaults)
 
+    @torch.no_grad()
     def step(self, beta=1, n_k=1):
         for group in self.param_groups:
-            for p in group['params']:
-                if p.grad is None:
-                    continue
-                d_p = beta * n_k * p.grad.data
-                p.data.add_(-group['lr'], d_p)
+            params, grads = _with_grad(group['params'])
+            if len(params) == 0:
+                continue
+            torch._foreach_add_(params, grads, alpha=-group['lr'] * beta * n_k)
 
 
 class PerturbedGradientDescent(Optimizer):
@@ -67,9 +85,12 @@ class PerturbedGradientDescent(Optimizer):
         super().__init__(params, default)
 
     @torch.no_grad()
-    def step(self, global_params, device):
+    def step(self, global_params):
         for group in self.param_groups:
-            for p, g in zip(group['params'], global_params):
-                g = g.to(device)
-                d_p = p.grad.data + group['mu'] * (p.data - g.data)
-                p.data.add_(d_p, alpha=-group['lr'])
+            params, grads, globals_ = _with_grad(group['params'], global_params)
+            if len(params) == 0:
+                continue
+            # grad + mu * (p - g)
+            torch._foreach_add_(grads, params, alpha=group['mu'])
+            torch._foreach_add_(grads, globals_, alpha=-group['mu'])
+            torch._foreach_add_(params, grads, alpha=-group['lr'])
@@ -0,0 +1,76 @@
+import copy
+import importlib
+import torch.nn as nn
+
+
+# model preparation hooks, run on args.model before the server is created
+
+def split_head(args):
+    from flcore.trainmodel.models import BaseHeadSplit
+    args.head = copy.deepcopy(args.model.fc)
+    args.model.fc = nn.Identity()
+    args.model = BaseHeadSplit(args.model, args.head)
+
+
+def drop_head(args):
+    args.model.fc = nn.Identity()
+
+
+# algorithm name: (server module in flcore.servers, server class, model preparation)
+ALGORITHMS = {
+    "FedAvg": ("serveravg", "FedAvg", split_head),
+    "SR-FedAvg": ("serversrfedavg", "SR_FedAvg", None),
+    "Local": ("serverlocal", "Local", None),
+    "FedMTL": ("servermtl", "FedMTL", None),
+    "PerAvg": ("serverperavg", "PerAvg", None),
+    "pFedMe": ("serverpFedMe", "pFedMe", None),
+    "FedProx": ("serverprox", "FedProx", None),
+    "FedFomo": ("serverfomo", "FedFomo", None),
+    "FedAMP": ("serveramp", "FedAMP", None),
+    "APFL": ("serverapfl", "APFL", None),
+    "FedPer": ("serverper", "FedPer", split_head),
+    "Ditto": ("serverditto", "Ditto", None),
+    "FedRep": ("serverrep", "FedRep", split_head),
+    "FedPHP": ("serverphp", "FedPHP", split_head),
+    "FedBN": ("serverbn", "FedBN", None),
+    "FedROD": ("serverrod", "FedROD", split_head),
+    "FedProto": ("serverproto", "FedProto", split_head),
+    "FedDyn": ("serverdyn", "FedDyn", None),
+    "MOON": ("servermoon", "MOON", split_head),
+    "FedBABU": ("serverbabu", "FedBABU", split_head),
+    "APPLE": ("serverapple", "APPLE", None),
+    "FedGen": ("servergen", "FedGen", split_head),
+    "SCAFFOLD": ("serverscaffold", "SCAFFOLD", None),
+    "FD": ("serverfd", "FD", None),
+    "FedALA": ("serverala", "FedALA", None),
+    "FedPAC": ("serverpac", "FedPAC", split_head),
+    "LG-FedAvg": ("serverlg", "LG_FedAvg", split_head),
+    "FedGC": ("servergc", "FedGC", split_head),
+    "FML": ("serverfml", "FML", None),
+    "FedKD": ("serverkd", "FedKD", split_head),
+    "FedPCL": ("serverpcl", "FedPCL", drop_head),
+    "FedCP": ("servercp", "FedCP", split_head),
+    "GPFL": ("servergpfl", "GPFL", split_head),
+    "FedNTD": ("serverntd", "FedNTD", None),
+    "FedGH": ("servergh", "FedGH", split_head),
+    "FedDBE": ("serverdbe", "FedDBE", split_head),
+    "FedCAC": ("servercac", "FedCAC", None),
+    "PFL-DA": ("serverda", "PFL_DA", split_head),
+    "FedLC": ("serverlc", "FedLC", split_head),
+    "FedAS": ("serveras", "FedAS", split_head),
+    "FedCross": ("servercross", "FedCross", None),
+    "FedBuff": ("serverbuff", "FedBuff", None),
+    "SR-FedBuff": ("serverbuff", "SR_FedBuff", None),
+}
+
+
+def get_algorithm(name):
+    """Imports only the server module of the algorithm.
+
+    Returns the server class and the model preparation hook (or None).
+    """
+    if name not in ALGORITHMS:
+        raise NotImplementedError
+    module, server_name, prepare = ALGORITHMS[name]
+    server = getattr(importlib.import_module("flcore.servers." + module), server_name)
+    return server, prepare
@@ -26,7 +26,7 @@ class FedAMP(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -54,6 +54,7 @@ class FedAMP(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -68,6 +69,9 @@ class FedAMP(Server):
         self.save_results()
 
 
+    # send_models of the next round uses the uploaded models, so they are checkpointed
+    checkpoint_skip = tuple(name for name in Server.checkpoint_skip if name != 'uploaded_models')
+
     # To save GPU memory in simulation, no persistent model is kept on the server.
     def send_models(self):
         assert (len(self.selected_clients) > 0)
@@ -97,9 +101,6 @@ class FedAMP(Server):
 
                 start_time = time.time()
 
-                if c.send_slow:
-                    time.sleep(0.1 * np.abs(np.random.rand()))
-
                 c.set_parameters(mu, coef_self)
 
                 c.send_time_cost['num_rounds'] += 1
@@ -126,11 +127,7 @@ class FedAMP(Server):
                     if i >= self.batch_num_per_client:
                         break
 
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.clients[cid].to_device(x, y)
                     output = client_model(x)
                     target_inputs.append((x, output))
 
@@ -33,7 +33,7 @@ class APPLE(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -56,6 +56,7 @@ class APPLE(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*50, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -108,11 +109,7 @@ class APPLE(Server):
                     if i >= self.batch_num_per_client:
                         break
 
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.clients[cid].to_device(x, y)
                     output = client_model(x)
                     target_inputs.append((x, output))
 
@@ -55,7 +55,7 @@ class FedAS(Server):
             self.add_parameters(w, client_model)
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.alled_clients = self.all_clients()
@@ -99,6 +99,7 @@ class FedAS(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
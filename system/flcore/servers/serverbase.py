@@ -1,12 +1,19 @@
 import torch
 import os
 import numpy as np
-import h5py
 import copy
 import time
-import random
-from utils.data_utils import read_client_data
-from utils.dlg import DLG
+import functools
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+from flcore.clients.clientbase import Client
+from utils.data_utils import read_client_data, DeviceDataBudget
+from utils.profiler import RoundProfiler
+from utils.result_utils import MetricsWriter
+from utils.mem_utils import model_nbytes
+from utils.clock_utils import SimClock
+from utils.precision_utils import set_precision
+from utils.checkpoint_utils import Checkpointer, get_state, set_state, get_rng_state, set_rng_state, \
+    read_checkpoint
 
 
 class Server(object):
@@ -14,13 +21,15 @@ class Server(object):
         # Set up the main attributes
         self.args = args
         self.device = args.device
+        # shared by the clients created below
+        args.device_budget = DeviceDataBudget(args.device_data_budget * 1024 * 1024)
         self.dataset = args.dataset
         self.num_classes = args.num_classes
         self.global_rounds = args.global_rounds
         self.local_epochs = args.local_epochs
         self.batch_size = args.batch_size
         self.learning_rate = args.local_learning_rate
-        self.global_model = copy.deepcopy(args.model)
+        self.global_model = set_precision(copy.deepcopy(args.model), args.precision, args.device)
         self.num_clients = args.num_clients
         self.join_ratio = args.join_ratio
         self.random_join_ratio = args.random_join_ratio
@@ -47,6 +56,7 @@ class Server(object):
         self.rs_test_acc = []
         self.rs_test_auc = []
         self.rs_train_loss = []
+        self.rs_client_test_acc = []
 
         self.times = times
         self.eval_gap = args.eval_gap
@@ -63,6 +73,47 @@ class Server(object):
         self.eval_new_clients = False
         self.fine_tuning_epoch_new = args.fine_tuning_epoch_new
 
+        trace_path = "../results/{}_{}_{}_{}_round{}.json".format(
+            self.dataset, self.algorithm, self.goal, self.times, args.profile_round)
+        self.profiler = RoundProfiler(args.profile, self.device, args.profile_round, trace_path)
+        self.profiler.wrap(self, {
+            'select_clients': 'select', 
+            'send_models': 'send', 
+            'receive_models': 'receive', 
+            'aggregate_parameters': 'aggregate', 
+            'beta_aggregate_parameters': 'aggregate', 
+            'aggregate_parameters_cross': 'aggregate', 
+            'aggregate_wrt_fisher': 'aggregate', 
+            'evaluate': 'evaluate', 
+            'evaluate_personalized': 'evaluate', 
+            'evaluate_one_step': 'evaluate', 
+            'call_dlg': 'dlg', 
+        })
+
+        result_path = "../results/{}_{}_{}_{}.h5".format(self.dataset, self.algorithm, self.goal, self.times)
+        self.metrics = MetricsWriter(result_path, args.metrics_flush_gap, attrs={
+            'dataset': self.dataset, 
+            'algorithm': self.algorithm, 
+            'goal': self.goal, 
+            'times': self.times, 
+        })
+        self.bytes_down = 0
+        self.round_start = time.time()
+        self.total_round_time = 0.0
+        self.total_updates = 0
+        # bumped by every send_models, clients catch up when they are used
+        self.model_version = 0
+
+        # client sampling and the simulated clock draw from their own seeded streams
+        self.rng = np.random.default_rng([args.seed, times, 0])
+        self.clock = SimClock(self.num_clients, args.sim_sample_time, args.sim_bandwidth, 
+                              args.sim_slowdown, self.time_threthold, np.random.default_rng([args.seed, times, 1]))
+
+        self.start_round = 0
+        self.checkpoint_gap = args.checkpoint_gap
+        self.checkpointer = Checkpointer(args.checkpoint_folder, 
+            "{}_{}_{}_{}".format(self.dataset, self.algorithm, self.goal, self.times), args.checkpoint_keep)
+
     def set_clients(self, clientObj):
         for i, train_slow, send_slow in zip(range(self.num_clients), self.train_slow_clients, self.send_slow_clients):
             train_data = read_client_data(self.dataset, i, is_train=True, few_shot=self.few_shot)
@@ -73,61 +124,215 @@ class Server(object):
                             test_samples=len(test_data), 
                             train_slow=train_slow, 
                             send_slow=send_slow)
+            self.attach_client(client)
             self.clients.append(client)
 
+    # profiling, traffic counting and virtual time of a training client
+    def attach_client(self, client):
+        client.profiler = self.profiler
+        # FedCP clients train in train_cs_model
+        self.profiler.wrap(client, {'train': 'train', 'train_cs_model': 'train'})
+        for method in ['train', 'train_cs_model']:
+            if hasattr(client, method):
+                setattr(client, method, self.count_train(client, getattr(client, method)))
+        client.set_parameters = self.count_download(client, client.set_parameters)
+        for method in self.sync_methods:
+            if hasattr(client, method):
+                setattr(client, method, self.synced(client, method, getattr(client, method)))
+
     # random select slow clients
     def select_slow_clients(self, slow_rate):
-        slow_clients = [False for i in range(self.num_clients)]
-        idx = [i for i in range(self.num_clients)]
-        idx_ = np.random.choice(idx, int(slow_rate * self.num_clients))
-        for i in idx_:
-            slow_clients[i] = True
+        slow_clients = np.zeros(self.num_clients, dtype=bool)
+        slow_clients[self.rng.choice(self.num_clients, int(slow_rate * self.num_clients), replace=False)] = True
 
-        return slow_clients
+        return slow_clients.tolist()
 
     def set_slow_clients(self):
         self.train_slow_clients = self.select_slow_clients(
             self.train_slow_rate)
         self.send_slow_clients = self.select_slow_clients(
             self.send_slow_rate)
+        self.clock.set_slow(self.train_slow_clients, self.send_slow_clients)
+
+    def count_train(self, client, train):
+        @functools.wraps(train)
+        def wrapper(*args, **kwargs):
+            client.trained_samples = 0
+            result = train(*args, **kwargs)
+            self.clock.compute(client.id, client.trained_samples)
+            self.profiler.count('train_samples', client.trained_samples)
+            return result
+        return wrapper
+
+    def count_download(self, client, set_parameters):
+        @functools.wraps(set_parameters)
+        def wrapper(model, *args, **kwargs):
+            nbytes = model_nbytes(model)
+            self.bytes_down += nbytes
+            self.clock.transfer(client.id, nbytes)
+            return set_parameters(model, *args, **kwargs)
+        return wrapper
+
+    # the lists that are stored in the results file
+    def result_series(self):
+        return {
+            'rs_test_acc': self.rs_test_acc, 
+            'rs_test_auc': self.rs_test_auc, 
+            'rs_train_loss': self.rs_train_loss, 
+            'rs_client_test_acc': self.rs_client_test_acc, 
+        }
+
+    # bookkeeping at the end of every global round
+    def end_round(self, round_idx):
+        self.profiler.end_round()
+
+        round_time = time.time() - self.round_start
+        self.total_round_time += round_time
+        self.total_updates += len(self.uploaded_models)
+        self.metrics.write('round_time', round_idx, round_time)
+        self.metrics.write('bytes_up', round_idx, sum(model_nbytes(m) for m in self.uploaded_models))
+        self.metrics.write('bytes_down', round_idx, self.bytes_down)
+        self.metrics.write('updates', round_idx, len(self.uploaded_models))
+        self.clock.end_round([c.id for c in self.selected_clients])
+        self.metrics.write('sim_time', round_idx, self.clock.now)
+        if self.profiler.enabled:
+            for key, value in self.profiler.records[-1].items():
+                self.metrics.write('profile_' + key, round_idx, value)
+        for name, values in self.result_series().items():
+            self.metrics.extend(name, values)
+
+        self.bytes_down = 0
+        self.round_start = time.time()
+
+        if self.checkpoint_gap > 0 and (round_idx + 1) % self.checkpoint_gap == 0:
+            self.save_checkpoint(round_idx)
+        else:
+            self.metrics.step()
+
+    # attributes that are rebuilt by __init__ or only live within a round
+    checkpoint_skip = ('args', 'clients', 'new_clients', 'selected_clients', 'uploaded_models', 
+                       'profiler', 'metrics', 'checkpointer', 'start_round', 'global_rounds', 'checkpoint_gap', 
+                       'rng', 'clock')
+    client_checkpoint_skip = ('profiler', 'device_data', 'device_budget')
+
+    def save_checkpoint(self, round_idx):
+        # the results file has to match the checkpoint when resuming
+        self.metrics.flush()
+        state = {
+            'run': self.checkpointer.prefix, 
+            'round': round_idx, 
+            'server': get_state(self, self.checkpoint_skip), 
+            'clients': [get_state(c, self.client_checkpoint_skip) for c in self.clients], 
+            'new_clients': [get_state(c, self.client_checkpoint_skip) for c in self.new_clients], 
+            'metrics_rows': dict(self.metrics.rows), 
+            'rng': get_rng_state(), 
+            'sampler': self.rng.bit_generator.state, 
+            'clock': self.clock.state(), 
+        }
+        self.checkpointer.save(state, round_idx)
+
+    def load_checkpoint(self, path):
+        if os.path.isdir(path):
+            path = Checkpointer(path, self.checkpointer.prefix).latest()
+            if path is None:
+                print("No checkpoint to resume from, starting at round 0.")
+                return
+        state = read_checkpoint(path)
+        if state['run'] != self.checkpointer.prefix:
+            print(f"Checkpoint {path} belongs to {state['run']}, starting at round 0.")
+            return
+
+        set_state(self, state['server'], self.device)
+        for client, client_state in zip(self.clients, state['clients']):
+            set_state(client, client_state, client.device)
+        for client, client_state in zip(self.new_clients, state['new_clients']):
+            set_state(client, client_state, client.device)
+        self.metrics.resume(state['metrics_rows'])
+        set_rng_state(state['rng'])
+        self.rng.bit_generator.state = state['sampler']
+        self.clock.load_state(state['clock'])
+        self.start_round = state['round'] + 1
+        print(f"Resuming from {path} at round {self.start_round}.")
 
     def select_clients(self):
         if self.random_join_ratio:
-            self.current_num_join_clients = np.random.choice(range(self.num_join_clients, self.num_clients+1), 1, replace=False)[0]
+            self.current_num_join_clients = int(self.rng.integers(self.num_join_clients, self.num_clients+1))
         else:
             self.current_num_join_clients = self.num_join_clients
-        selected_clients = list(np.random.choice(self.clients, self.current_num_join_clients, replace=False))
+        idx = self.rng.choice(len(self.clients), self.current_num_join_clients, replace=False)
+        selected_clients = [self.clients[i] for i in idx]
 
         return selected_clients
 
+    # clients that drop out after training are left out of the upload
+    def sample_active_clients(self):
+        num_active = int((1-self.client_drop_rate) * self.current_num_join_clients)
+        idx = self.rng.choice(len(self.selected_clients), num_active, replace=False)
+        return [self.selected_clients[i] for i in sorted(idx)]
+
+    # the global model is sent to the selected clients only, the others get it when they are used
     def send_models(self):
         assert (len(self.clients) > 0)
 
-        for client in self.clients:
-            start_time = time.time()
-            
-            client.set_parameters(self.global_model)
-
-            client.send_time_cost['num_rounds'] += 1
-            client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
+        self.model_version += 1
+        for client in self.selected_clients:
+            self.sync_client(client)
+
+    # what a client receives when it catches up with the server
+    def push_model(self, client):
+        client.set_parameters(self.global_model)
+
+    def sync_client(self, client):
+        if client.model_version >= self.model_version:
+            return
+        start_time = time.time()
+
+        self.push_model(client)
+        client.model_version = self.model_version
+
+        client.send_time_cost['num_rounds'] += 1
+        client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
+
+    # client methods that need the latest global model
+    sync_methods = ('train', 'train_cs_model', 'train_one_step', 'fine_tune', 'test_metrics', 'train_metrics', 
+                    'test_metrics_personalized', 'train_metrics_personalized')
+
+    def can_borrow_global_model(self, client, name):
+        # the base evaluation only reads client.model, which would be an exact copy of the global model
+        return name in ('test_metrics', 'train_metrics') and \
+            getattr(type(client), name) is getattr(Client, name) and \
+            type(client).set_parameters is Client.set_parameters and \
+            type(self).push_model is Server.push_model and \
+            next(client.model.buffers(), None) is None
+
+    def synced(self, client, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if client.model_version >= self.model_version:
+                return method(*args, **kwargs)
+            if not self.can_borrow_global_model(client, name):
+                self.sync_client(client)
+                return method(*args, **kwargs)
+            local_model, training = client.model, self.global_model.training
+            client.model = self.global_model
+            try:
+                return method(*args, **kwargs)
+            finally:
+                client.model = local_model
+                self.global_model.train(training)
+        return wrapper
 
     def receive_models(self):
         assert (len(self.selected_clients) > 0)
 
-        active_clients = random.sample(
-            self.selected_clients, int((1-self.client_drop_rate) * self.current_num_join_clients))
+        active_clients = self.sample_active_clients()
 
         self.uploaded_ids = []
         self.uploaded_weights = []
         self.uploaded_models = []
         tot_samples = 0
         for client in active_clients:
-            try:
-                client_time_cost = client.train_time_cost['total_cost'] / client.train_time_cost['num_rounds'] + \
-                        client.send_time_cost['total_cost'] / client.send_time_cost['num_rounds']
-            except ZeroDivisionError:
-                client_time_cost = 0
-            if client_time_cost <= self.time_threthold:
+            if self.clock.in_time(client.id):
                 tot_samples += client.train_samples
                 self.uploaded_ids.append(client.id)
                 self.uploaded_weights.append(client.train_samples)
@@ -149,6 +354,14 @@ class Server(object):
         for server_param, client_param in zip(self.global_model.parameters(), client_model.parameters()):
             server_param.data += client_param.data.clone() * w
 
+    # weighted average of the parameters of same-shaped modules, written into target
+    def average_modules(self, modules, weights, target):
+        with torch.no_grad():
+            flat = torch.stack([parameters_to_vector(m.parameters()) for m in modules])
+            weights = torch.tensor(weights, dtype=flat.dtype, device=flat.device)
+            vector_to_parameters(weights @ flat, target.parameters())
+        return target
+
     def save_global_model(self):
         model_path = os.path.join("models", self.dataset)
         if not os.path.exists(model_path):
@@ -168,20 +381,25 @@ class Server(object):
         return os.path.exists(model_path)
         
     def save_results(self):
-        algo = self.dataset + "_" + self.algorithm
-        result_path = "../results/"
-        if not os.path.exists(result_path):
-            os.makedirs(result_path)
-
-        if (len(self.rs_test_acc)):
-            algo = algo + "_" + self.goal + "_" + str(self.times)
-            file_path = result_path + "{}.h5".format(algo)
-            print("File path: " + file_path)
-
-            with h5py.File(file_path, 'w') as hf:
-                hf.create_dataset('rs_test_acc', data=self.rs_test_acc)
-                hf.create_dataset('rs_test_auc', data=self.rs_test_auc)
-                hf.create_dataset('rs_train_loss', data=self.rs_train_loss)
+        series = self.result_series()
+        for name, values in series.items():
+            self.metrics.extend(name, values)
+        self.metrics.flush()
+        self.checkpointer.wait()
+
+        if (len(series['rs_test_acc'])):
+            print("File path: " + self.metrics.file_path)
+        self.print_throughput()
+
+        self.profiler.summary()
+        self.profiler.close()
+
+    # client updates that reached the global model, per wall-clock and per simulated second
+    def print_throughput(self):
+        if self.total_updates == 0:
+            return
+        print("\nClient updates per second: {:.2f} (wall clock), {:.2f} (simulated)".format(
+            self.total_updates / max(self.total_round_time, 1e-9), self.total_updates / max(self.clock.now, 1e-9)))
 
     def save_item(self, item, item_name):
         if not os.path.exists(self.save_folder_name):
@@ -237,6 +455,7 @@ class Server(object):
         
         if acc == None:
             self.rs_test_acc.append(test_acc)
+            self.rs_client_test_acc.append(accs)
         else:
             acc.append(test_acc)
         
@@ -283,6 +502,9 @@ class Server(object):
         return True
 
     def call_dlg(self, R):
+        # matplotlib is only needed here
+        from utils.dlg import DLG
+
         # items = []
         cnt = 0
         psnr_val = 0
@@ -299,11 +521,7 @@ class Server(object):
                     if i >= self.batch_num_per_client:
                         break
 
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.clients[cid].to_device(x, y)
                     output = client_model(x)
                     target_inputs.append((x, output))
 
@@ -343,11 +561,7 @@ class Server(object):
             client.model.train()
             for e in range(self.fine_tuning_epoch_new):
                 for i, (x, y) in enumerate(trainloader):
-                    if type(x) == type([]):
-                        x[0] = x[0].to(client.device)
-                    else:
-                        x = x.to(client.device)
-                    y = y.to(client.device)
+                    x, y = client.to_device(x, y)
                     output = client.model(x)
                     loss = CEloss(output, y)
                     opt.zero_grad()
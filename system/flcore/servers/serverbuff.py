@@ -0,0 +1,176 @@
+import time
+import heapq
+import torch
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+from flcore.clients.clientavg import clientAVG
+from flcore.clients.clienttopk import clientTopK
+from flcore.servers.serverbase import Server
+from utils.mem_utils import model_nbytes
+
+
+class FedBuff(Server):
+    """
+    Asynchronous FedAvg with a buffer of client updates (FedBuff, Nguyen et al., 2022).
+
+    Up to `concurrency` clients train at the same time, each on the global model
+    it was given when it started. Their updates arrive in the order of the
+    simulated clock, are weighted by 1 / sqrt(1 + staleness) and are applied to
+    the global model every `buffer_size` updates, which counts as one round.
+    Updates more than `max_staleness` global versions old are dropped.
+    """
+    client_class = clientAVG
+
+    def __init__(self, args, times):
+        super().__init__(args, times)
+
+        # select slow clients
+        self.set_slow_clients()
+        self.set_clients(self.client_class)
+
+        self.buffer_size = args.buffer_size
+        self.max_staleness = args.max_staleness
+        self.concurrency = args.concurrency if args.concurrency > 0 else self.num_join_clients
+        self.concurrency = max(1, min(self.concurrency, self.num_clients))
+        self.server_learning_rate = args.server_learning_rate
+        self.pool = ThreadPoolExecutor(max(1, args.async_workers))
+
+        self.version = 0
+        self.global_vector = parameters_to_vector(self.global_model.parameters()).detach()
+        self.buffer = torch.zeros_like(self.global_vector)
+        self.buffered = 0
+        self.in_flight = []
+        self.started = 0
+
+        print(f"\nConcurrency / buffer size / total clients: {self.concurrency} / {self.buffer_size} / {self.num_clients}")
+        print("Finished creating server and clients.")
+
+        self.Budget = []
+
+    checkpoint_skip = Server.checkpoint_skip + ('pool', 'in_flight', 'buffer', 'buffered')
+
+    # clients still training in the pool are waited for, so that no client is saved
+    # half-updated, and their finished updates are saved with their arrival times
+    def save_checkpoint(self, round_idx):
+        self.wait_clients()
+        self.in_flight_updates = [(finish, order, cid, version, future.result())
+                                  for finish, order, cid, version, future in self.in_flight]
+        super().save_checkpoint(round_idx)
+        del self.in_flight_updates
+
+    def load_checkpoint(self, path):
+        super().load_checkpoint(path)
+        if hasattr(self, 'in_flight_updates'):
+            self.in_flight = []
+            for finish, order, cid, version, delta in self.in_flight_updates:
+                future = Future()
+                future.set_result(delta)
+                self.in_flight.append((finish, order, cid, version, future))
+            # saved in heap order
+            heapq.heapify(self.in_flight)
+            del self.in_flight_updates
+
+    def train(self):
+        for i in range(self.start_round, self.global_rounds+1):
+            s_t = time.time()
+
+            if i%self.eval_gap == 0:
+                print(f"\n-------------Round number: {i}-------------")
+                print("\nEvaluate global model")
+                self.wait_clients()
+                self.model_version += 1
+                self.evaluate()
+
+            self.fill_clients()
+            self.receive_models()
+            self.aggregate_parameters()
+
+            self.Budget.append(time.time() - s_t)
+            print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
+
+            if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
+                break
+
+        self.wait_clients()
+        self.pool.shutdown()
+
+        print("\nBest accuracy.")
+        print(max(self.rs_test_acc))
+        print("\nAverage time cost per round.")
+        print(sum(self.Budget[1:])/len(self.Budget[1:]))
+
+        self.save_results()
+        self.save_global_model()
+
+        if self.num_new_clients > 0:
+            self.eval_new_clients = True
+            self.set_new_clients(self.client_class)
+            print(f"\n-------------Fine tuning round-------------")
+            print("\nEvaluate new clients")
+            self.evaluate()
+
+    # start idle clients on the current global model until `concurrency` are training
+    def fill_clients(self):
+        busy = set(entry[2] for entry in self.in_flight)
+        idle = [c for c in self.clients if c.id not in busy]
+        num_start = self.concurrency - len(self.in_flight)
+        if num_start <= 0:
+            return
+        nbytes = model_nbytes(self.global_model)
+        for idx in self.rng.choice(len(idle), num_start, replace=False):
+            client = idle[idx]
+            client.set_parameters(self.global_model)
+            client.model_version = self.model_version
+            # the samples of local_epochs passes over the training batches
+            num_samples = self.local_epochs * (client.train_samples // self.batch_size) * self.batch_size
+            finish = self.clock.now + self.clock.duration(client.id, num_samples, nbytes)
+            future = self.pool.submit(self.run_client, client, self.global_vector.clone())
+            heapq.heappush(self.in_flight, (finish, self.started, client.id, self.version, future))
+            self.started += 1
+
+    @staticmethod
+    def run_client(client, start_vector):
+        client.train()
+        with torch.no_grad():
+            if hasattr(client, 'get_compressed_delta'):
+                return torch.cat([d.reshape(-1) for d in client.get_compressed_delta()])
+            return parameters_to_vector(client.model.parameters()) - start_vector
+
+    # client models can only be replaced once their updates are taken
+    def wait_clients(self):
+        for entry in self.in_flight:
+            entry[4].result()
+
+    # buffer updates in the order they arrive until there are buffer_size of them
+    def receive_models(self):
+        self.selected_clients = []
+        self.uploaded_ids = []
+        self.uploaded_models = []
+        while self.buffered < self.buffer_size:
+            finish, _, cid, version, future = heapq.heappop(self.in_flight)
+            self.clock.now = max(self.clock.now, finish)
+            delta = future.result()
+
+            staleness = self.version - version
+            if staleness <= self.max_staleness:
+                self.buffer.add_(delta, alpha=1 / np.sqrt(1 + staleness))
+                self.buffered += 1
+                self.uploaded_ids.append(cid)
+                self.uploaded_models.append(delta)
+            self.fill_clients()
+
+    def aggregate_parameters(self):
+        assert (self.buffered > 0)
+
+        self.global_vector.add_(self.buffer, alpha=self.server_learning_rate / self.buffered)
+        vector_to_parameters(self.global_vector, self.global_model.parameters())
+        self.buffer.zero_()
+        self.buffered = 0
+        self.version += 1
+
+
+class SR_FedBuff(FedBuff):
+    """FedBuff on the Stein-rule shrunk, Top-k compressed updates of SR-FedAvg clients."""
+    client_class = clientTopK
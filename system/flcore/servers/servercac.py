@@ -1,6 +1,5 @@
 import time
 import torch
-import copy
 
 
 from flcore.clients.clientcac import clientCAC
@@ -24,7 +23,7 @@ class FedCAC(Server):
         self.epoch = -1
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             self.epoch = i
             s_t = time.time()
             self.selected_clients = self.select_clients()
@@ -49,6 +48,7 @@ class FedCAC(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -76,46 +76,42 @@ class FedCAC(Server):
         """
         assert type(self.args.beta) == int and self.args.beta >= 1
         num_clients = len(self.selected_clients)
-        overlap_buffer = [[] for i in range(num_clients)]
-
-        # calculate overlap rate between client i and client j in the selected clients
-        for i in range(num_clients):
-            for j in range(num_clients):
-                if i == j:
-                    continue
-                overlap_rate = 1 - torch.sum(
-                    torch.abs(self.selected_clients[i].critical_parameter.to(self.device) - self.selected_clients[j].critical_parameter.to(self.args.device))
-                ) / float(torch.sum(self.selected_clients[i].critical_parameter.to(self.args.device)).cpu() * 2)
-                overlap_buffer[i].append(overlap_rate)
+
+        # calculate overlap rate between client i and client j in the selected clients,
+        # 1 - |c_i xor c_j| / (2 |c_i|), with the bit counts of the packed masks
+        masks = torch.stack([c.critical_parameter.to(self.device) for c in self.selected_clients])
+        popcount = self.popcount_table(masks.device)
+        num_critical = popcount[masks.int()].sum(dim=1).float()
+        num_differ = torch.stack([popcount[(masks[i] ^ masks).int()].sum(dim=1) for i in range(num_clients)]).float()
+        overlap = 1 - num_differ / (num_critical.unsqueeze(1) * 2)
 
         # calculate the global threshold
-        overlap_buffer_tensor = torch.tensor(overlap_buffer)
-        overlap_sum = overlap_buffer_tensor.sum()
-        overlap_avg = overlap_sum / ((num_clients - 1) * num_clients)
-        overlap_max = overlap_buffer_tensor.max()
+        others = ~torch.eye(num_clients, dtype=torch.bool, device=overlap.device)
+        overlap_avg = overlap[others].sum() / ((num_clients - 1) * num_clients)
+        overlap_max = overlap[others].max()
         threshold = overlap_avg + (self.epoch + 1) / self.args.beta * (overlap_max - overlap_avg)
 
-        # calculate the customized global model for each client
-        for i in range(num_clients):
-            w_customized_global = copy.deepcopy(self.selected_clients[i].model.state_dict())
-            collaboration_clients = [i]
-            # find clients whose critical parameter locations are similar to client i
-            index = 0
-            for j in range(num_clients):
-                if i == j:
-                    continue
-                if overlap_buffer[i][index] >= threshold:
-                    collaboration_clients.append(j)
-                index += 1
-
-            for key in w_customized_global.keys():
-                for client in collaboration_clients:
-                    if client == i:
-                        continue
-                    w_customized_global[key] += self.selected_clients[client].model.state_dict()[key]
-                w_customized_global[key] = torch.div(w_customized_global[key], float(len(collaboration_clients)))
-            # send the customized global model to client i
-            self.selected_clients[i].customized_model.load_state_dict(w_customized_global)
+        # client i averages the models of the clients whose critical parameter locations are similar to its own
+        collaboration = (overlap >= threshold) & others
+        collaboration |= torch.eye(num_clients, dtype=torch.bool, device=overlap.device)
+        weights = collaboration.float() / collaboration.sum(dim=1, keepdim=True)
+
+        states = [c.model.state_dict() for c in self.selected_clients]
+        flat = torch.stack([torch.cat([v.reshape(-1).float() for v in state.values()]) for state in states])
+        customized = weights.to(flat.device) @ flat
+
+        # send the customized global model to client i
+        for client, w_customized in zip(self.selected_clients, customized):
+            w_customized_global = {}
+            offset = 0
+            for key, value in states[0].items():
+                w_customized_global[key] = w_customized[offset:offset + value.numel()].view_as(value)
+                offset += value.numel()
+            client.customized_model.load_state_dict(w_customized_global)
+
+    @staticmethod
+    def popcount_table(device):
+        return torch.tensor([bin(b).count('1') for b in range(256)], dtype=torch.int32, device=device)
 
     def send_models(self):
         if self.epoch != 0:
@@ -26,6 +26,7 @@ class FedCP(Server):
                             train_slow=train_slow, 
                             send_slow=send_slow,
                             ConditionalSelection=cs)
+            self.attach_client(client)
             self.clients.append(client)
 
         print(f"\nJoin ratio / total clients: {self.join_ratio} / {self.num_clients}")
@@ -37,11 +38,8 @@ class FedCP(Server):
         self.cs = None
 
 
-    def send_models(self):
-        assert (len(self.clients) > 0)
-
-        for client in self.clients:
-            client.set_parameters(self.global_modules)
+    def push_model(self, client):
+        client.set_parameters(self.global_modules)
 
     def add_parameters(self, w, client_model):
         for server_param, client_param in zip(self.global_modules.parameters(), client_model.parameters()):
@@ -73,7 +71,7 @@ class FedCP(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
 
@@ -94,6 +92,7 @@ class FedCP(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*50, self.Budget[-1])
+            self.end_round(i)
 
         print("\nBest accuracy.")
         print(max(self.rs_test_acc))
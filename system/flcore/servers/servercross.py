@@ -31,7 +31,7 @@ class FedCross(Server):
             self.w_locals.append(copy.deepcopy(self.global_model))
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
 
             if i%self.eval_gap == 0:
@@ -41,10 +41,10 @@ class FedCross(Server):
 
             self.selected_clients = self.select_clients()
 
-            for i, client in enumerate(self.selected_clients):
-                client.set_parameters(self.w_locals[i])
+            for idx, client in enumerate(self.selected_clients):
+                client.set_parameters(self.w_locals[idx])
                 client.train()
-                client.clone_model(client.model, self.w_locals[i])
+                client.clone_model(client.model, self.w_locals[idx])
 
             # Receive models from clients
             self.receive_models()
@@ -62,12 +62,13 @@ class FedCross(Server):
                 # Cross aggregation
                 self.w_locals = self.cross_aggregation(i, sim_tab)
             else:
-                for i in range(len(self.w_locals)):
-                    for param, global_param in zip(self.w_locals[i].parameters(), self.global_model.parameters()):
+                for idx in range(len(self.w_locals)):
+                    for param, global_param in zip(self.w_locals[idx].parameters(), self.global_model.parameters()):
                         param.data = global_param.data.clone()
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -1,5 +1,4 @@
 import copy
-import random
 import time
 from flcore.clients.clientda import clientDA
 from flcore.servers.serverbase import Server
@@ -23,7 +22,7 @@ class PFL_DA(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -46,6 +45,7 @@ class PFL_DA(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -70,16 +70,13 @@ class PFL_DA(Server):
     def receive_models(self):
         assert (len(self.selected_clients) > 0)
 
-        active_clients = random.sample(
-            self.selected_clients, int((1-self.client_drop_rate) * self.current_num_join_clients))
+        active_clients = self.sample_active_clients()
 
         self.uploaded_weights = []
         self.uploaded_models = []
         tot_samples = 0
         for client in active_clients:
-            client_time_cost = client.train_time_cost['total_cost'] / client.train_time_cost['num_rounds'] + \
-                    client.send_time_cost['total_cost'] / client.send_time_cost['num_rounds']
-            if client_time_cost <= self.time_threthold:
+            if self.clock.in_time(client.id):
                 tot_samples += client.train_samples
                 self.uploaded_weights.append(client.train_samples)
                 self.uploaded_models.append(client.global_head)
@@ -28,7 +28,7 @@ class FedDyn(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -54,6 +54,7 @@ class FedDyn(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*50, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
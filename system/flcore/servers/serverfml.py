@@ -1,5 +1,4 @@
 import copy
-import random
 import time
 from flcore.clients.clientfml import clientFML
 from flcore.servers.serverbase import Server
@@ -22,7 +21,7 @@ class FML(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -47,6 +46,7 @@ class FML(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -71,18 +71,12 @@ class FML(Server):
     def receive_models(self):
         assert (len(self.selected_clients) > 0)
 
-        active_clients = random.sample(
-            self.selected_clients, int((1-self.client_drop_rate) * self.current_num_join_clients))
+        active_clients = self.sample_active_clients()
 
         self.uploaded_ids = []
         self.uploaded_models = []
         for client in active_clients:
-            try:
-                client_time_cost = client.train_time_cost['total_cost'] / client.train_time_cost['num_rounds'] + \
-                        client.send_time_cost['total_cost'] / client.send_time_cost['num_rounds']
-            except ZeroDivisionError:
-                client_time_cost = 0
-            if client_time_cost <= self.time_threthold:
+            if self.clock.in_time(client.id):
                 self.uploaded_ids.append(client.id)
                 self.uploaded_models.append(client.global_model)
 
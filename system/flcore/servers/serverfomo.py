@@ -1,12 +1,13 @@
 import torch
 import time
-import copy
-import random
+import os
 import numpy as np
 from flcore.clients.clientfomo import clientFomo
 from flcore.servers.serverbase import Server
 from threading import Thread
 from utils.dlg import DLG
+from utils.mem_utils import model_nbytes
+from utils.model_store import ClientModelStore
 
 
 class FedFomo(Server):
@@ -20,15 +21,18 @@ class FedFomo(Server):
         self.P = torch.diag(torch.ones(self.num_clients, device=self.device))
         self.uploaded_ids = []
         self.M = min(args.M, self.num_join_clients)
-        self.client_models = [copy.deepcopy(self.global_model) for _ in range(self.num_clients)]
+        store_path = os.path.join(args.model_store_path, self.checkpointer.prefix + '_client_models.bin') \
+            if args.model_store_path else None
+        self.client_models = ClientModelStore(self.global_model, self.num_clients, args.model_store_dtype, store_path)
             
         print(f"\nJoin ratio / total clients: {self.join_ratio} / {self.num_clients}")
+        print(f"Client models on the server: {self.client_models.nbytes() / 2**20:.2f} MB ({args.model_store_dtype})")
         print("Finished creating server and clients.")
         self.Budget = []
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -52,6 +56,7 @@ class FedFomo(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -66,14 +71,13 @@ class FedFomo(Server):
         self.save_results()
 
 
+    # only selected clients train on the models they receive, they are decoded for them alone
     def send_models(self):
         assert (len(self.selected_clients) > 0)
-        for client in self.clients:
+        nbytes = model_nbytes(self.global_model)
+        for client in self.selected_clients:
             start_time = time.time()
 
-            if client.send_slow:
-                time.sleep(0.1 * np.abs(np.random.rand()))
-
             M_ = min(self.M, len(self.uploaded_ids)) # if clients dropped
             indices = torch.topk(self.P[client.id], M_).indices.tolist()
 
@@ -81,9 +85,10 @@ class FedFomo(Server):
             send_models = []
             for i in indices:
                 send_ids.append(i)
-                send_models.append(self.client_models[i])
+                send_models.append(self.client_models.get(i))
 
             client.receive_models(send_ids, send_models)
+            self.clock.transfer(client.id, nbytes * len(send_models))
 
             client.send_time_cost['num_rounds'] += 1
             client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
@@ -91,23 +96,17 @@ class FedFomo(Server):
     def receive_models(self):
         assert (len(self.selected_clients) > 0)
 
-        active_clients = random.sample(
-            self.selected_clients, int((1-self.client_drop_rate) * self.current_num_join_clients))
+        active_clients = self.sample_active_clients()
 
         self.uploaded_ids = []
         self.uploaded_weights = []
         tot_samples = 0
         for client in active_clients:
-            try:
-                client_time_cost = client.train_time_cost['total_cost'] / client.train_time_cost['num_rounds'] + \
-                        client.send_time_cost['total_cost'] / client.send_time_cost['num_rounds']
-            except ZeroDivisionError:
-                client_time_cost = 0
-            if client_time_cost <= self.time_threthold:
+            if self.clock.in_time(client.id):
                 tot_samples += client.train_samples
                 self.uploaded_ids.append(client.id)
                 self.uploaded_weights.append(client.train_samples)
-                self.client_models[client.id] = copy.deepcopy(client.model)
+                self.client_models.put(client.id, client.model)
                 self.P[client.id] += client.weight_vector
         for i, w in enumerate(self.uploaded_weights):
             self.uploaded_weights[i] = w / tot_samples
@@ -116,7 +115,8 @@ class FedFomo(Server):
         # items = []
         cnt = 0
         psnr_val = 0
-        for cid, client_model_server in zip(range(self.num_clients), self.client_models):
+        for cid in range(self.num_clients):
+            client_model_server = self.client_models.get(cid)
             client_model = self.clients[cid].model
             client_model.eval()
             origin_grad = []
@@ -130,11 +130,7 @@ class FedFomo(Server):
                     if i >= self.batch_num_per_client:
                         break
 
-                    if type(x) == type([]):
-                        x[0] = x[0].to(self.device)
-                    else:
-                        x = x.to(self.device)
-                    y = y.to(self.device)
+                    x, y = self.clients[cid].to_device(x, y)
                     output = client_model(x)
                     target_inputs.append((x, output))
 
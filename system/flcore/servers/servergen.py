@@ -1,11 +1,9 @@
 import copy
-import random
 import time
-import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from flcore.clients.clientgen import clientGen
+from flcore.clients.clientgen import clientGen, sample_labels
 from flcore.servers.serverbase import Server
 from threading import Thread
 
@@ -40,12 +38,9 @@ class FedGen(Server):
             optimizer=self.generative_optimizer, gamma=args.learning_rate_decay_gamma)
         self.loss = nn.CrossEntropyLoss()
         
-        self.qualified_labels = []
+        self.label_counts = torch.stack([client.sample_per_class for client in self.clients]).sum(0).to(self.device)
         for client in self.clients:
-            for yy in range(self.num_classes):
-                self.qualified_labels.extend([yy for _ in range(int(client.sample_per_class[yy].item()))])
-        for client in self.clients:
-            client.qualified_labels = self.qualified_labels
+            client.label_counts = self.label_counts
 
         self.server_epochs = args.server_epochs
         self.localize_feature_extractor = args.localize_feature_extractor
@@ -54,7 +49,7 @@ class FedGen(Server):
         
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -80,6 +75,7 @@ class FedGen(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -102,34 +98,20 @@ class FedGen(Server):
             self.evaluate()
 
 
-    def send_models(self):
-        assert (len(self.clients) > 0)
-
-        for client in self.clients:
-            start_time = time.time()
-            
-            client.set_parameters(self.global_model, self.generative_model)
-
-            client.send_time_cost['num_rounds'] += 1
-            client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
+    def push_model(self, client):
+        client.set_parameters(self.global_model, self.generative_model)
 
     def receive_models(self):
         assert (len(self.selected_clients) > 0)
 
-        active_clients = random.sample(
-            self.selected_clients, int((1-self.client_drop_rate) * self.current_num_join_clients))
+        active_clients = self.sample_active_clients()
 
         self.uploaded_ids = []
         self.uploaded_weights = []
         self.uploaded_models = []
         tot_samples = 0
         for client in active_clients:
-            try:
-                client_time_cost = client.train_time_cost['total_cost'] / client.train_time_cost['num_rounds'] + \
-                        client.send_time_cost['total_cost'] / client.send_time_cost['num_rounds']
-            except ZeroDivisionError:
-                client_time_cost = 0
-            if client_time_cost <= self.time_threthold:
+            if self.clock.in_time(client.id):
                 tot_samples += client.train_samples
                 self.uploaded_ids.append(client.id)
                 self.uploaded_weights.append(client.train_samples)
@@ -144,8 +126,7 @@ class FedGen(Server):
         self.generative_model.train()
 
         for _ in range(self.server_epochs):
-            labels = np.random.choice(self.qualified_labels, self.batch_size)
-            labels = torch.LongTensor(labels).to(self.device)
+            labels = sample_labels(self.label_counts, self.batch_size)
             z = self.generative_model(labels)
 
             logits = 0
@@ -167,18 +148,15 @@ class FedGen(Server):
     # fine-tuning on new clients
     def fine_tuning_new_clients(self):
         for client in self.new_clients:
-            client.set_parameters(self.global_model, self.generative_model, self.qualified_labels)
+            client.set_parameters(self.global_model, self.generative_model)
+            client.label_counts = self.label_counts
             opt = torch.optim.SGD(client.model.parameters(), lr=self.learning_rate)
             CEloss = torch.nn.CrossEntropyLoss()
             trainloader = client.load_train_data()
             client.model.train()
             for e in range(self.fine_tuning_epoch_new):
                 for i, (x, y) in enumerate(trainloader):
-                    if type(x) == type([]):
-                        x[0] = x[0].to(client.device)
-                    else:
-                        x = x.to(client.device)
-                    y = y.to(client.device)
+                    x, y = client.to_device(x, y)
                     output = client.model(x)
                     loss = CEloss(output, y)
                     opt.zero_grad()
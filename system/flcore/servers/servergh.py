@@ -29,7 +29,7 @@ class FedGH(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -53,6 +53,7 @@ class FedGH(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -67,16 +68,8 @@ class FedGH(Server):
         self.save_results()
 
 
-    def send_models(self):
-        assert (len(self.clients) > 0)
-
-        for client in self.clients:
-            start_time = time.time()
-            
-            client.set_parameters(self.head)
-
-            client.send_time_cost['num_rounds'] += 1
-            client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
+    def push_model(self, client):
+        client.set_parameters(self.head)
 
     def receive_protos(self):
         assert (len(self.selected_clients) > 0)
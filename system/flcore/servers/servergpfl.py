@@ -16,6 +16,8 @@ class GPFL(Server):
                             num_classes=args.num_classes,
                             dev=args.device).to(args.device)
         args.CoV = CoV(self.feature_dim).to(args.device)
+        self.GCE = copy.deepcopy(args.GCE)
+        self.CoV = copy.deepcopy(args.CoV)
 
         # select slow clients
         self.set_slow_clients()
@@ -29,7 +31,7 @@ class GPFL(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
 
@@ -55,6 +57,7 @@ class GPFL(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -96,19 +99,10 @@ class GPFL(Server):
             self.uploaded_weights.append(client.train_samples / active_train_samples)
             self.uploaded_model_gs.append(client.GCE)
 
-        self.GCE = copy.deepcopy(self.uploaded_model_gs[0])
-        for param in self.GCE.parameters():
-            param.data = torch.zeros_like(param.data)
-            
-        for w, client_model in zip(self.uploaded_weights, self.uploaded_model_gs):
-            self.add_GCE(w, client_model)
+        self.average_modules(self.uploaded_model_gs, self.uploaded_weights, self.GCE)
 
         for client in self.clients:
             client.set_GCE(self.GCE)
-
-    def add_GCE(self, w, GCE):
-        for server_param, client_param in zip(self.GCE.parameters(), GCE.parameters()):
-            server_param.data += client_param.data.clone() * w
             
     def global_CoV(self):
         active_train_samples = 0
@@ -121,20 +115,11 @@ class GPFL(Server):
             self.uploaded_weights.append(client.train_samples / active_train_samples)
             self.uploaded_model_gs.append(client.CoV)
 
-        self.CoV = copy.deepcopy(self.uploaded_model_gs[0])
-        for param in self.CoV.parameters():
-            param.data = torch.zeros_like(param.data)
-            
-        for w, client_model in zip(self.uploaded_weights, self.uploaded_model_gs):
-            self.add_CoV(w, client_model)
+        self.average_modules(self.uploaded_model_gs, self.uploaded_weights, self.CoV)
 
         for client in self.clients:
             client.set_CoV(self.CoV)
 
-    def add_CoV(self, w, CoV):
-        for server_param, client_param in zip(self.CoV.parameters(), CoV.parameters()):
-            server_param.data += client_param.data.clone() * w
-
 
 class GCE(nn.Module):
     def __init__(self, in_features, num_classes, dev='cpu'):
@@ -145,16 +130,9 @@ class GCE(nn.Module):
         self.dev = dev
 
     def forward(self, x, label):
-        embeddings = self.embedding(torch.tensor(range(self.num_classes), device=self.dev))
-        cosine = F.linear(F.normalize(x), F.normalize(embeddings))
-        one_hot = torch.zeros(cosine.size(), device=self.dev)
-        one_hot.scatter_(1, label.view(-1, 1).long(), 1)
-
-        softmax_value = F.log_softmax(cosine, dim=1)
-        softmax_loss = one_hot * softmax_value
-        softmax_loss = - torch.mean(torch.sum(softmax_loss, dim=1))
-
-        return softmax_loss
+        # the embedding table holds one row per class
+        cosine = F.linear(F.normalize(x), F.normalize(self.embedding.weight))
+        return F.cross_entropy(cosine, label.long())
 
 
 class CoV(nn.Module):
@@ -1,5 +1,4 @@
 import copy
-import random
 import time
 import numpy as np
 from flcore.clients.clientkd import clientKD
@@ -27,8 +26,10 @@ class FedKD(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
+            # from the round index, so that it follows the schedule of this run when resuming
+            self.energy = self.T_start + (i / self.global_rounds) * (self.T_end - self.T_start)
             self.selected_clients = self.select_clients()
             self.send_models()
 
@@ -53,12 +54,11 @@ class FedKD(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
 
-            self.energy = self.T_start + ((1 + i) / self.global_rounds) * (self.T_end - self.T_start)
-
         print("\nBest accuracy.")
         # self.print_(max(self.rs_test_acc), max(
         #     self.rs_train_acc), min(self.rs_train_loss))
@@ -77,32 +77,18 @@ class FedKD(Server):
             self.evaluate()
             
 
-    def send_models(self):
-        assert (len(self.clients) > 0)
-
-        for client in self.clients:
-            start_time = time.time()
-            
-            client.set_parameters(self.compressed_param, self.energy)
-
-            client.send_time_cost['num_rounds'] += 1
-            client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
+    def push_model(self, client):
+        client.set_parameters(self.compressed_param, self.energy)
 
     def receive_models(self):
         assert (len(self.selected_clients) > 0)
 
-        active_clients = random.sample(
-            self.selected_clients, int((1-self.client_drop_rate) * self.current_num_join_clients))
+        active_clients = self.sample_active_clients()
 
         self.uploaded_ids = []
         self.uploaded_models = []
         for client in active_clients:
-            try:
-                client_time_cost = client.train_time_cost['total_cost'] / client.train_time_cost['num_rounds'] + \
-                        client.send_time_cost['total_cost'] / client.send_time_cost['num_rounds']
-            except ZeroDivisionError:
-                client_time_cost = 0
-            if client_time_cost <= self.time_threthold:
+            if self.clock.in_time(client.id):
                 self.uploaded_ids.append(client.id)
                 # recover
                 for k in client.compressed_param.keys():
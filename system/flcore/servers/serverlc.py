@@ -17,13 +17,10 @@ class FedLC(Server):
         self.set_slow_clients()
         self.set_clients(clientLC)
 
-        sample_per_class = torch.zeros(args.num_classes).to(args.device)
+        sample_per_class = torch.stack([client.sample_per_class for client in self.clients]).sum(0)
+        calibration = args.tau * sample_per_class ** (-1/4)
         for client in self.clients:
-            for y in range(args.num_classes):
-                sample_per_class[y] += client.sample_per_class[y]
-        val = args.tau * sample_per_class ** (-1/4)
-        for client in self.clients:
-            client.calibration = torch.tile(val, (args.batch_size, 1))
+            client.calibration = calibration
 
         print(f"\nJoin ratio / total clients: {self.join_ratio} / {self.num_clients}")
         print("Finished creating server and clients.")
@@ -33,7 +30,7 @@ class FedLC(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -58,6 +55,7 @@ class FedLC(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -1,7 +1,5 @@
-import os
 import time
 import copy
-import h5py
 from flcore.clients.clientpFedMe import clientpFedMe
 from flcore.servers.serverbase import Server
 from threading import Thread
@@ -25,7 +23,7 @@ class pFedMe(Server):
         self.Budget = []
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             self.send_models()
@@ -57,6 +55,7 @@ class pFedMe(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc_per], top_cnt=self.top_cnt):
                 break
@@ -85,6 +84,13 @@ class pFedMe(Server):
             self.evaluate()
 
 
+    def result_series(self):
+        return {
+            'rs_test_acc': self.rs_test_acc_per, 
+            'rs_train_acc': self.rs_train_acc_per, 
+            'rs_train_loss': self.rs_train_loss_per, 
+        }
+
     def beta_aggregate_parameters(self):
         # aggregate avergage model with previous model using parameter beta
         for pre_param, param in zip(self.previous_global_model, self.global_model.parameters()):
@@ -135,23 +141,3 @@ class pFedMe(Server):
         self.rs_train_loss_per.append(train_loss)
 
         self.print_(test_acc, train_acc, train_loss)
-
-    def save_results(self):
-        algo = self.dataset + "_" + self.algorithm
-        result_path = "../results/"
-        if not os.path.exists(result_path):
-            os.makedirs(result_path)
-
-        # if (len(self.rs_test_acc) & len(self.rs_train_acc) & len(self.rs_train_loss)):
-        #     algo1 = algo + "_" + self.goal + "_" + str(self.times)
-        #     with h5py.File(result_path + "{}.h5".format(algo1), 'w') as hf:
-        #         hf.create_dataset('rs_test_acc', data=self.rs_test_acc)
-        #         hf.create_dataset('rs_train_acc', data=self.rs_train_acc)
-        #         hf.create_dataset('rs_train_loss', data=self.rs_train_loss)
-
-        if (len(self.rs_test_acc_per)):
-            algo2 = algo + "_" + self.goal + "_" + str(self.times)
-            with h5py.File(result_path + "{}.h5".format(algo2), 'w') as hf:
-                hf.create_dataset('rs_test_acc', data=self.rs_test_acc_per)
-                hf.create_dataset('rs_train_acc', data=self.rs_train_acc_per)
-                hf.create_dataset('rs_train_loss', data=self.rs_train_loss_per)
@@ -19,7 +19,7 @@ class PerAvg(Server):
         self.Budget = []
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             s_t = time.time()
             self.selected_clients = self.select_clients()
             # send all parameter for clients
@@ -47,6 +47,7 @@ class PerAvg(Server):
 
             self.Budget.append(time.time() - s_t)
             print('-'*25, 'time cost', '-'*25, self.Budget[-1])
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -69,19 +70,20 @@ class PerAvg(Server):
 
 
     def evaluate_one_step(self, acc=None, loss=None):
-        models_temp = []
         for c in self.clients:
-            models_temp.append(copy.deepcopy(c.model))
+            # the snapshot has to hold the latest global model
+            self.sync_client(c)
+            c.eval_snapshot.save()
             c.train_one_step()
         stats = self.test_metrics()
         # set the local model back on clients for training process
-        for i, c in enumerate(self.clients):
-            c.clone_model(models_temp[i], c.model)
+        for c in self.clients:
+            c.eval_snapshot.load()
             
         stats_train = self.train_metrics()
         # set the local model back on clients for training process
-        for i, c in enumerate(self.clients):
-            c.clone_model(models_temp[i], c.model)
+        for c in self.clients:
+            c.eval_snapshot.load()
 
         accs = [a / n for a, n in zip(stats[2], stats[1])]
 
@@ -21,7 +21,7 @@ class FedPHP(Server):
 
 
     def train(self):
-        for i in range(self.global_rounds+1):
+        for i in range(self.start_round, self.global_rounds+1):
             self.selected_clients = self.select_clients()
             self.send_models(i)
 
@@ -42,6 +42,7 @@ class FedPHP(Server):
             if self.dlg_eval and i%self.dlg_gap == 0:
                 self.call_dlg(i)
             self.aggregate_parameters()
+            self.end_round(i)
 
             if self.auto_break and self.check_done(acc_lss=[self.rs_test_acc], top_cnt=self.top_cnt):
                 break
@@ -62,15 +63,11 @@ class FedPHP(Server):
 
 
     def send_models(self, R):
-        assert (len(self.selected_clients) > 0)
+        self.R = R
+        super().send_models()
 
-        for client in self.clients:
-            start_time = time.time()
-
-            client.set_parameters(self.global_model, R)
-
-            client.send_time_cost['num_rounds'] += 1
-            client.send_time_cost['total_cost'] += 2 * (time.time() - start_time)
+    def push_model(self, client):
+        client.set_parameters(self.global_model, self.R)
 
     # fine-tuning on new clients
     def fine_tuning_new_clients(self):
@@ -82,11 +79,7 @@ class FedPHP(Server):
             client.model.train()
             for e in range(self.fine_tuning_epoch_new):
                 for i, (x, y) in enumerate(trainloader):
-                    if type(x) == type([]):
-                        x[0] = x[0].to(client.device)
-                    else:
-                        x = x.to(client.device)
-                    y = y.to(client.device)
+                    x, y = client.to_device(x, y)
                     output = client.model(x)
                     loss = CEloss(output, y)
                     opt.zero_grad()
@@ -35,7 +35,7 @@ class SR_FedAvg(Server):
         self.Budget = []
 
     def train(self):
-        for i in range(self.global_rounds + 1):
+        for i in range(self.start_round, self.global_rounds + 1):
             start_time = time.time()
 
             # ---- client selection & broadcast ----
@@ -65,6 +65,7 @@ class SR_FedAvg(Server):
             # ---- bookkeeping ----
             self.Budget.append(time.time() - start_time)
             print('-' * 25, 'time cost', '-' * 25, self.Budget[-1])
+            self.end_round(i)
 
             # ---- early stopping ----
             if self.auto_break and self.check_done(
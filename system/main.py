@@ -1,55 +1,13 @@
 #!/usr/bin/env python
-import copy
 import torch
 import argparse
 import os
 import time
 import warnings
 import numpy as np
-import torchvision
 import logging
 
-from flcore.servers.serveravg import FedAvg
-from flcore.servers.serverpFedMe import pFedMe
-from flcore.servers.serverperavg import PerAvg
-from flcore.servers.serverprox import FedProx
-from flcore.servers.serverfomo import FedFomo
-from flcore.servers.serveramp import FedAMP
-from flcore.servers.servermtl import FedMTL
-from flcore.servers.serverlocal import Local
-from flcore.servers.serverper import FedPer
-from flcore.servers.serverapfl import APFL
-from flcore.servers.serverditto import Ditto
-from flcore.servers.serverrep import FedRep
-from flcore.servers.serverphp import FedPHP
-from flcore.servers.serverbn import FedBN
-from flcore.servers.serverrod import FedROD
-from flcore.servers.serverproto import FedProto
-from flcore.servers.serverdyn import FedDyn
-from flcore.servers.servermoon import MOON
-from flcore.servers.serverbabu import FedBABU
-from flcore.servers.serverapple import APPLE
-from flcore.servers.servergen import FedGen
-from flcore.servers.serverscaffold import SCAFFOLD
-from flcore.servers.serverfd import FD
-from flcore.servers.serverala import FedALA
-from flcore.servers.serverpac import FedPAC
-from flcore.servers.serverlg import LG_FedAvg
-from flcore.servers.servergc import FedGC
-from flcore.servers.serverfml import FML
-from flcore.servers.serverkd import FedKD
-from flcore.servers.serverpcl import FedPCL
-from flcore.servers.servercp import FedCP
-from flcore.servers.servergpfl import GPFL
-from flcore.servers.serverntd import FedNTD
-from flcore.servers.servergh import FedGH
-from flcore.servers.serverdbe import FedDBE
-from flcore.servers.servercac import FedCAC
-from flcore.servers.serverda import PFL_DA
-from flcore.servers.serverlc import FedLC
-from flcore.servers.serveras import FedAS
-from flcore.servers.servercross import FedCross
-from flcore.servers.serversrfedavg import SR_FedAvg
+from flcore.servers.registry import ALGORITHMS, get_algorithm
 
 from flcore.trainmodel.models import *
 
@@ -60,7 +18,9 @@ from flcore.trainmodel.mobilenet_v2 import *
 from flcore.trainmodel.transformer import *
 
 from utils.result_utils import average_data
+from utils.data_utils import set_data_cache
 from utils.mem_utils import MemReporter
+from utils.compile_utils import compile_model
 
 logger = logging.getLogger()
 logger.setLevel(logging.ERROR)
@@ -69,308 +29,141 @@ warnings.simplefilter("ignore")
 torch.manual_seed(0)
 
 
-def run(args):
-
-    time_list = []
-    reporter = MemReporter()
-    model_str = args.model
+def build_server(args, model_str, times):
+    """Creates the model named model_str and the server (with its clients) of one run."""
+    # Generate args.model
+    if model_str == "MLR": # convex
+        if "MNIST" in args.dataset:
+            args.model = Mclr_Logistic(1*28*28, num_classes=args.num_classes).to(args.device)
+        elif "Cifar10" in args.dataset:
+            args.model = Mclr_Logistic(3*32*32, num_classes=args.num_classes).to(args.device)
+        else:
+            args.model = Mclr_Logistic(60, num_classes=args.num_classes).to(args.device)
+
+    elif model_str == "CNN": # non-convex
+        if "MNIST" in args.dataset:
+            args.model = FedAvgCNN(in_features=1, num_classes=args.num_classes, dim=1024).to(args.device)
+        elif "Cifar10" in args.dataset:
+            args.model = FedAvgCNN(in_features=3, num_classes=args.num_classes, dim=1600).to(args.device)
+        elif "Omniglot" in args.dataset:
+            args.model = FedAvgCNN(in_features=1, num_classes=args.num_classes, dim=33856).to(args.device)
+            # args.model = CifarNet(num_classes=args.num_classes).to(args.device)
+        elif "Digit5" in args.dataset:
+            args.model = Digit5CNN().to(args.device)
+        else:
+            args.model = FedAvgCNN(in_features=3, num_classes=args.num_classes, dim=10816).to(args.device)
 
-    for i in range(args.prev, args.times):
-        print(f"\n============= Running time: {i}th =============")
-        print("Creating server and clients ...")
-        start = time.time()
+    elif model_str == "DNN": # non-convex
+        if "MNIST" in args.dataset:
+            args.model = DNN(1*28*28, 100, num_classes=args.num_classes).to(args.device)
+        elif "Cifar10" in args.dataset:
+            args.model = DNN(3*32*32, 100, num_classes=args.num_classes).to(args.device)
+        else:
+            args.model = DNN(60, 20, num_classes=args.num_classes).to(args.device)
+    
+    elif model_str == "ResNet18":
+        import torchvision
+        args.model = torchvision.models.resnet18(pretrained=False, num_classes=args.num_classes).to(args.device)
+        
+        # args.model = torchvision.models.resnet18(pretrained=True).to(args.device)
+        # feature_dim = list(args.model.fc.parameters())[0].shape[1]
+        # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
+        
+        # args.model = resnet18(num_classes=args.num_classes, has_bn=True, bn_block_num=4).to(args.device)
+    
+    elif model_str == "ResNet10":
+        args.model = resnet10(num_classes=args.num_classes).to(args.device)
+    
+    elif model_str == "ResNet34":
+        import torchvision
+        args.model = torchvision.models.resnet34(pretrained=False, num_classes=args.num_classes).to(args.device)
 
-        # Generate args.model
-        if model_str == "MLR": # convex
-            if "MNIST" in args.dataset:
-                args.model = Mclr_Logistic(1*28*28, num_classes=args.num_classes).to(args.device)
-            elif "Cifar10" in args.dataset:
-                args.model = Mclr_Logistic(3*32*32, num_classes=args.num_classes).to(args.device)
-            else:
-                args.model = Mclr_Logistic(60, num_classes=args.num_classes).to(args.device)
-
-        elif model_str == "CNN": # non-convex
-            if "MNIST" in args.dataset:
-                args.model = FedAvgCNN(in_features=1, num_classes=args.num_classes, dim=1024).to(args.device)
-            elif "Cifar10" in args.dataset:
-                args.model = FedAvgCNN(in_features=3, num_classes=args.num_classes, dim=1600).to(args.device)
-            elif "Omniglot" in args.dataset:
-                args.model = FedAvgCNN(in_features=1, num_classes=args.num_classes, dim=33856).to(args.device)
-                # args.model = CifarNet(num_classes=args.num_classes).to(args.device)
-            elif "Digit5" in args.dataset:
-                args.model = Digit5CNN().to(args.device)
-            else:
-                args.model = FedAvgCNN(in_features=3, num_classes=args.num_classes, dim=10816).to(args.device)
-
-        elif model_str == "DNN": # non-convex
-            if "MNIST" in args.dataset:
-                args.model = DNN(1*28*28, 100, num_classes=args.num_classes).to(args.device)
-            elif "Cifar10" in args.dataset:
-                args.model = DNN(3*32*32, 100, num_classes=args.num_classes).to(args.device)
-            else:
-                args.model = DNN(60, 20, num_classes=args.num_classes).to(args.device)
+    elif model_str == "AlexNet":
+        args.model = alexnet(pretrained=False, num_classes=args.num_classes).to(args.device)
+        
+        # args.model = alexnet(pretrained=True).to(args.device)
+        # feature_dim = list(args.model.fc.parameters())[0].shape[1]
+        # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
         
-        elif model_str == "ResNet18":
-            args.model = torchvision.models.resnet18(pretrained=False, num_classes=args.num_classes).to(args.device)
-            
-            # args.model = torchvision.models.resnet18(pretrained=True).to(args.device)
-            # feature_dim = list(args.model.fc.parameters())[0].shape[1]
-            # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
-            
-            # args.model = resnet18(num_classes=args.num_classes, has_bn=True, bn_block_num=4).to(args.device)
+    elif model_str == "GoogleNet":
+        import torchvision
+        args.model = torchvision.models.googlenet(pretrained=False, aux_logits=False, 
+                                                  num_classes=args.num_classes).to(args.device)
         
-        elif model_str == "ResNet10":
-            args.model = resnet10(num_classes=args.num_classes).to(args.device)
+        # args.model = torchvision.models.googlenet(pretrained=True, aux_logits=False).to(args.device)
+        # feature_dim = list(args.model.fc.parameters())[0].shape[1]
+        # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
+
+    elif model_str == "MobileNet":
+        args.model = mobilenet_v2(pretrained=False, num_classes=args.num_classes).to(args.device)
         
-        elif model_str == "ResNet34":
-            args.model = torchvision.models.resnet34(pretrained=False, num_classes=args.num_classes).to(args.device)
-
-        elif model_str == "AlexNet":
-            args.model = alexnet(pretrained=False, num_classes=args.num_classes).to(args.device)
-            
-            # args.model = alexnet(pretrained=True).to(args.device)
-            # feature_dim = list(args.model.fc.parameters())[0].shape[1]
-            # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
-            
-        elif model_str == "GoogleNet":
-            args.model = torchvision.models.googlenet(pretrained=False, aux_logits=False, 
-                                                      num_classes=args.num_classes).to(args.device)
-            
-            # args.model = torchvision.models.googlenet(pretrained=True, aux_logits=False).to(args.device)
-            # feature_dim = list(args.model.fc.parameters())[0].shape[1]
-            # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
-
-        elif model_str == "MobileNet":
-            args.model = mobilenet_v2(pretrained=False, num_classes=args.num_classes).to(args.device)
-            
-            # args.model = mobilenet_v2(pretrained=True).to(args.device)
-            # feature_dim = list(args.model.fc.parameters())[0].shape[1]
-            # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
-            
-        elif model_str == "LSTM":
-            args.model = LSTMNet(hidden_dim=args.feature_dim, vocab_size=args.vocab_size, num_classes=args.num_classes).to(args.device)
-
-        elif model_str == "BiLSTM":
-            args.model = BiLSTM_TextClassification(input_size=args.vocab_size, hidden_size=args.feature_dim, 
-                                                   output_size=args.num_classes, num_layers=1, 
-                                                   embedding_dropout=0, lstm_dropout=0, attention_dropout=0, 
-                                                   embedding_length=args.feature_dim).to(args.device)
-
-        elif model_str == "fastText":
-            args.model = fastText(hidden_dim=args.feature_dim, vocab_size=args.vocab_size, num_classes=args.num_classes).to(args.device)
-
-        elif model_str == "TextCNN":
-            args.model = TextCNN(hidden_dim=args.feature_dim, max_len=args.max_len, vocab_size=args.vocab_size, 
-                                 num_classes=args.num_classes).to(args.device)
-
-        elif model_str == "Transformer":
-            args.model = TransformerModel(ntoken=args.vocab_size, d_model=args.feature_dim, nhead=8, nlayers=2, 
-                                          num_classes=args.num_classes, max_len=args.max_len).to(args.device)
+        # args.model = mobilenet_v2(pretrained=True).to(args.device)
+        # feature_dim = list(args.model.fc.parameters())[0].shape[1]
+        # args.model.fc = nn.Linear(feature_dim, args.num_classes).to(args.device)
         
-        elif model_str == "AmazonMLP":
-            args.model = AmazonMLP().to(args.device)
+    elif model_str == "LSTM":
+        args.model = LSTMNet(hidden_dim=args.feature_dim, vocab_size=args.vocab_size, num_classes=args.num_classes).to(args.device)
 
-        elif model_str == "HARCNN":
-            if args.dataset == 'HAR':
-                args.model = HARCNN(9, dim_hidden=1664, num_classes=args.num_classes, conv_kernel_size=(1, 9), 
-                                    pool_kernel_size=(1, 2)).to(args.device)
-            elif args.dataset == 'PAMAP2':
-                args.model = HARCNN(9, dim_hidden=3712, num_classes=args.num_classes, conv_kernel_size=(1, 9), 
-                                    pool_kernel_size=(1, 2)).to(args.device)
+    elif model_str == "BiLSTM":
+        args.model = BiLSTM_TextClassification(input_size=args.vocab_size, hidden_size=args.feature_dim, 
+                                               output_size=args.num_classes, num_layers=1, 
+                                               embedding_dropout=0, lstm_dropout=0, attention_dropout=0, 
+                                               embedding_length=args.feature_dim).to(args.device)
 
-        else:
-            raise NotImplementedError
+    elif model_str == "fastText":
+        args.model = fastText(hidden_dim=args.feature_dim, vocab_size=args.vocab_size, num_classes=args.num_classes).to(args.device)
+
+    elif model_str == "TextCNN":
+        args.model = TextCNN(hidden_dim=args.feature_dim, max_len=args.max_len, vocab_size=args.vocab_size, 
+                             num_classes=args.num_classes).to(args.device)
 
-        print(args.model)
+    elif model_str == "Transformer":
+        args.model = TransformerModel(ntoken=args.vocab_size, d_model=args.feature_dim, nhead=8, nlayers=2, 
+                                      num_classes=args.num_classes, max_len=args.max_len).to(args.device)
+    
+    elif model_str == "AmazonMLP":
+        args.model = AmazonMLP().to(args.device)
 
-        # select algorithm
-        if args.algorithm == "FedAvg":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedAvg(args, i)
+    elif model_str == "HARCNN":
+        if args.dataset == 'HAR':
+            args.model = HARCNN(9, dim_hidden=1664, num_classes=args.num_classes, conv_kernel_size=(1, 9), 
+                                pool_kernel_size=(1, 2)).to(args.device)
+        elif args.dataset == 'PAMAP2':
+            args.model = HARCNN(9, dim_hidden=3712, num_classes=args.num_classes, conv_kernel_size=(1, 9), 
+                                pool_kernel_size=(1, 2)).to(args.device)
 
-        elif args.algorithm == "SR-FedAvg":
-            server = SR_FedAvg(args, i)
+    else:
+        raise NotImplementedError
 
-        elif args.algorithm == "Local":
-            server = Local(args, i)
-
-        elif args.algorithm == "FedMTL":
-            server = FedMTL(args, i)
-
-        elif args.algorithm == "PerAvg":
-            server = PerAvg(args, i)
-
-        elif args.algorithm == "pFedMe":
-            server = pFedMe(args, i)
-
-        elif args.algorithm == "FedProx":
-            server = FedProx(args, i)
-
-        elif args.algorithm == "FedFomo":
-            server = FedFomo(args, i)
-
-        elif args.algorithm == "FedAMP":
-            server = FedAMP(args, i)
-
-        elif args.algorithm == "APFL":
-            server = APFL(args, i)
-
-        elif args.algorithm == "FedPer":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedPer(args, i)
-
-        elif args.algorithm == "Ditto":
-            server = Ditto(args, i)
-
-        elif args.algorithm == "FedRep":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedRep(args, i)
-
-        elif args.algorithm == "FedPHP":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedPHP(args, i)
-
-        elif args.algorithm == "FedBN":
-            server = FedBN(args, i)
-
-        elif args.algorithm == "FedROD":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedROD(args, i)
-
-        elif args.algorithm == "FedProto":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedProto(args, i)
-
-        elif args.algorithm == "FedDyn":
-            server = FedDyn(args, i)
-
-        elif args.algorithm == "MOON":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = MOON(args, i)
-
-        elif args.algorithm == "FedBABU":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedBABU(args, i)
-
-        elif args.algorithm == "APPLE":
-            server = APPLE(args, i)
-
-        elif args.algorithm == "FedGen":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedGen(args, i)
-
-        elif args.algorithm == "SCAFFOLD":
-            server = SCAFFOLD(args, i)
-
-        elif args.algorithm == "FD":
-            server = FD(args, i)
-
-        elif args.algorithm == "FedALA":
-            server = FedALA(args, i)
-
-        elif args.algorithm == "FedPAC":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedPAC(args, i)
-
-        elif args.algorithm == "LG-FedAvg":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = LG_FedAvg(args, i)
-
-        elif args.algorithm == "FedGC":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedGC(args, i)
-
-        elif args.algorithm == "FML":
-            server = FML(args, i)
-
-        elif args.algorithm == "FedKD":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedKD(args, i)
-
-        elif args.algorithm == "FedPCL":
-            args.model.fc = nn.Identity()
-            server = FedPCL(args, i)
-
-        elif args.algorithm == "FedCP":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedCP(args, i)
-
-        elif args.algorithm == "GPFL":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = GPFL(args, i)
-
-        elif args.algorithm == "FedNTD":
-            server = FedNTD(args, i)
-
-        elif args.algorithm == "FedGH":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedGH(args, i)
-
-        elif args.algorithm == "FedDBE":
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedDBE(args, i)
-
-        elif args.algorithm == 'FedCAC':
-            server = FedCAC(args, i)
-
-        elif args.algorithm == 'PFL-DA':
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = PFL_DA(args, i)
-
-        elif args.algorithm == 'FedLC':
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedLC(args, i)
-
-        elif args.algorithm == 'FedAS':
-
-            args.head = copy.deepcopy(args.model.fc)
-            args.model.fc = nn.Identity()
-            args.model = BaseHeadSplit(args.model, args.head)
-            server = FedAS(args, i)
-            
-        elif args.algorithm == "FedCross":
-            server = FedCross(args, i)
+    print(args.model)
 
-        else:
-            raise NotImplementedError
+    # select algorithm
+    server_class, prepare_model = get_algorithm(args.algorithm)
+    if prepare_model is not None:
+        prepare_model(args)
+    if args.compile_models:
+        compile_model(args.model, args.compile_backend)
+    server = server_class(args, times)
+
+    return server
+
+
+def run(args):
+
+    time_list = []
+    reporter = MemReporter()
+    model_str = args.model
+    set_data_cache(args.data_cache)
+
+    for i in range(args.prev, args.times):
+        print(f"\n============= Running time: {i}th =============")
+        print("Creating server and clients ...")
+        start = time.time()
+
+        server = build_server(args, model_str, i)
+
+        if args.resume:
+            server.load_checkpoint(args.resume)
 
         server.train()
 
@@ -387,9 +180,7 @@ def run(args):
     reporter.report()
 
 
-if __name__ == "__main__":
-    total_start = time.time()
-
+def get_parser():
     parser = argparse.ArgumentParser()
     # general
     parser.add_argument('-go', "--goal", type=str, default="test", 
@@ -410,7 +201,8 @@ if __name__ == "__main__":
                         help="For auto_break")
     parser.add_argument('-ls', "--local_epochs", type=int, default=1, 
                         help="Multiple update steps in one local epoch.")
-    parser.add_argument('-algo', "--algorithm", type=str, default="FedAvg")
+    parser.add_argument('-algo', "--algorithm", type=str, default="FedAvg", 
+                        choices=list(ALGORITHMS.keys()))
     parser.add_argument('-jr', "--join_ratio", type=float, default=1.0,
                         help="Ratio of clients per round")
     parser.add_argument('-rjr', "--random_join_ratio", type=bool, default=False,
@@ -435,6 +227,38 @@ if __name__ == "__main__":
                         help="Set this for text tasks. 80 for Shakespeare. 32000 for AG_News and SogouNews.")
     parser.add_argument('-ml', "--max_len", type=int, default=200)
     parser.add_argument('-fs', "--few_shot", type=int, default=0)
+    parser.add_argument('-nw', "--num_workers", type=int, default=0,
+                        help="DataLoader worker processes per client loader")
+    parser.add_argument('-pf', "--prefetch", type=bool, default=False,
+                        help="Move the next batches to the device in a background thread")
+    parser.add_argument('-ddl', "--device_data_limit", type=float, default=32,
+                        help="Keep client datasets up to this size (MB) resident on the device")
+    parser.add_argument('-ddb', "--device_data_budget", type=float, default=1024,
+                        help="Total size (MB) of the client datasets kept resident on the device in a run")
+    parser.add_argument('-nfc', "--no_feature_cache", type=bool, default=False,
+                        help="Run a frozen base on every batch of head-only phases instead of once on the client's data")
+    parser.add_argument('-fch', "--feature_cache_half", type=bool, default=False,
+                        help="Store cached features in float16")
+    parser.add_argument('-prec', "--precision", type=str, default='fp32', choices=['fp32', 'bf16'],
+                        help="Precision of forward passes, weights and aggregation stay in float32")
+    parser.add_argument('-cm', "--compile_models", type=bool, default=False,
+                        help="Compile each model architecture once with torch.compile, shared by all clients")
+    parser.add_argument('-cmb', "--compile_backend", type=str, default='inductor')
+    parser.add_argument('-prof', "--profile", type=bool, default=False,
+                        help="Record per-round phase timings and memory into the results file")
+    parser.add_argument('-profr', "--profile_round", type=int, default=-1,
+                        help="Round to record a torch.profiler trace for, -1 for none")
+    parser.add_argument('-dc', "--data_cache", type=bool, default=False,
+                        help="Keep decoded client shards in memory for all runs of the process")
+    parser.add_argument('-mfg', "--metrics_flush_gap", type=int, default=10,
+                        help="Rounds between flushes of the results file")
+    parser.add_argument('-ckg', "--checkpoint_gap", type=int, default=0,
+                        help="Rounds between checkpoints of server and client state, 0 for none")
+    parser.add_argument('-ckk', "--checkpoint_keep", type=int, default=3,
+                        help="Number of checkpoints kept per run")
+    parser.add_argument('-ckf', "--checkpoint_folder", type=str, default='../checkpoints/')
+    parser.add_argument('-rs', "--resume", type=str, default='',
+                        help="Checkpoint file or folder to resume each run from")
     # practical
     parser.add_argument('-cdr', "--client_drop_rate", type=float, default=0.0,
                         help="Rate for clients that train but drop out")
@@ -445,7 +269,15 @@ if __name__ == "__main__":
     parser.add_argument('-ts', "--time_select", type=bool, default=False,
                         help="Whether to group and select clients at each round according to time cost")
     parser.add_argument('-tth', "--time_threthold", type=float, default=10000,
-                        help="The threthold for droping slow clients")
+                        help="The threthold for droping slow clients, in simulated seconds per round")
+    parser.add_argument('-sst', "--sim_sample_time", type=float, default=0.001,
+                        help="Simulated seconds to train on one sample")
+    parser.add_argument('-sbw', "--sim_bandwidth", type=float, default=1e7,
+                        help="Simulated link speed of a client in bytes per second")
+    parser.add_argument('-ssd', "--sim_slowdown", type=float, default=10.0,
+                        help="Slow clients are up to 1 + sim_slowdown times slower")
+    parser.add_argument('-sd', "--seed", type=int, default=0,
+                        help="Seed of client sampling and of the simulated clock")
     # pFedMe / PerAvg / FedProx / FedAMP / FedPHP / GPFL / FedCAC
     parser.add_argument('-bt', "--beta", type=float, default=0.0)
     parser.add_argument('-lam', "--lamda", type=float, default=1.0,
@@ -458,6 +290,10 @@ if __name__ == "__main__":
     # FedFomo
     parser.add_argument('-M', "--M", type=int, default=5,
                         help="Server only sends M client models to one client at each round")
+    parser.add_argument('-msd', "--model_store_dtype", type=str, default='fp32', choices=['fp32', 'fp16', 'bf16', 'int8'],
+                        help="Precision of the per-client models kept by the server")
+    parser.add_argument('-msp', "--model_store_path", type=str, default='',
+                        help="Folder for a memory-mapped file of the per-client models, in memory if empty")
     # FedMTL
     parser.add_argument('-itk', "--itk", type=int, default=4000,
                         help="The iterations for solving quadratic subproblems")
@@ -482,6 +318,8 @@ if __name__ == "__main__":
     parser.add_argument('-hd', "--hidden_dim", type=int, default=512)
     parser.add_argument('-se', "--server_epochs", type=int, default=1000)
     parser.add_argument('-lf', "--localize_feature_extractor", type=bool, default=False)
+    parser.add_argument('-gpb', "--gen_pool_batches", type=int, default=0,
+                        help="Batches of generated features drawn once per round and resampled by every client batch, 0 to generate per batch")
     # SCAFFOLD / FedGH
     parser.add_argument('-slr', "--server_learning_rate", type=float, default=1.0)
     # FedALA
@@ -502,15 +340,34 @@ if __name__ == "__main__":
     parser.add_argument('-ca', "--fedcross_alpha", type=float, default=0.99)
     parser.add_argument('-cmss', "--collaberative_model_select_strategy", type=int, default=1)
     
+    # PFL-DA
+    parser.add_argument('-dasp', "--da_shared_pass", type=bool, default=False,
+                        help="Train the personalized head and the base in one pass over the data")
+    # FedBuff / SR-FedBuff
+    parser.add_argument('-bfs', "--buffer_size", type=int, default=10,
+                        help="Client updates per aggregation of the asynchronous server")
+    parser.add_argument('-mst', "--max_staleness", type=int, default=10,
+                        help="Updates computed on older global models are dropped")
+    parser.add_argument('-cc', "--concurrency", type=int, default=0,
+                        help="Clients training at the same time, 0 for join_ratio * num_clients")
+    parser.add_argument('-aw', "--async_workers", type=int, default=1,
+                        help="Threads training the clients, more than one makes runs non-deterministic")
+
     # SR-FedAvg with Top-k Compression
     parser.add_argument('-srbeta', "--sr_beta", type=float, default=0.9,
                         help="Momentum coefficient for Stein-Rule shrinkage in SR-FedAvg")
     # parser.add_argument('-srwarmup', "--sr_warmup_rounds", type=int, default=5,
     #                     help="Warmup rounds before applying Stein-Rule shrinkage")
     parser.add_argument('-topk', "--topk_ratio", type=float, default=0.1,
-                        help="Top-k compression ratio (e.g., 0.1 = keep top 10%)")
+                        help="Top-k compression ratio (e.g., 0.1 = keep top 10%%)")
+
+    return parser
+
+
+if __name__ == "__main__":
+    total_start = time.time()
 
-    args = parser.parse_args()
+    args = get_parser().parse_args()
 
     os.environ["CUDA_VISIBLE_DEVICES"] = args.device_id
 
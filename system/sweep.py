@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Runs a grid of experiments (algorithms x seeds x hyperparameters) without
+starting a new process per run. Runs share one process, or a pool of
+long-lived worker processes, so torch is imported and every client shard is
+decoded once per process. Every run writes its results file as usual, tagged
+with the seed and the grid values, so they can be selected with
+utils.result_utils.query_results.
+
+    python sweep.py -algos FedAvg SR-FedAvg -seeds 0 1 2 3 4 -- -data MNIST -gr 100
+    python sweep.py -algos FedProx -grid lr=0.01,0.05 mu=0.001,0.01 -w 2 -- -data MNIST
+
+Arguments after -- are main.py arguments shared by all runs. The results of a
+run with seed s are saved as its running time s, and the goal is extended with
+the grid values, e.g. sweep-lr0.01-mu0.001.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+from main import get_parser, build_server
+from utils.data_utils import set_data_cache
+
+
+def parse_grid(entries):
+    """['lr=0.01,0.05', 'mu=0.1'] -> {'lr': ['0.01', '0.05'], 'mu': ['0.1']}"""
+    grid = {}
+    for entry in entries:
+        key, values = entry.split('=', 1)
+        grid[key] = values.split(',')
+    return grid
+
+
+def option_of(parser, key):
+    # accept both the short (lr) and the long (local_learning_rate) name
+    for option in ['-' + key, '--' + key, key]:
+        if option in parser._option_string_actions:
+            return option, parser._option_string_actions[option].dest
+    raise ValueError(f"unknown main.py argument: {key}")
+
+
+def make_runs(algorithms, seeds, grid, common, goal):
+    parser = get_parser()
+    keys = list(grid.keys())
+    runs = []
+    for values in itertools.product(*[grid[k] for k in keys]):
+        point_argv, attrs = [], {}
+        for key, value in zip(keys, values):
+            option, dest = option_of(parser, key)
+            point_argv += [option, value]
+            attrs[dest] = value
+        point_goal = goal + "".join("-{}{}".format(k.lstrip('-'), v) for k, v in zip(keys, values))
+        for algorithm in algorithms:
+            for seed in seeds:
+                argv = common + point_argv + ['-algo', algorithm, '-go', point_goal]
+                runs.append({'algorithm': algorithm, 'seed': seed, 'goal': point_goal,
+                             'params': attrs, 'argv': argv})
+    return runs
+
+
+def init_worker(threads):
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+
+def run_one(run):
+    args = get_parser().parse_args(run['argv'])
+    os.environ["CUDA_VISIBLE_DEVICES"] = args.device_id
+    if args.device == "cuda" and not torch.cuda.is_available():
+        args.device = "cpu"
+    set_data_cache(True)
+
+    seed = run['seed']
+    args.seed = seed
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    print(f"\n============= {run['algorithm']} {run['goal']} seed {seed} =============")
+    start = time.time()
+    params = {dest: getattr(args, dest) for dest in run['params']}
+    record = dict(algorithm=run['algorithm'], seed=seed, goal=run['goal'], params=params)
+    try:
+        server = build_server(args, args.model, seed)
+        # grid values are stored next to dataset/algorithm/goal/times, for query_results
+        server.metrics.attrs.update(dict(params, seed=seed))
+        if args.resume:
+            server.load_checkpoint(args.resume)
+        server.train()
+        record.update(status='ok', file=server.metrics.file_path)
+    except Exception:
+        traceback.print_exc()
+        record.update(status='failed', error=traceback.format_exc().strip().split('\n')[-1])
+    record['time'] = time.time() - start
+    return record
+
+
+def run_sweep(algorithms, seeds, grid=None, common=None, goal='sweep', workers=1):
+    """Runs every combination in this process (workers=1) or in a process pool.
+    Returns one record per run with its status, results file and time."""
+    runs = make_runs(algorithms, seeds, grid or {}, common or [], goal)
+    if workers <= 1:
+        return [run_one(run) for run in runs]
+
+    # spawned workers, so that each of them can use cuda
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_worker, initargs=(threads,)) as pool:
+        return list(pool.map(run_one, runs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-algos', "--algorithms", type=str, nargs='+', default=["FedAvg"])
+    parser.add_argument('-seeds', "--seeds", type=int, nargs='+', default=[0])
+    parser.add_argument('-grid', "--grid", type=str, nargs='*', default=[],
+                        help="main.py arguments to sweep, as name=value1,value2")
+    parser.add_argument('-go', "--goal", type=str, default="sweep")
+    parser.add_argument('-w', "--workers", type=int, default=1,
+                        help="Worker processes, 1 runs everything in this process")
+    parser.add_argument("common", nargs=argparse.REMAINDER,
+                        help="Arguments after -- are passed to every run")
+    args = parser.parse_args()
+    common = [a for a in args.common if a != '--']
+
+    total_start = time.time()
+    records = run_sweep(args.algorithms, args.seeds, parse_grid(args.grid), common, args.goal, args.workers)
+
+    summary_path = os.path.join("../results", "{}_sweep.json".format(args.goal))
+    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+    with open(summary_path, 'w') as f:
+        json.dump(records, f, indent=2)
+
+    print("\n" + "=" * 50)
+    for r in records:
+        print("{:<12s}{:<30s}seed {:<4d}{:<8s}{:.1f}s".format(r['algorithm'], r['goal'], r['seed'], r['status'], r['time']))
+    print(f"\nSummary: {summary_path}")
+    print(f"Total time cost: {round(time.time()-total_start, 2)}s.")
@@ -4,7 +4,8 @@ import torch.nn as nn
 import copy
 import random
 from torch.utils.data import DataLoader
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+from utils.data_utils import to_device
 
 class ALA:
     def __init__(self,
@@ -17,7 +18,9 @@ class ALA:
                 eta: float = 1.0,
                 device: str = 'cpu', 
                 threshold: float = 0.1,
-                num_pre_loss: int = 10) -> None:
+                num_pre_loss: int = 10,
+                load_data: Optional[Callable] = None,
+                to_device: Optional[Callable] = None) -> None:
         """
         Initialize ALA module
 
@@ -32,6 +35,8 @@ class ALA:
             device: Using cuda or cpu. Default: 'cpu'
             threshold: Train the weight until the standard deviation of the recorded losses is less than a given threshold. Default: 0.1
             num_pre_loss: The number of the recorded losses to be considered to calculate the standard deviation. Default: 10
+            load_data: Builds the loader over train_data[start:stop], called as load_data(start, stop). Default: a DataLoader over train_data
+            to_device: Moves a batch (x, y) to the device. Default: utils.data_utils.to_device
 
         Returns:
             None.
@@ -47,11 +52,22 @@ class ALA:
         self.threshold = threshold
         self.num_pre_loss = num_pre_loss
         self.device = device
+        self.load_data = load_data
+        self.to_device = to_device
 
         self.weights = None # Learnable local aggregation weights.
         self.start_phase = True
 
 
+    def state_dict(self):
+        """The learned aggregation weights and the phase, e.g. for checkpoints."""
+        return {'weights': self.weights, 'start_phase': self.start_phase}
+
+    def load_state_dict(self, state):
+        self.weights = None if state['weights'] is None else [w.to(self.device) for w in state['weights']]
+        self.start_phase = state['start_phase']
+
+
     def adaptive_local_aggregation(self, 
                             global_model: nn.Module,
                             local_model: nn.Module) -> None:
@@ -71,7 +87,10 @@ class ALA:
         rand_ratio = self.rand_percent / 100
         rand_num = int(rand_ratio*len(self.train_data))
         rand_idx = random.randint(0, len(self.train_data)-rand_num)
-        rand_loader = DataLoader(self.train_data[rand_idx:rand_idx+rand_num], self.batch_size, drop_last=False)
+        if self.load_data is not None:
+            rand_loader = self.load_data(rand_idx, rand_idx+rand_num)
+        else:
+            rand_loader = DataLoader(self.train_data[rand_idx:rand_idx+rand_num], self.batch_size, drop_last=False)
 
 
         # obtain the references of the parameters
@@ -118,11 +137,10 @@ class ALA:
         cnt = 0  # weight training iteration counter
         while True:
             for x, y in rand_loader:
-                if type(x) == type([]):
-                    x[0] = x[0].to(self.device)
+                if self.to_device is not None:
+                    x, y = self.to_device(x, y)
                 else:
-                    x = x.to(self.device)
-                y = y.to(self.device)
+                    x, y = to_device(x, y, self.device)
                 optimizer.zero_grad()
                 output = model_t(x)
                 loss_value = self.loss(output, y) # modify according to the local objective
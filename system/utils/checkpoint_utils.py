@@ -0,0 +1,246 @@
+import os
+import re
+import copy
+import random
+import threading
+
+import numpy as np
+import torch
+
+
+class ModuleState(object):
+    # module is a CPU copy of the saved module, for attributes whose structure
+    # cannot be rebuilt from __init__; state shares its tensors
+    def __init__(self, state, module=None):
+        self.state = state
+        self.module = module
+
+
+class OptimizerState(object):
+    def __init__(self, state):
+        self.state = state
+
+
+class SchedulerState(object):
+    def __init__(self, state):
+        self.state = state
+
+
+# a tensor that is a parameter of one of the object's modules, e.g. pFedMe's personalized_params
+class ParameterAlias(object):
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+
+# marks attributes whose type cannot be restored, e.g. data loaders
+_SKIP = object()
+
+
+def _to_cpu(value):
+    if isinstance(value, torch.Tensor):
+        return value.detach().to('cpu', copy=True)
+    if isinstance(value, dict):
+        return {k: _to_cpu(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_cpu(v) for v in value)
+    return copy.deepcopy(value)
+
+
+def _graph_tensors(value, found):
+    if isinstance(value, torch.Tensor):
+        if value.grad_fn is not None:
+            found[id(value)] = value.detach().clone()
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _graph_tensors(v, found)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _graph_tensors(v, found)
+    return found
+
+
+def _cpu_module(module):
+    # tensors kept from the last forward pass (e.g. FedCP's gate) are part of an
+    # autograd graph and cannot be deepcopied, their data is copied instead
+    memo = {}
+    for m in module.modules():
+        _graph_tensors(list(vars(m).values()), memo)
+    module = copy.deepcopy(module, memo).to('cpu')
+    for param in module.parameters():
+        param.grad = None
+    return module
+
+
+def capture(value, aliases={}):
+    """CPU copy of a training attribute: modules, tensors, optimizers, schedulers,
+    numbers, numpy arrays and (nested) lists/dicts of them."""
+    if isinstance(value, torch.Tensor) and id(value) in aliases:
+        return ParameterAlias(*aliases[id(value)])
+    if isinstance(value, torch.nn.Module):
+        module = _cpu_module(value)
+        return ModuleState(module.state_dict(), module)
+    if isinstance(value, torch.optim.Optimizer):
+        return OptimizerState(_to_cpu(value.state_dict()))
+    if isinstance(value, torch.optim.lr_scheduler.LRScheduler):
+        return SchedulerState(copy.deepcopy(value.state_dict()))
+    if hasattr(value, 'state_dict') and hasattr(value, 'load_state_dict'):
+        # other stateful objects, e.g. a ClientModelStore
+        return ModuleState(_to_cpu(value.state_dict()))
+    if isinstance(value, torch.Tensor):
+        return _to_cpu(value)
+    if isinstance(value, (list, tuple)):
+        items = [capture(v, aliases) for v in value]
+        return _SKIP if any(v is _SKIP for v in items) else type(value)(items)
+    if isinstance(value, dict):
+        items = {k: capture(v, aliases) for k, v in value.items()}
+        return _SKIP if any(v is _SKIP for v in items.values()) else items
+    if value is None or isinstance(value, (bool, int, float, str, np.ndarray, np.generic)):
+        return copy.deepcopy(value)
+    return _SKIP
+
+
+def restore(current, saved, device, obj=None):
+    """Loads saved into current in place where possible and returns the restored value."""
+    if isinstance(saved, ParameterAlias):
+        return dict(getattr(obj, saved.module).named_parameters())[saved.name]
+    if isinstance(saved, ModuleState) and getattr(saved, 'module', None) is not None:
+        if isinstance(current, torch.nn.Module) and current.state_dict().keys() == saved.state.keys():
+            # in place, so optimizers holding the parameters keep working
+            current.load_state_dict(saved.state)
+            return current
+        # created or replaced during training, e.g. a global model that became
+        # the base of the uploaded models (FedPer, FedRep)
+        return saved.module.to(device)
+    if isinstance(saved, (ModuleState, OptimizerState, SchedulerState)):
+        # there is no template to load into when the attribute does not exist yet
+        if current is not None:
+            current.load_state_dict(saved.state)
+        return current
+    if isinstance(saved, torch.Tensor):
+        if isinstance(current, torch.Tensor):
+            if current.shape == saved.shape and current.dtype == saved.dtype:
+                # in place, so optimizers holding the tensor keep working
+                with torch.no_grad():
+                    current.copy_(saved)
+                return current
+            return saved.to(current.device)
+        return saved.to(device)
+    if isinstance(saved, (list, tuple)):
+        if not isinstance(current, (list, tuple)):
+            current = []
+        items = []
+        for idx, v in enumerate(saved):
+            if idx < len(current):
+                items.append(restore(current[idx], v, device, obj))
+            elif isinstance(v, ModuleState) and len(current) > 0:
+                # modules that were created during training, e.g. a growing model pool
+                items.append(restore(copy.deepcopy(current[0]), v, device, obj))
+            else:
+                items.append(restore(None, v, device, obj))
+        return type(saved)(items)
+    if isinstance(saved, dict):
+        if not isinstance(current, dict):
+            current = {}
+        return {k: restore(current.get(k), v, device, obj) for k, v in saved.items()}
+    return saved
+
+
+def get_state(obj, skip=()):
+    aliases = {}
+    for name, value in vars(obj).items():
+        if isinstance(value, torch.nn.Module) and name not in skip:
+            for param_name, param in value.named_parameters():
+                aliases.setdefault(id(param), (name, param_name))
+
+    state = {}
+    for name, value in vars(obj).items():
+        if name in skip or callable(value) and not isinstance(value, torch.nn.Module):
+            continue
+        value = capture(value, aliases)
+        if value is not _SKIP:
+            state[name] = value
+    return state
+
+
+def set_state(obj, state, device):
+    for name, saved in state.items():
+        setattr(obj, name, restore(getattr(obj, name, None), saved, device, obj))
+
+
+def get_rng_state():
+    state = {
+        'random': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state['random'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+class Checkpointer(object):
+    """Writes one checkpoint file per round in a background thread.
+
+    The state is copied to the CPU before the writer starts, so training can
+    continue while the file is written. Files are written under a temporary
+    name and renamed, so a crash never leaves a partial checkpoint behind,
+    and only the last `keep` checkpoints of a run are retained.
+    """
+    def __init__(self, folder, prefix, keep=3):
+        self.folder = folder
+        self.prefix = prefix
+        self.keep = keep
+        self.thread = None
+
+    def path(self, round_idx):
+        return os.path.join(self.folder, "{}_round{}.pt".format(self.prefix, round_idx))
+
+    def list(self):
+        pattern = re.compile(re.escape(self.prefix) + r"_round(\d+)\.pt$")
+        found = []
+        if os.path.exists(self.folder):
+            for file_name in os.listdir(self.folder):
+                match = pattern.match(file_name)
+                if match:
+                    found.append((int(match.group(1)), os.path.join(self.folder, file_name)))
+        return [path for _, path in sorted(found)]
+
+    def latest(self):
+        found = self.list()
+        return found[-1] if len(found) > 0 else None
+
+    def save(self, state, round_idx):
+        self.wait()
+        self.thread = threading.Thread(target=self._write, args=(state, self.path(round_idx)))
+        self.thread.start()
+
+    def _write(self, state, path):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        for old_path in self.list()[:-self.keep] if self.keep > 0 else []:
+            os.remove(old_path)
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def read_checkpoint(path):
+    return torch.load(path, map_location='cpu', weights_only=False)
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class SimClock(object):
+    """Virtual time of the federation.
+
+    Clients are not slowed down for real: training a sample takes sample_time
+    virtual seconds and a model crosses a client's link at bandwidth bytes per
+    second. Every round, a slow client is slower by a factor drawn from
+    [1, 1 + slowdown]. A client whose round takes longer than the deadline
+    misses it, and a round lasts until its last client is done or the deadline.
+    """
+
+    def __init__(self, num_clients, sample_time, bandwidth, slowdown, deadline, rng):
+        self.sample_time = sample_time
+        self.bandwidth = bandwidth
+        self.slowdown = slowdown
+        self.deadline = deadline
+        self.rng = rng
+
+        self.now = 0.0
+        self.train_slow = np.zeros(num_clients, dtype=bool)
+        self.send_slow = np.zeros(num_clients, dtype=bool)
+        # virtual seconds spent by every client in the current round
+        self.compute_time = np.zeros(num_clients)
+        self.link_time = np.zeros(num_clients)
+        self.draw_speeds()
+
+    def set_slow(self, train_slow, send_slow):
+        self.train_slow[:] = train_slow
+        self.send_slow[:] = send_slow
+        self.draw_speeds()
+
+    def draw_speeds(self):
+        n = len(self.train_slow)
+        self.compute_factor = np.where(self.train_slow, self.rng.uniform(1, 1 + self.slowdown, n), 1.0)
+        self.link_factor = np.where(self.send_slow, self.rng.uniform(1, 1 + self.slowdown, n), 1.0)
+
+    def compute(self, client_id, num_samples):
+        if client_id < len(self.compute_time):
+            self.compute_time[client_id] += num_samples * self.sample_time * self.compute_factor[client_id]
+
+    def transfer(self, client_id, nbytes):
+        # the model goes down and the update of the same size comes back up
+        if client_id < len(self.link_time):
+            self.link_time[client_id] += 2 * nbytes / self.bandwidth * self.link_factor[client_id]
+
+    # virtual seconds a client needs to train on num_samples and exchange nbytes, ahead of time
+    def duration(self, client_id, num_samples, nbytes):
+        return num_samples * self.sample_time * self.compute_factor[client_id] + \
+            2 * nbytes / self.bandwidth * self.link_factor[client_id]
+
+    def client_time(self, client_id):
+        return self.compute_time[client_id] + self.link_time[client_id]
+
+    def in_time(self, client_id):
+        return self.client_time(client_id) <= self.deadline
+
+    def end_round(self, client_ids):
+        """Advances the clock by the round of the given clients and returns its length."""
+        if len(client_ids) > 0:
+            duration = min(float(np.max(self.client_time(np.asarray(client_ids)))), self.deadline)
+        else:
+            duration = 0.0
+        self.now += duration
+        self.compute_time[:] = 0
+        self.link_time[:] = 0
+        self.draw_speeds()
+        return duration
+
+    def state(self):
+        return {'now': self.now, 'compute_factor': self.compute_factor.copy(),
+                'link_factor': self.link_factor.copy(), 'rng': self.rng.bit_generator.state}
+
+    def load_state(self, state):
+        self.now = state['now']
+        self.compute_factor = state['compute_factor']
+        self.link_factor = state['link_factor']
+        self.rng.bit_generator.state = state['rng']
+
+
+class CountedLoader(object):
+    """Adds the size of every batch to client.trained_samples."""
+    def __init__(self, loader, client):
+        self.loader = loader
+        self.client = client
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        for batch in self.loader:
+            self.client.trained_samples += len(batch[-1])
+            yield batch
@@ -0,0 +1,54 @@
+import copy
+import functools
+import itertools
+import torch
+from torch.func import functional_call
+
+
+# Every client deep-copies args.model, so compiling the client models would
+# compile the same architecture once per client. Instead, each architecture is
+# compiled once as a function of its parameters and buffers, and the models
+# bind their own tensors to that shared graph on every call.
+
+# signature of an architecture: (compiled template module, tensor names)
+_POOL = {}
+
+
+def _signature(module):
+    tensors = itertools.chain(module.named_parameters(), module.named_buffers())
+    return (type(module),) + tuple((name, tuple(t.shape), t.dtype, str(t.device)) for name, t in tensors)
+
+
+def _pooled_forward(self, *args, **kwargs):
+    template, names = _POOL[self._compiled_key]
+    tensors = dict(self.named_parameters())
+    tensors.update(self.named_buffers())
+    if tensors.keys() != names:
+        # a layer of this copy was replaced after it was compiled
+        return type(self).forward(self, *args, **kwargs)
+    if template.training != self.training:
+        template.train(self.training)
+    return functional_call(template, tensors, args, kwargs)
+
+
+def compile_model(model, backend='inductor'):
+    """Runs the forward passes of model, and of every deepcopy of it, through a
+    graph compiled once per architecture with torch.compile.
+
+    The base and the head of a split model are compiled on their own, for
+    clients that call them separately.
+    """
+    modules = [getattr(model, name) for name in ['base', 'head']
+               if isinstance(getattr(model, name, None), torch.nn.Module)]
+    for module in modules or [model]:
+        key = _signature(module)
+        if key not in _POOL:
+            template = copy.deepcopy(module)
+            names = dict(itertools.chain(template.named_parameters(), template.named_buffers())).keys()
+            # parameters are graph inputs, so swapping in those of another copy reuses the graph
+            template.compile(backend=backend)
+            _POOL[key] = (template, set(names))
+        module._compiled_key = key
+        # bound with partial, so that deepcopy binds it to the copy and pickled models load
+        module.forward = functools.partial(_pooled_forward, module)
+    return model
@@ -1,6 +1,9 @@
 import numpy as np
 import os
+import queue
+import threading
 import torch
+import torch.nn as nn
 from collections import defaultdict
 
 
@@ -16,14 +19,31 @@ def read_data(dataset, idx, is_train=True):
     return data
 
 
+# decoded client shards, kept for the whole process when enabled (e.g. by sweep.py)
+_data_cache = None
+
+def set_data_cache(enabled):
+    global _data_cache
+    if not enabled:
+        _data_cache = None
+    elif _data_cache is None:
+        _data_cache = {}
+
+
 def read_client_data(dataset, idx, is_train=True, few_shot=0):
-    data = read_data(dataset, idx, is_train)
-    if "News" in dataset:
-        data_list = process_text(data)
-    elif "Shakespeare" in dataset:
-        data_list = process_Shakespeare(data)
+    key = (dataset, idx, is_train)
+    if _data_cache is not None and key in _data_cache:
+        data_list = _data_cache[key]
     else:
-        data_list = process_image(data)
+        data = read_data(dataset, idx, is_train)
+        if "News" in dataset:
+            data_list = process_text(data)
+        elif "Shakespeare" in dataset:
+            data_list = process_Shakespeare(data)
+        else:
+            data_list = process_image(data)
+        if _data_cache is not None:
+            _data_cache[key] = data_list
 
     if is_train and few_shot > 0:
         shot_cnt_dict = defaultdict(int)
@@ -43,11 +63,15 @@ def process_image(data):
 
 
 def process_text(data):
-    X, X_lens = list(zip(*data['x']))
-    y = data['y']
-    X = torch.Tensor(X).type(torch.int64)
-    X_lens = torch.Tensor(X_lens).type(torch.int64)
-    y = torch.Tensor(data['y']).type(torch.int64)
+    if data['x'].dtype.names is not None:
+        # padded int32 token arrays and lengths written by the batched tokenizer
+        X = torch.from_numpy(data['x']['tokens'].astype(np.int64))
+        X_lens = torch.from_numpy(data['x']['len'].astype(np.int64))
+    else:
+        X, X_lens = list(zip(*data['x']))
+        X = torch.Tensor(X).type(torch.int64)
+        X_lens = torch.Tensor(X_lens).type(torch.int64)
+    y = torch.from_numpy(np.asarray(data['y'], dtype=np.int64))
     return [((x, lens), y) for x, lens, y in zip(X, X_lens, y)]
 
 
@@ -56,3 +80,162 @@ def process_Shakespeare(data):
     y = torch.Tensor(data['y']).type(torch.int64)
     return [(x, y) for x, y in zip(X, y)]
 
+
+
+def to_device(x, y, device, non_blocking=False):
+    # text batches come as [tokens, lengths], lengths stay on cpu for pack_padded_sequence
+    if type(x) == type([]):
+        x[0] = x[0].to(device, non_blocking=non_blocking)
+    else:
+        x = x.to(device, non_blocking=non_blocking)
+    y = y.to(device, non_blocking=non_blocking)
+    return x, y
+
+
+def data_nbytes(data_list):
+    if len(data_list) == 0:
+        return 0
+    x, y = data_list[0]
+    tensors = (list(x) if isinstance(x, (tuple, list)) else [x]) + [y]
+    return len(data_list) * sum(t.element_size() * t.numel() for t in tensors)
+
+
+def stack_data(data_list, device):
+    xs, ys = zip(*data_list)
+    if isinstance(xs[0], (tuple, list)):
+        tokens, lens = zip(*xs)
+        X = [torch.stack(tokens).to(device), torch.stack(lens)]
+    else:
+        X = torch.stack(xs).to(device)
+    Y = torch.stack(ys).to(device)
+    return X, Y
+
+
+class DeviceDataBudget(object):
+    """Bytes of client data that may still be kept resident on the device,
+    shared by all clients of a run. Clients past the budget load from the host."""
+    def __init__(self, nbytes):
+        self.left = nbytes
+        self.lock = threading.Lock()
+
+    def take(self, nbytes):
+        with self.lock:
+            if nbytes > self.left:
+                return False
+            self.left -= nbytes
+            return True
+
+
+class DeviceDataLoader(object):
+    """Iterates over a client's data that is already stacked on the device.
+
+    Batches are sliced with an on-device permutation, so there is no 
+    per-sample collate and no host-to-device copy per batch.
+    """
+    def __init__(self, X, Y, batch_size, drop_last=False, shuffle=False):
+        self.X = X
+        self.Y = Y
+        self.batch_size = batch_size
+        self.drop_last = drop_last
+        self.shuffle = shuffle
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.Y) // self.batch_size
+        return (len(self.Y) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        num_samples = len(self.Y)
+        if self.shuffle:
+            idxs = torch.randperm(num_samples, device=self.Y.device)
+        else:
+            idxs = torch.arange(num_samples, device=self.Y.device)
+        for start in range(0, len(self) * self.batch_size, self.batch_size):
+            idx = idxs[start:start+self.batch_size]
+            if type(self.X) == type([]):
+                x = [self.X[0][idx], self.X[1][idx.cpu()]]
+            else:
+                x = self.X[idx]
+            yield x, self.Y[idx]
+
+
+class PrefetchLoader(object):
+    """Wraps a DataLoader and moves its batches to the device in a background thread.
+
+    Collating and (pinned) host-to-device copies of the next batches overlap 
+    with the computation on the current one.
+    """
+    def __init__(self, loader, device, depth=2):
+        self.loader = loader
+        self.device = device
+        self.depth = depth
+        self.non_blocking = loader.pin_memory
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        batches = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for x, y in self.loader:
+                    if stop.is_set():
+                        break
+                    batches.put(to_device(x, y, self.device, self.non_blocking))
+            except Exception as e:
+                batches.put(e)
+            batches.put(done)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            # the consumer may stop early, so unblock the producer before joining it
+            stop.set()
+            while thread.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+
+
+class FeatureLoader(object):
+    """Batches of (features, y) for training on top of a frozen base.
+
+    With a base, features are computed from the (x, y) batches of the loader
+    without building a graph. Without one, the loader already yields cached
+    features, possibly stored in a smaller dtype, and they are cast back to float.
+    """
+    def __init__(self, loader, device, base=None, non_blocking=False):
+        self.loader = loader
+        self.device = device
+        self.base = base
+        self.non_blocking = non_blocking
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        for x, y in self.loader:
+            x, y = to_device(x, y, self.device, self.non_blocking)
+            if self.base is not None:
+                with torch.no_grad():
+                    x = self.base(x)
+            yield x.float(), y
+
+
+def has_random_layers(module):
+    # batch statistics or dropout make the output of a module depend on more than its input
+    return any(m.training and isinstance(m, (nn.modules.batchnorm._BatchNorm, nn.modules.dropout._DropoutNd))
+               for m in module.modules())
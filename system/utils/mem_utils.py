@@ -13,6 +13,19 @@ def readable_size(num_bytes: int) -> str:
 
 LEN = 79
 
+
+def model_nbytes(item) -> int:
+    """Bytes of the tensors in a model, tensor or (nested) list/dict of them"""
+    if isinstance(item, torch.nn.Module):
+        return sum(p.numel() * p.element_size() for p in item.parameters())
+    if isinstance(item, torch.Tensor):
+        return item.numel() * item.element_size()
+    if isinstance(item, dict):
+        return sum(model_nbytes(v) for v in item.values())
+    if isinstance(item, (list, tuple)):
+        return sum(model_nbytes(v) for v in item)
+    return 0
+
 # some pytorch low-level memory management constant
 # the minimal allocate memory size (Byte)
 PYTORCH_MIN_ALLOCATE = 2 ** 9
@@ -67,7 +80,8 @@ class MemReporter():
         """
         #FIXME: make the grad tensor collected by gc
         objects = gc.get_objects()
-        tensors = [obj for obj in objects if isinstance(obj, torch.Tensor)]
+        # tensor subclasses such as the fake tensors kept by torch.compile have no storage
+        tensors = [obj for obj in objects if type(obj) in (torch.Tensor, torch.nn.Parameter)]
         for t in tensors:
             self.device_mapping[t.device].append(t)
 
@@ -0,0 +1,91 @@
+import copy
+import os
+import torch
+
+
+DTYPES = {'fp32': torch.float32, 'fp16': torch.float16, 'bf16': torch.bfloat16, 'int8': torch.int8}
+
+
+class ClientModelStore(object):
+    """One copy of a model per client, kept by the server in a compact form.
+
+    Every copy is a row of one (num_clients, numel) tensor holding the floating
+    point parameters and buffers of the model, in fp32, fp16, bf16 or int8 with
+    a symmetric scale per tensor. With a path, the rows live in a memory-mapped
+    file instead of memory. Copies are decoded to fp32 only when they are read.
+    """
+
+    def __init__(self, template, num_clients, dtype='fp32', path=None):
+        self.template = copy.deepcopy(template)
+        self.dtype = DTYPES[dtype]
+        self.names = [name for name, t in self.template.state_dict().items() if t.is_floating_point()]
+        state = self.template.state_dict()
+        self.sizes = [state[name].numel() for name in self.names]
+        self.numel = sum(self.sizes)
+        # row layout: tensor i of the model is rows[:, offsets[i]:offsets[i+1]]
+        self.offsets = [0]
+        for size in self.sizes:
+            self.offsets.append(self.offsets[-1] + size)
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            if os.path.exists(path):
+                os.remove(path)
+            self.rows = torch.from_file(path, shared=True, size=num_clients * self.numel,
+                                        dtype=self.dtype).view(num_clients, self.numel)
+        else:
+            self.rows = torch.zeros(num_clients, self.numel, dtype=self.dtype)
+        self.scales = torch.ones(num_clients, len(self.names)) if self.dtype == torch.int8 else None
+
+        for cid in range(num_clients):
+            self.put(cid, self.template)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def nbytes(self):
+        scales = self.scales.numel() * 4 if self.scales is not None else 0
+        return self.rows.numel() * self.rows.element_size() + scales
+
+    def vector(self, model):
+        state = model.state_dict()
+        return torch.cat([state[name].detach().reshape(-1).float().cpu() for name in self.names])
+
+    def put(self, cid, model):
+        vector = self.vector(model)
+        if self.scales is None:
+            self.rows[cid].copy_(vector)
+            return
+        chunks = vector.split(self.sizes)
+        scales = torch.stack([chunk.abs().max() for chunk in chunks]).clamp_min(1e-12) / 127
+        self.scales[cid] = scales
+        scale = torch.repeat_interleave(scales, torch.tensor(self.sizes))
+        self.rows[cid].copy_(torch.round(vector / scale).clamp_(-127, 127))
+
+    def get_vector(self, cid):
+        """The fp32 parameters and buffers of client cid, flattened, as a new tensor."""
+        row = self.rows[cid].float()
+        if self.dtype == torch.float32:
+            # float() returns the stored row itself
+            row = row.clone()
+        if self.scales is not None:
+            row *= torch.repeat_interleave(self.scales[cid], torch.tensor(self.sizes))
+        return row
+
+    def get(self, cid, model=None):
+        """Decodes the copy of client cid into model, a new copy of the template by default."""
+        if model is None:
+            model = copy.deepcopy(self.template)
+        state = model.state_dict()
+        with torch.no_grad():
+            for name, chunk in zip(self.names, self.get_vector(cid).split(self.sizes)):
+                state[name].copy_(chunk.view_as(state[name]))
+        return model
+
+    def state_dict(self):
+        return {'rows': self.rows, 'scales': self.scales}
+
+    def load_state_dict(self, state):
+        self.rows.copy_(state['rows'].to(self.rows.dtype))
+        if self.scales is not None:
+            self.scales.copy_(state['scales'])
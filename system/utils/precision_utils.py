@@ -0,0 +1,54 @@
+import torch
+
+
+# Mixed precision through forward hooks rather than a wrapper module, so the model
+# keeps its attributes and state_dict keys, and copies made with deepcopy (global
+# models, ALA's temporary model, personalized heads) run in the same precision.
+# Weights, gradients, optimizer states and aggregation stay in float32.
+
+DTYPES = {'fp32': None, 'bf16': torch.bfloat16}
+
+
+def _enter(module, inputs):
+    context = torch.autocast(device_type=module._autocast_device, dtype=module._autocast_dtype)
+    context.__enter__()
+    module._autocast_contexts.append(context)
+
+
+def _to_float(output):
+    if isinstance(output, torch.Tensor):
+        return output.float() if output.is_floating_point() else output
+    if isinstance(output, (list, tuple)):
+        return type(output)(_to_float(o) for o in output)
+    return output
+
+
+def _exit(module, inputs, output):
+    # also called when forward raises, after which there may be nothing to exit
+    if module._autocast_contexts:
+        module._autocast_contexts.pop().__exit__(None, None, None)
+    # losses and everything outside the model see float32 outputs
+    return _to_float(output)
+
+
+def set_precision(model, precision, device):
+    """Runs the forward passes of model in the given precision ('fp32' or 'bf16').
+
+    The base and the head of a split model are hooked too, for clients that call
+    them on their own.
+    """
+    dtype = DTYPES[precision]
+    if dtype is None:
+        return model
+    device_type = 'cuda' if 'cuda' in str(device) else 'cpu'
+    modules = [model] + [getattr(model, name) for name in ['base', 'head']
+                         if isinstance(getattr(model, name, None), torch.nn.Module)]
+    for module in modules:
+        if hasattr(module, '_autocast_dtype'):
+            continue
+        module._autocast_device = device_type
+        module._autocast_dtype = dtype
+        module._autocast_contexts = []
+        module.register_forward_pre_hook(_enter)
+        module.register_forward_hook(_exit, always_call=True)
+    return model
@@ -0,0 +1,194 @@
+import os
+import time
+import functools
+from collections import defaultdict
+
+import numpy as np
+import torch
+from torch.optim.optimizer import register_optimizer_step_pre_hook, register_optimizer_step_post_hook
+
+
+class RoundProfiler(object):
+    """Per-round phase timings and memory high-water marks.
+
+    Server and client methods are wrapped on the instance, so every algorithm
+    is covered without touching its training loop. Time spent fetching batches
+    and in optimizer steps is attributed to the outermost active phase, e.g.
+    `train_data` and `train_optimizer` inside the local `train` phase.
+
+    Parameters:
+        - enabled: nothing is wrapped or recorded when False
+        - device: cuda devices are synchronized at phase boundaries
+        - trace_round: round to record with torch.profiler, -1 for none
+        - trace_path: chrome trace file for trace_round
+    """
+    def __init__(self, enabled=False, device='cpu', trace_round=-1, trace_path=None):
+        self.enabled = enabled
+        self.cuda = 'cuda' in str(device) and torch.cuda.is_available()
+        self.trace_round = trace_round
+        self.trace_path = trace_path
+
+        self.round = 0
+        self.round_start = time.perf_counter()
+        self.current = defaultdict(float)
+        self.records = []
+        self.active = []
+        self.phases = set()
+        self.trace = None
+        self.hooks = []
+        # resident memory high-water mark of the round, sampled at phase boundaries
+        self.rss_peak = current_rss()
+
+        if self.enabled:
+            self.hooks.append(register_optimizer_step_pre_hook(self._optimizer_pre_hook))
+            self.hooks.append(register_optimizer_step_post_hook(self._optimizer_post_hook))
+            self._optimizer_start = None
+
+    def _sync(self):
+        if self.cuda:
+            torch.cuda.synchronize()
+
+    def _sample_rss(self):
+        self.rss_peak = max(self.rss_peak, current_rss())
+
+    def _start_trace(self):
+        if self.trace is None and self.round == self.trace_round:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if self.cuda:
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.trace = torch.profiler.profile(activities=activities, profile_memory=True, record_shapes=True)
+            self.trace.__enter__()
+
+    def _stop_trace(self):
+        if self.trace is not None:
+            self.trace.__exit__(None, None, None)
+            if self.trace_path is not None:
+                self.trace.export_chrome_trace(self.trace_path)
+                print(f"Profiler trace of round {self.round}: {self.trace_path}")
+            self.trace = None
+
+    def add(self, name, seconds):
+        if len(self.active) > 0:
+            name = self.active[0] + '_' + name
+        self.current[name] += seconds
+
+    # a per-round total that is not a time, e.g. the number of trained samples
+    def count(self, name, value):
+        if self.enabled:
+            self.current[name] += value
+
+    def timed(self, name, func):
+        if not self.enabled:
+            return func
+        self.phases.add(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # nested calls of the same phase (e.g. super().evaluate()) are counted once
+            if name in self.active:
+                return func(*args, **kwargs)
+            self._start_trace()
+            self._sync()
+            self._sample_rss()
+            self.active.append(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._sync()
+                self._sample_rss()
+                self.current[name] += time.perf_counter() - start
+                self.active.remove(name)
+        return wrapper
+
+    def wrap(self, obj, phases):
+        # phases maps method names to the phase they are counted in
+        for method, phase in phases.items():
+            if hasattr(obj, method):
+                setattr(obj, method, self.timed(phase, getattr(obj, method)))
+
+    def timed_loader(self, loader):
+        if not self.enabled:
+            return loader
+        return TimedLoader(loader, self)
+
+    def _optimizer_pre_hook(self, optimizer, args, kwargs):
+        self._optimizer_start = time.perf_counter()
+
+    def _optimizer_post_hook(self, optimizer, args, kwargs):
+        if self._optimizer_start is not None:
+            self.add('optimizer', time.perf_counter() - self._optimizer_start)
+            self._optimizer_start = None
+
+    def end_round(self):
+        if not self.enabled:
+            return
+        self._sync()
+        record = dict(self.current)
+        for phase in self.phases:
+            if phase + '_data' in record or phase + '_optimizer' in record:
+                # forward/backward and everything else inside the phase
+                record[phase + '_compute'] = record[phase] - record.get(phase + '_data', 0.0) - \
+                    record.get(phase + '_optimizer', 0.0)
+        record['round'] = time.perf_counter() - self.round_start
+        record['mem_rss'] = current_rss()
+        record['mem_rss_peak'] = max(self.rss_peak, record['mem_rss'])
+        self.rss_peak = record['mem_rss']
+        if self.cuda:
+            record['mem_cuda_peak'] = torch.cuda.max_memory_allocated()
+            torch.cuda.reset_peak_memory_stats()
+        self.records.append(record)
+
+        if self.round == self.trace_round:
+            self._stop_trace()
+        self.round += 1
+        self.current = defaultdict(float)
+        self.round_start = time.perf_counter()
+
+    def results(self):
+        keys = sorted(set(k for record in self.records for k in record.keys()))
+        return {k: np.array([record.get(k, 0.0) for record in self.records]) for k in keys}
+
+    def summary(self):
+        results = self.results()
+        if len(results) == 0:
+            return
+        print("\nAverage profile per round (s / bytes).")
+        for k, v in results.items():
+            print("{:<24s}{:.4f}".format(k, np.mean(v)) if not k.startswith('mem') else
+                  "{:<24s}{:.0f}".format(k, np.max(v)))
+
+    def close(self):
+        self._stop_trace()
+        for hook in self.hooks:
+            hook.remove()
+        self.hooks = []
+
+
+class TimedLoader(object):
+    """Counts the time spent waiting for batches as `<phase>_data`."""
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        iterator = iter(self.loader)
+        while True:
+            start = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            self.profiler.add('data', time.perf_counter() - start)
+            yield batch
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
@@ -1,25 +1,25 @@
 import h5py
 import numpy as np
 import os
+from collections import defaultdict
 
 
 def average_data(algorithm="", dataset="", goal="", times=10):
     test_acc = get_all_results_for_one_algo(algorithm, dataset, goal, times)
 
     max_accuracy = []
-    for i in range(times):
-        max_accuracy.append(test_acc[i].max())
+    for acc in test_acc:
+        max_accuracy.append(acc.max())
 
     print("std for best accuracy:", np.std(max_accuracy))
     print("mean for best accuracy:", np.mean(max_accuracy))
 
 
 def get_all_results_for_one_algo(algorithm="", dataset="", goal="", times=10):
-    test_acc = []
-    algorithms_list = [algorithm] * times
-    for i in range(times):
-        file_name = dataset + "_" + algorithms_list[i] + "_" + goal + "_" + str(i)
-        test_acc.append(np.array(read_data_then_delete(file_name, delete=False)))
+    runs = query_results(dataset=dataset, algorithm=algorithm, goal=goal)
+    test_acc = [run['rs_test_acc'] for run in runs if run['times'] < times]
+    for acc in test_acc:
+        print("Length: ", len(acc))
 
     return test_acc
 
@@ -34,4 +34,134 @@ def read_data_then_delete(file_name, delete=False):
         os.remove(file_path)
     print("Length: ", len(rs_test_acc))
 
-    return rs_test_acc
\ No newline at end of file
+    return rs_test_acc
+
+class MetricsWriter(object):
+    """Appends per-round records to resizable HDF5 datasets.
+
+    Records are buffered in memory and written every `flush_gap` rounds, so a
+    crashed run keeps everything up to its last flush. Each record is addressed
+    by its row, which is the round index for per-round values and the position
+    in the list for series such as rs_test_acc.
+    """
+    def __init__(self, file_path, flush_gap=10, attrs=None, chunk_rows=64):
+        self.file_path = file_path
+        self.flush_gap = flush_gap
+        self.attrs = attrs if attrs is not None else {}
+        self.chunk_rows = chunk_rows
+        self.buffer = defaultdict(dict)
+        self.rows = defaultdict(int)
+        self.created = False
+        self.pending = 0
+
+    # continue a file at the given row counts, dropping anything written after them
+    def resume(self, rows):
+        self.buffer.clear()
+        self.rows = defaultdict(int, rows)
+        self.created = os.path.exists(self.file_path)
+        if self.created:
+            with h5py.File(self.file_path, 'a') as hf:
+                for name in list(hf.keys()):
+                    if self.rows[name] == 0:
+                        del hf[name]
+                    elif hf[name].shape[0] > self.rows[name]:
+                        hf[name].resize(self.rows[name], axis=0)
+
+    def write(self, name, row, value):
+        self.buffer[name][row] = np.asarray(value, dtype=np.float64)
+        self.rows[name] = max(self.rows[name], row + 1)
+
+    def append(self, name, value):
+        self.write(name, self.rows[name], value)
+
+    def extend(self, name, values):
+        # only the items that were not written yet
+        for value in values[self.rows[name]:]:
+            self.append(name, value)
+
+    def step(self):
+        self.pending += 1
+        if self.pending >= self.flush_gap:
+            self.flush()
+
+    def flush(self):
+        self.pending = 0
+        if len(self.buffer) == 0:
+            return
+
+        result_path = os.path.dirname(self.file_path)
+        if result_path != '' and not os.path.exists(result_path):
+            os.makedirs(result_path)
+
+        with h5py.File(self.file_path, 'a' if self.created else 'w') as hf:
+            for k, v in self.attrs.items():
+                hf.attrs[k] = v
+            for name, records in self.buffer.items():
+                rows = sorted(records.keys())
+                values = np.stack([records[row] for row in rows])
+                shape = values.shape[1:]
+                if name not in hf:
+                    hf.create_dataset(name, shape=(0,) + shape, maxshape=(None,) + shape, 
+                                      chunks=(self.chunk_rows,) + shape, dtype=np.float64, fillvalue=0)
+                ds = hf[name]
+                if ds.shape[1:] != shape:
+                    raise ValueError(f"{name} has records of shape {shape}, expected {ds.shape[1:]}")
+                if ds.shape[0] < rows[-1] + 1:
+                    ds.resize(rows[-1] + 1, axis=0)
+                if rows[-1] - rows[0] + 1 == len(rows):
+                    ds[rows[0]:rows[-1] + 1] = values
+                else:
+                    for row, value in zip(rows, values):
+                        ds[row] = value
+
+        self.buffer.clear()
+        self.created = True
+
+
+_index = {}
+
+def index_results(result_path="../results/"):
+    """Maps every results file to its run attributes (dataset, algorithm, goal, times).
+
+    Attributes are read once per file and cached until the file changes. Files
+    written before the attributes existed are indexed by their file name, and
+other .h5 files are skipped.
+    """
+    index = {}
+    for file_name in sorted(os.listdir(result_path)) if os.path.exists(result_path) else []:
+        if not file_name.endswith('.h5'):
+            continue
+        file_path = os.path.join(result_path, file_name)
+        mtime = os.path.getmtime(file_path)
+        if file_path not in _index or _index[file_path][0] != mtime:
+            with h5py.File(file_path, 'r') as hf:
+                attrs = {k: (v.item() if hasattr(v, 'item') else v) for k, v in hf.attrs.items()}
+            if 'algorithm' not in attrs:
+                try:
+                    dataset, rest = file_name[:-len('.h5')].split('_', 1)
+                    algorithm, goal, times = rest.rsplit('_', 2)
+                    attrs = {'dataset': dataset, 'algorithm': algorithm, 'goal': goal, 'times': int(times)}
+                except ValueError:
+                    # not a results file of a run
+                    continue
+            _index[file_path] = (mtime, attrs)
+        index[file_path] = _index[file_path][1]
+    return index
+
+
+def query_results(result_path="../results/", keys=('rs_test_acc',), **filters):
+    """Loads the requested datasets of every run whose attributes match filters.
+
+    e.g. query_results(dataset='MNIST', algorithm='FedAvg', goal='test') returns
+    a list of dicts with the run attributes plus one array per key, sorted by times.
+    """
+    runs = []
+    for file_path, attrs in index_results(result_path).items():
+        if any(attrs.get(k) != v for k, v in filters.items()):
+            continue
+        run = dict(attrs)
+        with h5py.File(file_path, 'r') as hf:
+            for key in keys:
+                run[key] = np.array(hf[key]) if key in hf else np.array([])
+        runs.append(run)
+    return sorted(runs, key=lambda run: run.get('times', 0))